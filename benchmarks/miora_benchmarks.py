@@ -0,0 +1,390 @@
+#!/usr/bin/env python3
+"""
+MIORA Gateway Benchmarks
+Benchmark offline untuk throughput enqueue, dispatch handler, update memori dan latensi end-to-end
+
+Usage:
+    python benchmarks/miora_benchmarks.py                  # full run
+    python benchmarks/miora_benchmarks.py --quick          # smaller sizes for a smoke run
+    python benchmarks/miora_benchmarks.py --compare benchmarks/results/<baseline>.json
+
+Every run works in a fresh temporary directory with the null TTS backend and a
+stub module for RUN_MODULE, so results only depend on the gateway code itself.
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import platform
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Dict, List, Any, Optional
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(REPO_DIR, "benchmarks", "results")
+
+STUB_MODULE = "miora_bench_stub"
+
+# Command types measured by the dispatch benchmark and the command used for each
+DISPATCH_COMMANDS = {
+    "PRINT": "PRINT: benchmark message",
+    "CREATE_FILE": "CREATE_FILE: bench_output.txt",
+    "UPDATE_MEMORY": "UPDATE_MEMORY: bench_key=bench_value",
+    "UPDATE_BRAIN": "UPDATE_BRAIN: benchmark knowledge",
+    "SET_MODE": "SET_MODE: benchmark",
+    "SPEAK_NOW": "SPEAK_NOW: benchmark utterance",
+    "RUN_MODULE": f"RUN_MODULE: {STUB_MODULE}",
+}
+
+PROFILES = {
+    "quick": {"enqueue": 500, "bulk_batches": 5, "bulk_size": 500, "dispatch": 500,
+              "memory_sizes": [1000, 100000], "memory_updates": 5000, "latency": 100},
+    "full": {"enqueue": 5000, "bulk_batches": 20, "bulk_size": 1000, "dispatch": 5000,
+             "memory_sizes": [1000, 100000, 1000000], "memory_updates": 50000, "latency": 1000},
+}
+
+
+def _free_udp_port() -> int:
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    try:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+    finally:
+        sock.close()
+
+
+def configure_environment(workdir: str):
+    """Point every component at the scratch directory before the gateway modules are imported"""
+    os.environ.update({
+        "MIORA_TTS_BACKEND": "null",
+        "MIORA_MODULE_MODE": "inline",
+        "MIORA_LOG_ECHO": "false",
+        "MIORA_METRICS_ENABLED": "false",
+        # Enqueue throughput is measured without per-source throttling
+        "MIORA_RATE_LIMIT_PER_SOURCE": "0",
+        "MIORA_WAKEUP_PORT": str(_free_udp_port()),
+        # Snapshots are measured separately instead of landing at random points
+        "MIORA_MEMORY_SNAPSHOT_INTERVAL": "3600",
+        "MIORA_MEMORY_SNAPSHOT_OPS": "100000000",
+    })
+    os.chdir(workdir)
+    with open(f"{STUB_MODULE}.py", "w", encoding="utf-8") as f:
+        f.write("def main():\n    return 'ok'\n")
+    if REPO_DIR not in sys.path:
+        sys.path.insert(0, REPO_DIR)
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    """Nearest-rank percentile"""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    rank = max(1, int(round(pct / 100.0 * len(ordered))))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+def summarize_latencies(samples: List[float]) -> Dict[str, float]:
+    return {
+        "count": len(samples),
+        "p50_ms": round(percentile(samples, 50) * 1000, 4),
+        "p90_ms": round(percentile(samples, 90) * 1000, 4),
+        "p99_ms": round(percentile(samples, 99) * 1000, 4),
+        "max_ms": round(max(samples) * 1000, 4) if samples else 0.0,
+    }
+
+
+def throughput(count: int, elapsed: float) -> Dict[str, float]:
+    return {"count": count, "seconds": round(elapsed, 6),
+            "ops_per_second": round(count / elapsed, 1) if elapsed > 0 else 0.0}
+
+
+@contextlib.contextmanager
+def quiet():
+    """Silence the per-command console output of the handler while measuring"""
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        yield
+
+
+def progress(message: str):
+    print(message, file=sys.stderr, flush=True)
+
+
+# ----------------------------------------------------------------------
+# Benchmarks
+# ----------------------------------------------------------------------
+
+def bench_enqueue(client, profile: Dict[str, Any]) -> Dict[str, Any]:
+    """POST /api/command one at a time, then POST /api/commands in batches"""
+    results = {}
+
+    samples = []
+    started = time.perf_counter()
+    for i in range(profile["enqueue"]):
+        t0 = time.perf_counter()
+        response = client.post('/api/command', json={"command": f"PRINT: enqueue {i}", "source": "benchmark"})
+        samples.append(time.perf_counter() - t0)
+        assert response.status_code == 200, response.get_json()
+    results["single"] = {**throughput(profile["enqueue"], time.perf_counter() - started),
+                         **summarize_latencies(samples)}
+    client.post('/api/clear')
+
+    samples = []
+    batch = [f"PRINT: bulk {i}" for i in range(profile["bulk_size"])]
+    started = time.perf_counter()
+    for _ in range(profile["bulk_batches"]):
+        t0 = time.perf_counter()
+        response = client.post('/api/commands', json={"commands": batch, "source": "benchmark"})
+        samples.append(time.perf_counter() - t0)
+        assert response.status_code == 200, response.get_json()
+    results["bulk"] = {**throughput(profile["bulk_batches"] * profile["bulk_size"], time.perf_counter() - started),
+                       "batch_size": profile["bulk_size"], **summarize_latencies(samples)}
+    client.post('/api/clear')
+    return results
+
+
+def drain(handler) -> int:
+    processed = 0
+    while True:
+        count = handler.process_commands()
+        if not count:
+            return processed
+        processed += count
+
+
+def bench_dispatch(handler, api, profile: Dict[str, Any]) -> Dict[str, Any]:
+    """Pre-fill the queue with one command type and time the handler draining it"""
+    results = {}
+    for command_type, command in DISPATCH_COMMANDS.items():
+        records = [api.build_record(command, "benchmark") for _ in range(profile["dispatch"])]
+        handler.queue.append_many(records)
+
+        started = time.perf_counter()
+        with quiet():
+            processed = drain(handler)
+            handler.tts.wait_idle()
+        elapsed = time.perf_counter() - started
+        results[command_type] = throughput(processed, elapsed)
+        progress(f"  dispatch {command_type}: {results[command_type]['ops_per_second']:.0f}/s")
+    handler.logger.flush()
+    return results
+
+
+def bench_memory(handler, profile: Dict[str, Any]) -> Dict[str, Any]:
+    """Time execute_update_memory against memory stores of several sizes"""
+    from miora_memory_store import MIORAMemoryStore
+
+    results = {}
+    rng = random.Random(0)
+    original = handler.memory
+    for size in profile["memory_sizes"]:
+        memory_file = f"bench_memory_{size}.json"
+        with open(memory_file, "w", encoding="utf-8") as f:
+            json.dump({f"key_{i:07d}": f"value_{i}" for i in range(size)}, f)
+
+        started = time.perf_counter()
+        handler.memory = MIORAMemoryStore(memory_file)
+        load_seconds = time.perf_counter() - started
+
+        updates = [f"key_{rng.randrange(size):07d}=updated_{i}" for i in range(profile["memory_updates"])]
+        started = time.perf_counter()
+        for data in updates:
+            handler.execute_update_memory(data)
+        elapsed = time.perf_counter() - started
+
+        started = time.perf_counter()
+        handler.memory.snapshot(force=True)
+        snapshot_seconds = time.perf_counter() - started
+        handler.memory.close()
+
+        results[str(size)] = {**throughput(len(updates), elapsed),
+                              "load_seconds": round(load_seconds, 6),
+                              "snapshot_seconds": round(snapshot_seconds, 6)}
+        progress(f"  memory {size} keys: {results[str(size)]['ops_per_second']:.0f} updates/s")
+    handler.memory = original
+    return results
+
+
+def bench_latency(handler, client, profile: Dict[str, Any]) -> Dict[str, Any]:
+    """Time from POST /api/command until the handler finished executing the command"""
+    from miora_wakeup import MIORAWakeupListener
+
+    completed: Dict[str, float] = {}
+    done = threading.Condition()
+    execute_record = handler.execute_record
+
+    def timed_execute_record(record, index, total):
+        execute_record(record, index, total)
+        with done:
+            completed[record.get("id")] = time.perf_counter()
+            done.notify_all()
+
+    handler.execute_record = timed_execute_record
+    wakeup = MIORAWakeupListener()
+    stop = threading.Event()
+
+    def loop():
+        while not stop.is_set():
+            if not handler.process_commands():
+                wakeup.wait(0.05)
+
+    def wait_for(ids: List[str]):
+        with done:
+            done.wait_for(lambda: all(i in completed for i in ids), timeout=60)
+
+    thread = threading.Thread(target=loop, name="miora-bench-handler", daemon=True)
+    results = {}
+    with quiet():
+        thread.start()
+        try:
+            # One command in flight: pure gateway latency
+            samples = []
+            for i in range(profile["latency"]):
+                t0 = time.perf_counter()
+                command_id = client.post('/api/command', json={"command": f"PRINT: latency {i}"}).get_json()["id"]
+                wait_for([command_id])
+                samples.append(completed[command_id] - t0)
+            results["idle"] = summarize_latencies(samples)
+
+            # Back-to-back submissions: latency including queueing behind earlier commands
+            sent = {}
+            for i in range(profile["latency"]):
+                t0 = time.perf_counter()
+                sent[client.post('/api/command', json={"command": f"PRINT: burst {i}"}).get_json()["id"]] = t0
+            wait_for(list(sent))
+            results["burst"] = summarize_latencies([completed[i] - t0 for i, t0 in sent.items() if i in completed])
+        finally:
+            stop.set()
+            wakeup.close()
+            thread.join(timeout=5)
+            handler.execute_record = execute_record
+    progress(f"  latency idle p50/p99: {results['idle']['p50_ms']:.2f}/{results['idle']['p99_ms']:.2f} ms")
+    return results
+
+
+# ----------------------------------------------------------------------
+# Reporting
+# ----------------------------------------------------------------------
+
+def _git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_DIR,
+                              capture_output=True, text=True, timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def _flatten(results: Dict[str, Any], prefix: str = "") -> Dict[str, float]:
+    flat = {}
+    for key, value in results.items():
+        name = f"{prefix}.{key}" if prefix else key
+        if isinstance(value, dict):
+            flat.update(_flatten(value, name))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[name] = value
+    return flat
+
+
+def compare(baseline: Dict[str, Any], current: Dict[str, Any]):
+    """Print the relative change of every throughput and latency figure"""
+    old, new = _flatten(baseline["results"]), _flatten(current["results"])
+    print(f"\nCompared with {baseline['meta'].get('git_revision')} ({baseline['meta'].get('started_at')}):")
+    for name in sorted(new):
+        if name not in old or not old[name] or not name.endswith(("ops_per_second", "_ms")):
+            continue
+        change = (new[name] - old[name]) / old[name] * 100
+        better = change > 0 if name.endswith("ops_per_second") else change < 0
+        print(f"  {name:<45} {old[name]:>12.2f} -> {new[name]:>12.2f}  {change:+7.1f}% {'✅' if better else '⚠️'}")
+
+
+def print_summary(results: Dict[str, Any]):
+    print("\n📊 MIORA benchmark results")
+    for name, value in _flatten(results).items():
+        if name.endswith(("ops_per_second", "p50_ms", "p99_ms", "_seconds")):
+            print(f"  {name:<45} {value:>12.2f}")
+
+
+def run(profile_name: str, selected: List[str]) -> Dict[str, Any]:
+    profile = PROFILES[profile_name]
+    workdir = tempfile.mkdtemp(prefix="miora-bench-")
+    cwd = os.getcwd()
+    configure_environment(workdir)
+    random.seed(0)
+
+    from interface_endpoint import app, get_api_interface
+    from external_instruction_handler import MIORAExternalCommandHandler
+
+    meta = {
+        "started_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "git_revision": _git_revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "profile": profile_name,
+        "parameters": profile,
+    }
+
+    client = app.test_client()
+    with quiet():
+        handler = MIORAExternalCommandHandler()
+
+    results = {}
+    try:
+        for name in selected:
+            progress(f"▶ {name}")
+            if name == "enqueue":
+                results[name] = bench_enqueue(client, profile)
+            elif name == "dispatch":
+                results[name] = bench_dispatch(handler, get_api_interface(), profile)
+            elif name == "memory":
+                results[name] = bench_memory(handler, profile)
+            elif name == "latency":
+                results[name] = bench_latency(handler, client, profile)
+    finally:
+        with quiet():
+            handler.executor.shutdown()
+            handler.tts.close()
+            handler.modules.close()
+            handler.memory.close()
+            handler.logger.close()
+        os.chdir(cwd)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    return {"meta": meta, "results": results}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline benchmarks for the MIORA gateway")
+    parser.add_argument("--quick", action="store_true", help="smaller sizes for a fast smoke run")
+    parser.add_argument("--only", action="append", choices=["enqueue", "dispatch", "memory", "latency"],
+                        help="run only the given benchmark (repeatable)")
+    parser.add_argument("--output", help="result file (default: benchmarks/results/<timestamp>.json)")
+    parser.add_argument("--compare", help="earlier result file to compare against")
+    args = parser.parse_args()
+
+    selected = args.only or ["enqueue", "dispatch", "memory", "latency"]
+    report = run("quick" if args.quick else "full", selected)
+
+    output = args.output or os.path.join(
+        RESULTS_DIR, datetime.now().strftime("bench-%Y%m%d-%H%M%S.json"))
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+
+    print_summary(report["results"])
+    print(f"\n💾 Results written to {output}")
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            compare(json.load(f), report)
+
+
+if __name__ == "__main__":
+    main()
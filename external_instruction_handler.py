@@ -5,29 +5,76 @@ MIORA External Instruction Handler
 Gateway system untuk menerima perintah dari sistem luar
 """
 
+import importlib
 import json
 import time
 import os
 import sys
-import subprocess
+import threading
+from concurrent.futures import wait
 from datetime import datetime
 from typing import Dict, List, Any, Optional
 
+import miora_config
+from miora_backup import MIORABackupEngine
+from miora_command_queue import MIORAConsumerCheckpoint
+from miora_commands import COMMAND_REGISTRY, CommandFailed, CommandValidationError
+from miora_executor import MIORACommandExecutor
+from miora_logging import MIORALogWriter
+from miora_memory_store import MIORAMemoryStore, query_memory
+from miora_metrics import METRICS, LAG_BUCKETS, MIORAMetricsServer
+from miora_results import MIORAResultStore
+from miora_events import MIORAEventPublisher
+from miora_lease_queue import open_command_queue
+from miora_module_runner import MIORAModuleRunner
+from miora_scheduler import MIORAScheduler
+from miora_tts import MIORATTSEngine
+from miora_wakeup import MIORAWakeupListener
+
+COMMAND_DURATION_SECONDS = METRICS.histogram(
+    "miora_command_duration_seconds", "Command execution time", ("type",))
+COMMAND_LAG_SECONDS = METRICS.histogram(
+    "miora_command_lag_seconds", "Time from enqueue to execution completion", ("type",), LAG_BUCKETS)
+COMMANDS_EXECUTED_TOTAL = METRICS.counter(
+    "miora_commands_executed_total", "Executed commands", ("type", "status"))
+COMMAND_FAILURES_TOTAL = METRICS.counter(
+    "miora_command_failures_total", "Failed commands", ("type",))
+
+# Modules re-imported by a hot RESTART_SYSTEM, in dependency order
+RELOAD_MODULES = ("miora_config", "miora_commands", "miora_executor", "miora_scheduler",
+                  "external_instruction_handler")
+
 class MIORAExternalCommandHandler:
-    def __init__(self):
+    def __init__(self, queue=None, events=None):
         self.commands_file = "commands.json"
-        self.log_file = "external_command_log.txt"
-        self.memory_file = "miora_memory.json"
-        self.supported_commands = [
-            "PRINT", "CREATE_FILE", "SPEAK_NOW", "UPDATE_MEMORY", 
-            "RUN_MODULE", "RESTART_SYSTEM", "LOAD_SCRIPT", "SET_MODE",
-            "VOICE_SPEAK", "MEMORY_BACKUP", "UPDATE_BRAIN"
-        ]
+        self.log_file = miora_config.HANDLER_LOG_FILE
+        self.memory_file = miora_config.MEMORY_FILE
+        self.registry = COMMAND_REGISTRY
+        self.supported_commands = self.registry.names()
         self.is_running = False
         self.execution_count = 0
+        self.poll_interval = miora_config.POLL_INTERVAL
+        self.command_delay = miora_config.COMMAND_DELAY
+        self.wakeup = None
+        self.metrics_server = None
+        self.checkpoint = None
+        self.restart_requested: Optional[str] = None
+        # False when queued commands live only in this process (unified mode without journal)
+        self.queue_durable = True
+        self.executor = MIORACommandExecutor(command_classes=self.registry.concurrency_map())
+        self._lock = threading.Lock()
+        self.logger = MIORALogWriter(self.log_file, "handler", echo=self.format_console_line)
         
         # Initialize files
         self.initialize_files()
+        self.queue = queue or open_command_queue()
+        self.memory = MIORAMemoryStore(self.memory_file)
+        self.backups = MIORABackupEngine(self.memory, on_done=self.log_backup)
+        self.tts = MIORATTSEngine()
+        self.modules = MIORAModuleRunner()
+        self.results = MIORAResultStore()
+        self.events = events or MIORAEventPublisher()
+        self.scheduler = MIORAScheduler()
         
     def initialize_files(self):
         """Initialize required files if they don't exist"""
@@ -38,46 +85,44 @@ class MIORAExternalCommandHandler:
         if not os.path.exists(self.memory_file):
             with open(self.memory_file, 'w') as f:
                 json.dump({}, f)
-                
-        if not os.path.exists(self.log_file):
-            with open(self.log_file, 'w') as f:
-                f.write(f"MIORA External Command Log - Started at {datetime.now()}\n")
-                f.write("=" * 60 + "\n\n")
     
-    def log_execution(self, command: str, result: str, success: bool = True):
-        """Log command execution to file"""
-        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        status = "✅ SUCCESS" if success else "❌ FAILED"
-        
-        log_entry = f"[{timestamp}] {status}\n"
-        log_entry += f"Command: {command}\n"
-        log_entry += f"Result: {result}\n"
-        log_entry += "-" * 40 + "\n\n"
-        
-        with open(self.log_file, 'a', encoding='utf-8') as f:
-            f.write(log_entry)
-            
-        print(f"[{timestamp}] {status} - {command}")
+    def log_execution(self, command: str, result: str, success: bool = True,
+                      latency: Optional[float] = None, source: Optional[str] = None):
+        """Queue a command execution record for the background log writer"""
+        self.logger.log(
+            command=command,
+            status="success" if success else "failed",
+            result=result,
+            source=source,
+            latency_ms=round(latency * 1000, 3) if latency is not None else None
+        )
     
-    def read_commands(self) -> List[str]:
-        """Read commands from commands.json file"""
+    def format_console_line(self, record: Dict[str, Any]) -> str:
+        """Console echo for a log record"""
+        if "command" not in record:
+            return ""
+        timestamp = record["timestamp"][:19].replace("T", " ")
+        status = "✅ SUCCESS" if record.get("status") == "success" else "❌ FAILED"
+        return f"[{timestamp}] {status} - {record['command']}"
+    
+    def read_commands(self) -> List[tuple]:
+        """Read the next batch of (record, position) pairs from the command queue"""
         try:
-            if os.path.exists(self.commands_file):
-                with open(self.commands_file, 'r', encoding='utf-8') as f:
-                    commands = json.load(f)
-                    return commands if isinstance(commands, list) else []
-            return []
+            # Commands written to the legacy commands.json file are moved into the queue
+            self.queue.import_legacy_file(self.commands_file)
+            return self.queue.read_batch()
         except Exception as e:
             self.log_execution("READ_COMMANDS", f"Error reading commands: {str(e)}", False)
             return []
     
-    def clear_commands(self):
-        """Clear the commands file after processing"""
+    def commit_commands(self, position: tuple, records: Optional[List[Dict[str, Any]]] = None):
+        """Advance the queue consumer offset after processing"""
         try:
-            with open(self.commands_file, 'w') as f:
-                json.dump([], f)
+            # Memory updates of these commands must be durable before they stop being replayable
+            self.memory.sync()
+            self.queue.commit(position, records)
         except Exception as e:
-            self.log_execution("CLEAR_COMMANDS", f"Error clearing commands: {str(e)}", False)
+            self.log_execution("COMMIT_COMMANDS", f"Error committing commands: {str(e)}", False)
     
     def execute_print(self, message: str) -> str:
         """Execute PRINT command"""
@@ -106,193 +151,330 @@ Status: Success
                 f.write(content)
             return f"File '{filename}' created successfully"
         except Exception as e:
-            return f"Failed to create file: {str(e)}"
+            raise CommandFailed(f"Failed to create file: {str(e)}")
     
     def execute_speak_now(self, text: str) -> str:
-        """Execute SPEAK_NOW command using system TTS"""
+        """Execute SPEAK_NOW command using the background TTS engine"""
         try:
-            # Try different TTS methods based on OS
-            if sys.platform == "win32":
-                # Windows SAPI
-                subprocess.run(['powershell', '-Command', f'Add-Type -AssemblyName System.Speech; $synth = New-Object System.Speech.Synthesis.SpeechSynthesizer; $synth.Speak("{text}")'], 
-                             capture_output=True, text=True)
-            elif sys.platform == "darwin":
-                # macOS say command
-                subprocess.run(['say', text], capture_output=True, text=True)
-            else:
-                # Linux espeak or festival
-                try:
-                    subprocess.run(['espeak', text], capture_output=True, text=True)
-                except:
-                    subprocess.run(['festival', '--tts'], input=text, text=True, capture_output=True)
-            
+            self.tts.speak(text)
             return f"Speaking: {text}"
         except Exception as e:
-            return f"TTS not available: {str(e)}"
+            raise CommandFailed(f"TTS not available: {str(e)}")
     
     def execute_update_memory(self, data: str) -> str:
         """Execute UPDATE_MEMORY command"""
         try:
-            # Load existing memory
-            memory = {}
-            if os.path.exists(self.memory_file):
-                with open(self.memory_file, 'r', encoding='utf-8') as f:
-                    memory = json.load(f)
-            
-            # Parse data
+            # Parse data; the store logs the update and snapshots it later
             if '=' in data:
                 key, value = data.split('=', 1)
-                memory[key.strip()] = value.strip()
+                self.memory.set(key.strip(), value.strip())
                 result = f"Memory updated: {key.strip()} = {value.strip()}"
             else:
                 timestamp_key = f"data_{int(time.time())}"
-                memory[timestamp_key] = data
+                self.memory.set(timestamp_key, data)
                 result = f"Memory updated with data: {data}"
             
-            # Save memory
-            with open(self.memory_file, 'w', encoding='utf-8') as f:
-                json.dump(memory, f, indent=2, ensure_ascii=False)
-            
             return result
         except Exception as e:
-            return f"Failed to update memory: {str(e)}"
+            raise CommandFailed(f"Failed to update memory: {str(e)}")
     
     def execute_run_module(self, module_name: str) -> str:
         """Execute RUN_MODULE command"""
         try:
-            # Simulate module execution
-            time.sleep(1)  # Simulate processing time
-            
-            # Try to import and run if it's a Python module
-            try:
-                module = __import__(module_name)
-                if hasattr(module, 'main'):
-                    result = module.main()
-                    return f"Module '{module_name}' executed successfully: {result}"
-                else:
-                    return f"Module '{module_name}' loaded but no main() function found"
-            except ImportError:
-                return f"Module '{module_name}' not found, but command logged"
+            success, result = self.modules.run(module_name)
         except Exception as e:
-            return f"Module execution failed: {str(e)}"
+            raise CommandFailed(f"Module execution failed: {str(e)}")
+        if not success:
+            raise CommandFailed(result)
+        return result
     
-    def execute_restart_system(self) -> str:
+    def execute_update_brain(self, knowledge: str) -> str:
+        """Execute UPDATE_BRAIN command"""
+        return self.execute_update_memory(f"brain_knowledge={knowledge}")
+    
+    def execute_set_mode(self, mode: str) -> str:
+        """Execute SET_MODE command"""
+        return self.execute_update_memory(f"operational_mode={mode}")
+    
+    def execute_load_script(self, script: str) -> str:
+        """Execute LOAD_SCRIPT command"""
+        raise CommandFailed("Command LOAD_SCRIPT recognized but not implemented yet")
+    
+    def execute_restart_system(self, parameters: str = "") -> str:
         """Execute RESTART_SYSTEM command"""
-        self.log_execution("RESTART_SYSTEM", "System restart initiated")
-        print("🔄 MIORA SYSTEM RESTART INITIATED")
+        # process_commands restarts once this command is committed, so it is not replayed
+        mode = parameters or miora_config.RESTART_MODE
+        if mode == "hard" and not self.queue_durable:
+            # Re-executing would drop the in-memory commands queued behind this one
+            self.restart_requested = "hot"
+            print("🔄 MIORA SYSTEM RESTART INITIATED (hot: the queue is not journaled)")
+            return "System hot reload initiated (hard restart needs a journaled queue)"
+        self.restart_requested = mode
+        print(f"🔄 MIORA SYSTEM RESTART INITIATED ({mode})")
+        if mode == "hard":
+            return "System restart initiated"
+        return "System hot reload initiated"
+    
+    def hot_reload(self):
+        """Re-import configuration, the command registry and handler code and switch to them in place
+
+        Every component (queue, memory, caches, worker pools, listeners) is
+        kept; the handler, executor, scheduler and lane queue switch to
+        their reloaded classes, so the next batch runs on the new code
+        without a restart. If the new code fails to import the handler
+        keeps running the old code.
+        """
+        self.restart_requested = None
+        started = time.perf_counter()
+        # Commands after RESTART_SYSTEM in the batch are read again by the new code
+        if hasattr(self.queue, "release"):
+            self.queue.release()
+        try:
+            modules = [importlib.reload(sys.modules[name]) if name in sys.modules else importlib.import_module(name)
+                       for name in RELOAD_MODULES]
+        except Exception as e:
+            print(f"⚠️ Hot reload failed, keeping the running code: {str(e)}")
+            self.log_execution("RESTART_SYSTEM", f"Hot reload failed, keeping the running code: {str(e)}", False)
+            return
+        reloaded = {module.__name__: module for module in modules}
+        
+        self.__class__ = reloaded["external_instruction_handler"].MIORAExternalCommandHandler
+        # Long-lived components keep their state and take the reloaded methods
+        for component in (self.executor, self.scheduler, self.queue):
+            module = reloaded.get(type(component).__module__)
+            if module is not None:
+                component.__class__ = getattr(module, type(component).__name__)
+        self.registry = reloaded["miora_commands"].COMMAND_REGISTRY
+        self.supported_commands = self.registry.names()
+        self.executor.command_classes = self.registry.concurrency_map()
+        self.poll_interval = miora_config.POLL_INTERVAL
+        self.command_delay = miora_config.COMMAND_DELAY
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        print(f"♻️ Handler code reloaded in {elapsed_ms:.1f} ms")
+        self.log_execution("RESTART_SYSTEM", f"Handler code reloaded in {elapsed_ms:.1f} ms", True)
+    
+    def restart(self):
+        """Replace the process with a fresh handler"""
         print("Restarting in 3 seconds...")
         time.sleep(3)
-        
-        # Restart the handler
+        self.close()
+        # Leased commands that were not run go back to the queue right away
+        self.queue.close()
         os.execv(sys.executable, ['python'] + sys.argv)
-        return "System restart completed"
+    
+    def execute_cancel_schedule(self, schedule_id: str) -> str:
+        """Execute CANCEL_SCHEDULE command"""
+        if self.scheduler.cancel(schedule_id):
+            return f"Schedule {schedule_id} cancelled"
+        raise CommandFailed(f"No scheduled command with id {schedule_id}")
     
     def execute_memory_backup(self, filename: str) -> str:
-        """Execute MEMORY_BACKUP command"""
+        """Execute MEMORY_BACKUP command
+
+        Without a filename an incremental backup is added to the backup
+        directory; with one a full copy is exported to that file. Both are
+        written in the background from a view taken now.
+        """
         try:
-            backup_data = {
-                "timestamp": datetime.now().isoformat(),
-                "backup_type": "full_memory",
-                "data": {}
-            }
-            
-            # Load current memory
-            if os.path.exists(self.memory_file):
-                with open(self.memory_file, 'r', encoding='utf-8') as f:
-                    backup_data["data"] = json.load(f)
-            
-            # Save backup
-            backup_filename = filename or f"miora_memory_backup_{int(time.time())}.json"
-            with open(backup_filename, 'w', encoding='utf-8') as f:
-                json.dump(backup_data, f, indent=2, ensure_ascii=False)
-            
-            return f"Memory backup saved to {backup_filename}"
+            if filename:
+                self.backups.export(filename)
+                return f"Memory backup to {filename} started"
+            return f"Memory backup to {self.backups.request()} started"
         except Exception as e:
-            return f"Memory backup failed: {str(e)}"
+            raise CommandFailed(f"Memory backup failed: {str(e)}")
     
-    def execute_command(self, command_text: str) -> tuple[bool, str]:
-        """Execute a single command"""
+    def memory_route(self, query: Dict[str, List[str]]) -> tuple:
+        """Listener route answering memory queries from the resident store"""
+        status, body = query_memory(self.memory, {name: values[0] for name, values in query.items()})
+        return status, "application/json", json.dumps(body, ensure_ascii=False).encode("utf-8")
+    
+    def log_backup(self, success: bool, message: str):
+        """Record the outcome of a background memory backup"""
+        self.log_execution("MEMORY_BACKUP", message, success)
+    
+    def parse_record(self, record: Dict[str, Any]) -> Dict[str, str]:
+        """Return the parsed form of a queued record, parsing legacy plain commands"""
+        if record.get("type"):
+            return {"type": record["type"], "params": record.get("params", "")}
+        return self.registry.parse(record.get("command", ""))
+    
+    def execute_parsed(self, command_type: str, parameters: str) -> tuple[bool, str]:
+        """Dispatch a parsed command through the registry
+
+        Handlers return a result message, or raise CommandFailed when the
+        command did not succeed.
+        """
         try:
-            command_text = command_text.strip()
-            
-            # Handle commands without parameters
-            if ':' not in command_text:
-                command_type = command_text.upper()
-                parameters = ""
-            else:
-                # Parse command with parameters
-                parts = command_text.split(':', 1)
-                command_type = parts[0].strip().upper()
-                parameters = parts[1].strip()
-            
-            # Validate command type
-            if command_type not in self.supported_commands:
+            spec = self.registry.get(command_type)
+            if spec is None:
                 return False, f"Unknown command: {command_type}"
             
-            # Execute based on command type
-            if command_type == "PRINT":
-                result = self.execute_print(parameters)
-            elif command_type == "CREATE_FILE":
-                result = self.execute_create_file(parameters)
-            elif command_type in ["SPEAK_NOW", "VOICE_SPEAK"]:
-                result = self.execute_speak_now(parameters)
-            elif command_type == "UPDATE_MEMORY":
-                result = self.execute_update_memory(parameters)
-            elif command_type == "RUN_MODULE":
-                result = self.execute_run_module(parameters)
-            elif command_type == "RESTART_SYSTEM":
-                result = self.execute_restart_system()
-            elif command_type == "MEMORY_BACKUP":
-                result = self.execute_memory_backup(parameters)
-            elif command_type == "UPDATE_BRAIN":
-                result = self.execute_update_memory(f"brain_knowledge={parameters}")
-            elif command_type == "SET_MODE":
-                result = self.execute_update_memory(f"operational_mode={parameters}")
-            else:
-                result = f"Command {command_type} recognized but not implemented yet"
-            
-            return True, result
+            return True, getattr(self, spec.handler)(parameters)
             
+        except CommandFailed as e:
+            return False, str(e)
         except Exception as e:
             return False, f"Execution error: {str(e)}"
     
-    def process_commands(self):
-        """Process all commands in the queue"""
+    def execute_command(self, command_text: str) -> tuple[bool, str]:
+        """Execute a single command"""
+        try:
+            parsed = self.registry.parse(command_text)
+        except CommandValidationError as e:
+            return False, str(e)
+        return self.execute_parsed(parsed["type"], parsed["params"])
+    
+    def execute_record(self, record: Dict[str, Any], index: int, total: int):
+        """Execute one queued command record and log the outcome"""
+        command = record.get("command", "")
+        print(f"\n[{index}/{total}] Executing: {command}")
+        
+        started = time.perf_counter()
+        command_type = self.queue.record_type(record)
+        self.events.publish("started", id=record.get("id"), type=command_type, command=command)
+        if record.get("corrupt"):
+            success, result = False, "Corrupt queue record"
+        else:
+            try:
+                parsed = self.parse_record(record)
+                success, result = self.execute_parsed(parsed["type"], parsed["params"])
+            except CommandValidationError as e:
+                success, result = False, str(e)
+        duration = time.perf_counter() - started
+        self.log_execution(command, result, success, duration, record.get("source"))
+        self.results.record_result(record, success, result, duration)
+        if record.get("schedule_id"):
+            # The id returned for a recurring command shows its latest run
+            self.results.record_result({**record, "id": record["schedule_id"]}, success,
+                                       f"Run {record['id']}: {result}", duration)
+        self.events.publish("finished" if success else "failed", id=record.get("id"), type=command_type,
+                            command=command, result=result, latency_ms=round(duration * 1000, 3))
+        
+        # Unknown types share one label so bad input cannot grow the label set
+        if self.registry.get(command_type) is None:
+            command_type = "UNKNOWN"
+        COMMAND_DURATION_SECONDS.observe(duration, type=command_type)
+        COMMANDS_EXECUTED_TOTAL.inc(type=command_type, status="success" if success else "failed")
+        if not success:
+            COMMAND_FAILURES_TOTAL.inc(type=command_type)
+        if record.get("enqueued_at"):
+            COMMAND_LAG_SECONDS.observe(max(0.0, time.time() - record["enqueued_at"]), type=command_type)
+        
+        with self._lock:
+            self.execution_count += 1
+    
+    def release_scheduled(self) -> int:
+        """Move scheduled commands that are due into their priority lanes"""
+        try:
+            # The schedule is only updated once the commands are safely queued
+            with self.scheduler.release_due() as due:
+                if due:
+                    self.queue.append_many(due, durable=True)
+        except Exception as e:
+            self.log_execution("SCHEDULER", f"Error enqueueing scheduled commands: {str(e)}", False)
+            return 0
+        if due:
+            self.results.record_enqueued(due)
+        return len(due)
+    
+    def idle_timeout(self) -> float:
+        """How long the main loop may sleep: the poll interval or until the next schedule"""
+        next_due = self.scheduler.seconds_until_next()
+        if next_due is None:
+            return self.poll_interval
+        return min(self.poll_interval, next_due)
+    
+    def process_commands(self) -> int:
+        """Process the next batch of commands in the queue"""
+        released = self.release_scheduled()
         commands = self.read_commands()
         
         if not commands:
-            return
+            return released
+        
+        # Finished commands are committed in small steps, so a crash replays only the tail
+        checkpoint = self.checkpoint = MIORAConsumerCheckpoint(commands, self.commit_commands)
         
-        print(f"\n🌐 MIORA External Gateway - Processing {len(commands)} commands...")
+        # Delayed and recurring commands wait in the scheduler
+        now = time.time()
+        scheduled = [index for index, (record, _) in enumerate(commands) if self.scheduler.wants(record, now)]
+        self.scheduler.add_many([commands[index][0] for index in scheduled])
+        for index in scheduled:
+            checkpoint.done(index)
+        runnable = [(index, record) for index, (record, _) in enumerate(commands)
+                    if not self.scheduler.wants(record, now)]
         
-        for i, command in enumerate(commands, 1):
-            print(f"\n[{i}/{len(commands)}] Executing: {command}")
+        print(f"\n🌐 MIORA External Gateway - Processing {len(runnable)} commands"
+              f"{f' ({len(scheduled)} scheduled)' if scheduled else ''}...")
+        
+        futures = []
+        for i, (index, record) in enumerate(runnable, 1):
+            command_type = record.get("type") or self.registry.split(record.get("command", ""))[0]
+            future = self.executor.submit(command_type, self.execute_record, record, i, len(runnable))
+            future.add_done_callback(lambda _, index=index: checkpoint.done(index))
+            futures.append(future)
             
-            success, result = self.execute_command(command)
-            self.log_execution(command, result, success)
-            self.execution_count += 1
+            # Commands after a restart stay in the queue for the new process
+            if self.restart_requested:
+                break
             
-            # Small delay between commands
-            time.sleep(0.5)
+            # Optional delay between commands
+            if self.command_delay > 0:
+                time.sleep(self.command_delay)
         
-        # Clear commands after processing
-        self.clear_commands()
+        wait(futures)
+        checkpoint.flush()
+        self.checkpoint = None
+        if self.restart_requested == "hard":
+            self.restart()
+        elif self.restart_requested:
+            self.hot_reload()
+        
+        self.publish_queue_stats()
         print(f"✅ All commands processed. Total executions: {self.execution_count}")
+        return len(commands)
+    
+    def publish_queue_stats(self):
+        """Broadcast the queue depth to live dashboards"""
+        stats = self.queue.stats()
+        self.events.publish("queue", depth=stats["depth"], oldest_age_seconds=stats["oldest_age_seconds"])
     
     def run(self):
         """Main loop to monitor and process commands"""
         self.is_running = True
         print("🌐 MIORA External Command Gateway Started")
-        print(f"📂 Monitoring: {self.commands_file}")
+        print(f"📂 Monitoring: {self.queue.queue_dir} (legacy: {self.commands_file})")
         print(f"📝 Logging to: {self.log_file}")
         print(f"💾 Memory file: {self.memory_file}")
-        print("🔄 Checking for commands every 5 seconds...")
+        if len(self.scheduler):
+            print(f"⏰ {len(self.scheduler)} scheduled commands loaded from {self.scheduler.schedule_file}")
+        self.wakeup = MIORAWakeupListener()
+        if miora_config.METRICS_ENABLED or miora_config.MEMORY_API_ENABLED:
+            self.metrics_server = MIORAMetricsServer()
+            if miora_config.METRICS_ENABLED:
+                self.queue.register_metrics()
+            else:
+                del self.metrics_server.routes["/metrics"]
+            if miora_config.MEMORY_API_ENABLED:
+                self.metrics_server.routes["/memory"] = self.memory_route
+            if self.metrics_server.start():
+                listener = f"http://{self.metrics_server.host}:{self.metrics_server.port}"
+                if miora_config.METRICS_ENABLED:
+                    print(f"📈 Metrics: {listener}/metrics")
+                if miora_config.MEMORY_API_ENABLED:
+                    print(f"🧠 Memory queries: {listener}/memory")
+        if self.wakeup.event_driven:
+            print(f"⚡ Waking on new commands (udp {self.wakeup.host}:{self.wakeup.port}), "
+                  f"polling every {self.poll_interval:g} seconds as fallback")
+        else:
+            print(f"🔄 Checking for commands every {self.poll_interval:g} seconds...")
         print("Press Ctrl+C to stop\n")
         
         try:
             while self.is_running:
-                self.process_commands()
-                time.sleep(5)
+                # Keep draining while batches come back full, sleep only when idle
+                if not self.process_commands():
+                    self.wakeup.wait(self.idle_timeout())
                 
         except KeyboardInterrupt:
             print("\n🛑 MIORA External Gateway Stopped")
@@ -300,6 +482,27 @@ Status: Success
         except Exception as e:
             print(f"\n❌ Error in main loop: {str(e)}")
             self.log_execution("SYSTEM_ERROR", str(e), False)
+        finally:
+            self.close()
+    
+    def close(self):
+        """Wait for running commands and release every component"""
+        self.executor.shutdown()
+        if self.checkpoint is not None:
+            # Interrupted mid-batch: keep the progress of the commands that finished
+            self.checkpoint.flush()
+            self.checkpoint = None
+        self.tts.close()
+        self.modules.close()
+        self.backups.close()
+        self.memory.close()
+        self.logger.close()
+        self.results.close()
+        self.events.close()
+        if self.wakeup:
+            self.wakeup.close()
+        if self.metrics_server:
+            self.metrics_server.stop()
 
 if __name__ == "__main__":
     handler = MIORAExternalCommandHandler()
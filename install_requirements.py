@@ -34,6 +34,9 @@ def main():
         "flask",
         "requests"  # Optional, for future API integrations
     ]
+    if os.name != "nt":
+        # Optional, multi-worker API serving (not available on Windows)
+        required_packages.append("gunicorn")
     
     print("Checking required packages...")
     
@@ -5,60 +5,329 @@ MIORA External Interface API Endpoint
 Flask API untuk menerima perintah dari sistem luar melalui HTTP
 """
 
-from flask import Flask, request, jsonify, render_template_string
+from flask import Flask, Response, request, jsonify, render_template_string, stream_with_context
 import json
-import os
+import threading
+import time
+import urllib.error
+import urllib.request
 from datetime import datetime
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Optional
+
+import miora_config
+from miora_command_queue import MIORACommandQueue, MIORAGroupWriter
+from miora_lease_queue import open_command_queue
+from miora_commands import COMMAND_REGISTRY, CommandValidationError
+from miora_dedup import MIORADedupIndex
+from miora_logging import MIORALogWriter
+from miora_memory_store import query_memory
+from miora_metrics import METRICS, CONTENT_TYPE as METRICS_CONTENT_TYPE
+from miora_ratelimit import MIORARateLimiter, Throttled
+from miora_results import MIORAResultStore
+from miora_scheduler import MIORAScheduler, parse_schedule_options
+from miora_server import MIORAStreamSlots, serve
+from miora_events import MIORAEventBus, MIORAEventReceiver, SlowConsumer
 
 app = Flask(__name__)
 
+COMMANDS_ENQUEUED_TOTAL = METRICS.counter(
+    "miora_commands_enqueued_total", "Commands accepted into the queue", ("type",))
+COMMANDS_REJECTED_TOTAL = METRICS.counter(
+    "miora_commands_rejected_total", "Commands rejected by validation")
+COMMANDS_DEDUPLICATED_TOTAL = METRICS.counter(
+    "miora_commands_deduplicated_total", "Repeated commands answered with the original", ("mode",))
+ENQUEUE_SECONDS = METRICS.histogram(
+    "miora_enqueue_seconds", "Time to append a request's commands to the queue", ("endpoint",))
+
 class MIORAAPIInterface:
-    def __init__(self):
+    def __init__(self, queue=None, receive_events: bool = True):
         self.commands_file = "commands.json"
-        self.api_log_file = "api_command_log.txt"
+        self.api_log_file = miora_config.API_LOG_FILE
+        self.queue = queue or open_command_queue()
+        self.logger = MIORALogWriter(self.api_log_file, "api")
+        self.registry = COMMAND_REGISTRY
+        self.results = MIORAResultStore()
+        self.dedup = MIORADedupIndex()
+        self.limiter = MIORARateLimiter(self.queue)
+        self.writer = MIORAGroupWriter(self._write_records) if miora_config.API_GROUP_WRITES else None
+        self.events = MIORAEventBus()
+        self.receive_events = receive_events
+        self.events_started = False
+        self.event_receiver = None
+        self._events_lock = threading.Lock()
+        # Resident memory store when the handler runs in this process;
+        # otherwise memory queries are forwarded to the handler's listener
+        self.memory = None
+        self.queue.register_metrics()
+    
+    def query_memory(self, query_string: str, args: Dict[str, str]) -> tuple:
+        """(HTTP status, JSON body) of a memory query, answered by the memory owner"""
+        if self.memory is not None:
+            return query_memory(self.memory, args)
+        url = miora_config.MEMORY_API_URL + ("?" + query_string if query_string else "")
+        try:
+            with urllib.request.urlopen(url, timeout=miora_config.MEMORY_API_TIMEOUT) as response:
+                return response.status, json.loads(response.read())
+        except urllib.error.HTTPError as e:
+            try:
+                return e.code, json.loads(e.read())
+            except ValueError:
+                return e.code, {'success': False, 'message': str(e)}
+        except (urllib.error.URLError, OSError) as e:
+            return 503, {'success': False, 'message': f'Handler memory listener is not reachable: {str(e)}'}
+    
+    def _write_records(self, records: List[Dict[str, Any]]):
+        self.queue.append_many(records)
+        self.results.record_enqueued(records)
+    
+    def start_events(self):
+        """Start receiving handler events and the queue depth ticker (once per process)"""
+        if self.events_started:
+            return
+        with self._events_lock:
+            if self.events_started:
+                return
+            self.events_started = True
+            if self.receive_events:
+                self.event_receiver = MIORAEventReceiver(self.events)
+                self.event_receiver.start()
+            threading.Thread(target=self._queue_ticker, name="miora-events-queue", daemon=True).start()
+    
+    def queue_event(self) -> Dict[str, Any]:
+        stats = self.queue.stats()
+        return {'event': 'queue', 'timestamp': time.time(),
+                'depth': stats['depth'], 'oldest_age_seconds': stats['oldest_age_seconds']}
+    
+    def _queue_ticker(self):
+        # Keeps dashboards current while the handler is idle or stopped
+        while True:
+            time.sleep(miora_config.EVENTS_QUEUE_INTERVAL)
+            if self.events.subscribers:
+                try:
+                    self.events.publish(self.queue_event())
+                except Exception as e:
+                    print(f"⚠️ Queue event failed: {str(e)}")
+    
+    def build_record(self, command: Any, source: str, options: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Validate a command and build its pre-parsed queue record
         
-    def add_command(self, command: str, source: str = "api") -> bool:
-        """Add command to the queue"""
+        `options` may carry priority, not_before and every (see
+        parse_schedule_options). Raises CommandValidationError for unknown
+        or malformed commands and invalid options.
+        """
         try:
-            # Read existing commands
-            commands = []
-            if os.path.exists(self.commands_file):
-                with open(self.commands_file, 'r', encoding='utf-8') as f:
-                    commands = json.load(f)
-            
-            # Add new command
-            commands.append(command)
-            
-            # Save updated commands
-            with open(self.commands_file, 'w', encoding='utf-8') as f:
-                json.dump(commands, f, indent=2, ensure_ascii=False)
+            parsed = self.registry.parse(command)
+            scheduling = parse_schedule_options(options or {})
+        except CommandValidationError:
+            COMMANDS_REJECTED_TOTAL.inc()
+            raise
+        return MIORACommandQueue.prepare_record({
+            "command": command.strip(),
+            "type": parsed["type"],
+            "params": parsed["params"],
+            "source": source,
+            **scheduling
+        })
+        
+    def dedup_key(self, record: Dict[str, Any], options: Optional[Dict[str, Any]]) -> Optional[tuple]:
+        """(key, window) used to suppress repeats of a record, or None"""
+        try:
+            return self.dedup.key_for(record, (options or {}).get('idempotency_key'))
+        except CommandValidationError:
+            COMMANDS_REJECTED_TOTAL.inc()
+            raise
+    
+    def log_duplicate(self, record: Dict[str, Any], original_id: str, key: str):
+        COMMANDS_DEDUPLICATED_TOTAL.inc(mode=key.split(':', 1)[0])
+        self.logger.log(command=record['command'], source=record['source'],
+                        status="duplicate", duplicate_of=original_id)
+    
+    def add_command(self, command: str, source: str = "api",
+                    options: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
+        """Validate a command and add it to the queue; returns the queued record
+        
+        A repeat of an earlier command (same idempotency key, or same content
+        in content mode) is not queued; the original record ID is returned
+        with "duplicate": True instead.
+        Raises Throttled when the source is over its rate or the queue is
+        full, and CommandValidationError for unknown or malformed commands.
+        """
+        record = self.build_record(command, source, options)
+        key = self.dedup_key(record, options)
+        if key is not None:
+            original_id = self.dedup.claim(key[0], key[1], record['id'])
+            if original_id is not None:
+                self.log_duplicate(record, original_id, key[0])
+                return {**record, 'id': original_id, 'duplicate': True}
+        # Only new, well-formed commands are charged against the source's rate
+        try:
+            self.limiter.check(source)
+        except Throttled:
+            if key is not None:
+                self.dedup.release_many([(key[0], record['id'])])
+            raise
+        try:
+            started = time.perf_counter()
+            if self.writer is not None:
+                # Shares the queue write with concurrent requests
+                self.writer.submit([record])
+            else:
+                self._write_records([record])
+            latency = time.perf_counter() - started
+            ENQUEUE_SECONDS.observe(latency, endpoint="command")
+            COMMANDS_ENQUEUED_TOTAL.inc(type=record['type'])
             
             # Log API request
-            self.log_api_request(command, source, True)
-            return True
+            self.log_api_request(command, source, True, latency=latency)
+            return record
             
         except Exception as e:
+            if key is not None:
+                self.dedup.release_many([(key[0], record['id'])])
             self.log_api_request(command, source, False, str(e))
-            return False
+            return None
     
-    def log_api_request(self, command: str, source: str, success: bool, error: str = None):
-        """Log API requests"""
-        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        status = "✅ SUCCESS" if success else "❌ FAILED"
+    def add_commands(self, items: List[Any], source: str = "api") -> List[Dict[str, Any]]:
+        """Validate a batch of commands and append the valid ones in one durable write
+        
+        Only new commands (not invalid items or duplicates) count against a
+        rate, each against the source it is queued under; items of a source
+        over its rate fail with reason "rate_limit". Raises Throttled when
+        no valid item could be accepted.
+        """
+        results = []
+        records = []
+        claims = []
         
-        log_entry = f"[{timestamp}] API REQUEST {status}\n"
-        log_entry += f"Source: {source}\n"
-        log_entry += f"Command: {command}\n"
-        if error:
-            log_entry += f"Error: {error}\n"
-        log_entry += "-" * 40 + "\n\n"
+        for index, item in enumerate(items):
+            if isinstance(item, Exception):
+                results.append({'index': index, 'success': False, 'message': str(item)})
+                continue
+            
+            command, item_source, options = item, source, None
+            if isinstance(item, dict):
+                command = item.get('command', '')
+                item_source = item.get('source', source)
+                options = item
+            
+            try:
+                record = self.build_record(command, item_source, options)
+                key = self.dedup_key(record, options)
+            except CommandValidationError as e:
+                results.append({'index': index, 'success': False, 'message': str(e)})
+                continue
+            records.append(record)
+            if key is not None:
+                claims.append((key[0], key[1], record['id']))
+            results.append({'index': index, 'success': True, 'id': record['id'], 'command': record['command']})
         
-        with open(self.api_log_file, 'a', encoding='utf-8') as f:
-            f.write(log_entry)
+        # Repeats (also within this batch) point at the original instead of being queued
+        duplicates = self.dedup.claim_many(claims) if claims else {}
+        if duplicates:
+            for result in results:
+                if result.get('id') in duplicates:
+                    result['id'] = duplicates[result['id']]
+                    result['duplicate'] = True
+            for key, _, command_id in claims:
+                if command_id in duplicates:
+                    record = next(r for r in records if r['id'] == command_id)
+                    self.log_duplicate(record, duplicates[command_id], key)
+            records = [record for record in records if record['id'] not in duplicates]
+            claims = [claim for claim in claims if claim[2] not in duplicates]
+        
+        throttled = self.charge_sources(records)
+        if throttled:
+            self.dedup.release_many([(key, command_id) for key, _, command_id in claims if command_id in throttled])
+            records = [record for record in records if record['id'] not in throttled]
+            claims = [claim for claim in claims if claim[2] not in throttled]
+            if not records and not duplicates:
+                raise next(iter(throttled.values()))
+            for position, result in enumerate(results):
+                error = throttled.get(result.get('id')) if not result.get('duplicate') else None
+                if error is not None:
+                    results[position] = {'index': result['index'], 'success': False, 'message': str(error),
+                                         'reason': error.reason, 'retry_after': error.retry_after}
+        
+        if not records:
+            return results
+        
+        try:
+            started = time.perf_counter()
+            self.queue.append_many(records, durable=True)
+            self.results.record_enqueued(records)
+            ENQUEUE_SECONDS.observe(time.perf_counter() - started, endpoint="commands")
+            for record in records:
+                COMMANDS_ENQUEUED_TOTAL.inc(type=record['type'])
+            self.log_api_batch(records, True)
+        except Exception as e:
+            self.dedup.release_many([(key, command_id) for key, _, command_id in claims])
+            for result in results:
+                if result['success'] and not result.get('duplicate'):
+                    result['success'] = False
+                    result['message'] = f"Failed to add command to queue: {str(e)}"
+                    result.pop('id', None)
+            self.log_api_batch(records, False, str(e))
+        
+        return results
+    
+    def charge_sources(self, records: List[Dict[str, Any]]) -> Dict[str, Throttled]:
+        """Charge every record against the rate of its own source
 
-# Initialize API interface
-api_interface = MIORAAPIInterface()
+        Returns {command_id: Throttled} for the records of sources that are
+        over their rate (or of every source while the queue is full).
+        """
+        by_source: Dict[str, List[Dict[str, Any]]] = {}
+        for record in records:
+            by_source.setdefault(record['source'], []).append(record)
+        throttled = {}
+        for source, source_records in by_source.items():
+            try:
+                self.limiter.check(source, len(source_records))
+            except Throttled as e:
+                throttled.update((record['id'], e) for record in source_records)
+        return throttled
+    
+    def log_api_request(self, command: str, source: str, success: bool, error: str = None,
+                        latency: float = None):
+        """Log API requests"""
+        self.logger.log(
+            command=command,
+            source=source,
+            status="success" if success else "failed",
+            error=error,
+            latency_ms=round(latency * 1000, 3) if latency is not None else None
+        )
+    
+    def log_api_batch(self, records: List[Dict[str, Any]], success: bool, error: str = None):
+        """Log a batch of API requests as one buffer entry"""
+        status = "success" if success else "failed"
+        self.logger.log_many([
+            {"command": r['command'], "source": r['source'], "status": status, "error": error, "id": r['id']}
+            for r in records
+        ])
+
+# The interface the routes use; built on first use so that embedding
+# processes (miora_unified) can install their own without building this one
+_api_interface: Optional[MIORAAPIInterface] = None
+_api_interface_lock = threading.Lock()
+stream_slots = MIORAStreamSlots()
+
+
+def get_api_interface() -> MIORAAPIInterface:
+    """The module's API interface, created with the default queue on first call"""
+    global _api_interface
+    if _api_interface is None:
+        with _api_interface_lock:
+            if _api_interface is None:
+                _api_interface = MIORAAPIInterface()
+    return _api_interface
+
+
+def set_api_interface(api: MIORAAPIInterface):
+    """Serve the routes from `api` instead of the default interface"""
+    global _api_interface
+    with _api_interface_lock:
+        _api_interface = api
 
 # HTML Template for Web Interface
 WEB_INTERFACE_TEMPLATE = """
@@ -144,6 +413,32 @@ WEB_INTERFACE_TEMPLATE = """
             background: #5a2d2d; 
             color: #FF6B6B; 
         }
+        .live { 
+            background: #3d3d3d; 
+            padding: 15px; 
+            border-radius: 5px; 
+            margin-top: 20px; 
+        }
+        .live-header { 
+            display: flex; 
+            justify-content: space-between; 
+            color: #cccccc; 
+        }
+        #events { 
+            max-height: 300px; 
+            overflow-y: auto; 
+        }
+        .event-item { 
+            padding: 6px 8px; 
+            margin: 4px 0; 
+            border-radius: 3px; 
+            font-family: monospace; 
+            font-size: 13px; 
+            background: #4d4d4d; 
+        }
+        .event-finished { border-left: 4px solid #4CAF50; }
+        .event-failed { border-left: 4px solid #FF6B6B; }
+        .event-started { border-left: 4px solid #888; }
     </style>
 </head>
 <body>
@@ -172,6 +467,14 @@ WEB_INTERFACE_TEMPLATE = """
         
         <div id="status"></div>
         
+        <div class="live">
+            <div class="live-header">
+                <h3>📡 Live Activity</h3>
+                <span><span id="connection">connecting...</span> · queue depth: <b id="depth">-</b></span>
+            </div>
+            <div id="events"></div>
+        </div>
+        
         <div class="commands-list">
             <h3>📋 Supported Commands:</h3>
             <div class="command-item">PRINT: [message] - Print message to console</div>
@@ -180,7 +483,7 @@ WEB_INTERFACE_TEMPLATE = """
             <div class="command-item">UPDATE_MEMORY: [key=value] - Update memory</div>
             <div class="command-item">RUN_MODULE: [module_name] - Execute module</div>
             <div class="command-item">MEMORY_BACKUP: [filename] - Backup memory</div>
-            <div class="command-item">RESTART_SYSTEM - Restart MIORA</div>
+            <div class="command-item">RESTART_SYSTEM: [hot|hard] - Reload or restart MIORA</div>
             <div class="command-item">UPDATE_BRAIN: [knowledge] - Update brain knowledge</div>
             <div class="command-item">SET_MODE: [mode] - Set operational mode</div>
         </div>
@@ -228,6 +531,40 @@ WEB_INTERFACE_TEMPLATE = """
             });
         }
         
+        const MAX_EVENTS = 50;
+        
+        function escapeHtml(text) {
+            const div = document.createElement('div');
+            div.textContent = text == null ? '' : String(text);
+            return div.innerHTML;
+        }
+        
+        function showEvent(kind, data) {
+            const list = document.getElementById('events');
+            const item = document.createElement('div');
+            const time = new Date(data.timestamp * 1000).toLocaleTimeString();
+            let text = time + ' ' + kind.toUpperCase() + ' ' + escapeHtml(data.command);
+            if (kind !== 'started') {
+                text += ' (' + data.latency_ms + ' ms)' + (data.result ? ' → ' + escapeHtml(data.result) : '');
+            }
+            item.className = 'event-item event-' + kind;
+            item.innerHTML = text;
+            list.insertBefore(item, list.firstChild);
+            while (list.children.length > MAX_EVENTS) {
+                list.removeChild(list.lastChild);
+            }
+        }
+        
+        const events = new EventSource('/api/events');
+        events.onopen = () => { document.getElementById('connection').textContent = '🟢 live'; };
+        events.onerror = () => { document.getElementById('connection').textContent = '🔴 reconnecting'; };
+        events.addEventListener('queue', e => {
+            document.getElementById('depth').textContent = JSON.parse(e.data).depth;
+        });
+        ['started', 'finished', 'failed'].forEach(kind => {
+            events.addEventListener(kind, e => showEvent(kind, JSON.parse(e.data)));
+        });
+        
         // Allow Enter key to send command
         document.getElementById('command').addEventListener('keypress', function(e) {
             if (e.key === 'Enter') {
@@ -244,27 +581,62 @@ def index():
     """Web interface for sending commands"""
     return render_template_string(WEB_INTERFACE_TEMPLATE)
 
+def streams_full_response():
+    """503 for a stream that would take the last threads kept for submissions"""
+    return jsonify({
+        'success': False,
+        'message': f'Too many open streams on this worker (limit {stream_slots.limit})',
+        'reason': 'streams',
+        'retry_after': 5
+    }), 503, {'Retry-After': '5'}
+
+def throttled_response(error: Throttled):
+    """429 with Retry-After for a rate-limited or backpressured request"""
+    return jsonify({
+        'success': False,
+        'message': str(error),
+        'reason': error.reason,
+        'retry_after': error.retry_after
+    }), 429, {'Retry-After': str(error.retry_after)}
+
 @app.route('/api/command', methods=['POST'])
 def add_command():
     """API endpoint to add command to queue"""
     try:
-        data = request.json
-        command = data.get('command', '').strip()
+        data = request.get_json(silent=True) or {}
+        command = data.get('command', '')
         source = data.get('source', 'api')
+        if request.headers.get('Idempotency-Key'):
+            data['idempotency_key'] = request.headers['Idempotency-Key']
         
-        if not command:
+        try:
+            record = get_api_interface().add_command(command, source, data)
+        except Throttled as e:
+            return throttled_response(e)
+        except CommandValidationError as e:
             return jsonify({
                 'success': False,
-                'message': 'Command is required'
+                'message': str(e)
             }), 400
         
-        success = api_interface.add_command(command, source)
-        
-        if success:
+        if record and record.get('duplicate'):
+            return jsonify({
+                'success': True,
+                'duplicate': True,
+                'message': 'Duplicate request: returning the original command',
+                'command': record['command'],
+                'id': record['id'],
+                'status_url': f"/api/command/{record['id']}",
+                'result': get_api_interface().results.get(record['id'])
+            })
+        elif record:
             return jsonify({
                 'success': True,
                 'message': 'Command added to queue successfully',
-                'command': command
+                'command': record['command'],
+                'id': record['id'],
+                'status_url': f"/api/command/{record['id']}",
+                **{field: record[field] for field in ('priority', 'not_before', 'every') if field in record}
             })
         else:
             return jsonify({
@@ -278,20 +650,192 @@ def add_command():
             'message': str(e)
         }), 500
 
+@app.route('/api/command/<command_id>', methods=['GET'])
+def get_command_result(command_id):
+    """Get the status/result of a command; ?wait=<seconds> long-polls until it finishes"""
+    try:
+        wait = float(request.args.get('wait', 0))
+    except ValueError:
+        return jsonify({'success': False, 'message': 'wait must be a number of seconds'}), 400
+    wait = min(max(wait, 0.0), miora_config.RESULT_MAX_WAIT)
+    
+    # Without a free stream slot the long-poll degrades to a plain lookup
+    if wait and stream_slots.acquire():
+        try:
+            entry = get_api_interface().results.wait(command_id, wait)
+        finally:
+            stream_slots.release()
+    else:
+        entry = get_api_interface().results.get(command_id)
+    if entry is None:
+        return jsonify({'success': False, 'message': f'Unknown or expired command id: {command_id}'}), 404
+    return jsonify({'success': True, **entry})
+
+@app.route('/api/command/<command_id>/events', methods=['GET'])
+def command_events(command_id):
+    """Server-sent events: the current status, then the result once the command finishes"""
+    results = get_api_interface().results
+    entry = results.get(command_id)
+    if entry is None:
+        return jsonify({'success': False, 'message': f'Unknown or expired command id: {command_id}'}), 404
+    
+    def events(entry):
+        yield f"event: status\ndata: {json.dumps(entry, ensure_ascii=False)}\n\n"
+        while not results.is_finished(entry):
+            entry = results.wait(command_id, miora_config.SSE_HEARTBEAT)
+            if entry is None:
+                yield f"event: expired\ndata: {json.dumps({'id': command_id})}\n\n"
+                return
+            if not results.is_finished(entry):
+                yield ": keepalive\n\n"
+        yield f"event: result\ndata: {json.dumps(entry, ensure_ascii=False)}\n\n"
+    
+    if results.is_finished(entry):
+        # Nothing to wait for, so no slot is needed
+        return Response(events(entry), mimetype='text/event-stream',
+                        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+    if not stream_slots.acquire():
+        return streams_full_response()
+    response = Response(stream_with_context(events(entry)), mimetype='text/event-stream',
+                        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+    response.call_on_close(stream_slots.release)
+    return response
+
+@app.route('/api/events', methods=['GET'])
+def live_events():
+    """Server-sent events for every handler execution plus periodic queue depth"""
+    api = get_api_interface()
+    api.start_events()
+    bus = api.events
+    after = bus.resume_point(request.headers.get('Last-Event-ID'))
+    first = MIORAEventBus.format_frame(after, api.queue_event())
+    if not stream_slots.acquire():
+        return streams_full_response()
+    
+    def stream(after):
+        bus.subscribe()
+        try:
+            yield "retry: 2000\n\n" + first
+            while True:
+                try:
+                    frames, after = bus.read(after, miora_config.SSE_HEARTBEAT)
+                except SlowConsumer as e:
+                    yield f"event: dropped\ndata: {json.dumps({'reason': str(e)})}\n\n"
+                    return
+                yield "".join(frames) if frames else ": keepalive\n\n"
+        finally:
+            bus.unsubscribe()
+    
+    response = Response(stream_with_context(stream(after)), mimetype='text/event-stream',
+                        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+    response.call_on_close(stream_slots.release)
+    return response
+
+NDJSON_MIMETYPES = ('application/x-ndjson', 'application/ndjson', 'application/jsonl', 'application/json-lines')
+
+@app.route('/api/commands', methods=['POST'])
+def add_commands():
+    """API endpoint to add a batch of commands (JSON array or NDJSON stream)"""
+    try:
+        source = request.args.get('source', 'api')
+        
+        if request.mimetype in NDJSON_MIMETYPES:
+            # Stream the body line by line instead of buffering it as one document
+            items = []
+            for line in request.stream:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    items.append(json.loads(line))
+                except ValueError:
+                    items.append(ValueError('Invalid JSON line'))
+                if len(items) > miora_config.BULK_MAX_ITEMS:
+                    break
+        else:
+            data = request.get_json(silent=True)
+            if isinstance(data, dict):
+                source = data.get('source', source)
+                data = data.get('commands')
+            if not isinstance(data, list):
+                return jsonify({
+                    'success': False,
+                    'message': 'Expected a JSON array of commands or an NDJSON body'
+                }), 400
+            items = data
+        
+        if len(items) > miora_config.BULK_MAX_ITEMS:
+            return jsonify({
+                'success': False,
+                'message': f'Batch exceeds {miora_config.BULK_MAX_ITEMS} commands'
+            }), 413
+        
+        try:
+            results = get_api_interface().add_commands(items, source)
+        except Throttled as e:
+            return throttled_response(e)
+        accepted = sum(1 for result in results if result['success'])
+        
+        return jsonify({
+            'success': accepted == len(results),
+            'accepted': accepted,
+            'rejected': len(results) - accepted,
+            'duplicates': sum(1 for result in results if result.get('duplicate')),
+            'results': results
+        }), (200 if accepted or not results else 400)
+        
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 500
+
+@app.route('/api/commands', methods=['GET'])
+def list_commands():
+    """List pending commands one cursor-paginated page at a time"""
+    try:
+        limit = min(max(request.args.get('limit', 100, type=int), 1), miora_config.LIST_MAX_LIMIT)
+        try:
+            commands, next_cursor = get_api_interface().queue.list_pending(request.args.get('cursor'), limit)
+        except ValueError:
+            return jsonify({
+                'success': False,
+                'message': 'Invalid cursor'
+            }), 400
+        
+        return jsonify({
+            'success': True,
+            'commands': commands,
+            'next_cursor': next_cursor
+        })
+        
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 500
+
+@app.route('/api/commands/types', methods=['GET'])
+def get_command_types():
+    """List supported commands and their parameter schemas"""
+    return jsonify({
+        'success': True,
+        'commands': [spec.to_dict() for spec in get_api_interface().registry.specs()]
+    })
+
 @app.route('/api/status', methods=['GET'])
 def get_status():
     """Get current status and queue information"""
     try:
-        # Read current commands
-        commands = []
-        if os.path.exists(api_interface.commands_file):
-            with open(api_interface.commands_file, 'r', encoding='utf-8') as f:
-                commands = json.load(f)
+        # Served from maintained counters; list commands via GET /api/commands
+        api = get_api_interface()
+        stats = api.queue.stats()
         
         return jsonify({
             'success': True,
-            'queue_size': len(commands),
-            'commands': commands,
+            'queue_size': stats['depth'],
+            'queue': stats,
+            'throttle': api.limiter.stats(),
             'timestamp': datetime.now().isoformat()
         })
         
@@ -301,14 +845,31 @@ def get_status():
             'message': str(e)
         }), 500
 
+@app.route('/api/schedules', methods=['GET'])
+def list_schedules():
+    """Delayed and recurring commands waiting in the handler's scheduler"""
+    entries = MIORAScheduler.read_entries()
+    return jsonify({'success': True, 'count': len(entries), 'schedules': entries})
+
+@app.route('/api/memory', methods=['GET'])
+def get_memory():
+    """Look up memory by key, key prefix or data_<ts> time range, one page at a time"""
+    status, body = get_api_interface().query_memory(request.query_string.decode('utf-8'), request.args.to_dict())
+    return jsonify(body), status
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """Prometheus metrics for the API process"""
+    return Response(METRICS.render(), content_type=METRICS_CONTENT_TYPE)
+
 @app.route('/api/clear', methods=['POST'])
 def clear_queue():
     """Clear the command queue"""
     try:
-        with open(api_interface.commands_file, 'w') as f:
-            json.dump([], f)
+        api = get_api_interface()
+        api.queue.clear()
         
-        api_interface.log_api_request("CLEAR_QUEUE", "api", True)
+        api.log_api_request("CLEAR_QUEUE", "api", True)
         
         return jsonify({
             'success': True,
@@ -325,8 +886,13 @@ if __name__ == '__main__':
     print("🌐 MIORA External Interface API Starting...")
     print("📱 Web Interface: http://localhost:5000")
     print("🔌 API Endpoint: http://localhost:5000/api/command")
+    print("📦 Bulk Endpoint: http://localhost:5000/api/commands")
+    print("🔎 Command Result: http://localhost:5000/api/command/<id>?wait=10")
     print("📊 Status Check: http://localhost:5000/api/status")
     print("🧹 Clear Queue: http://localhost:5000/api/clear")
+    print("📈 Metrics: http://localhost:5000/metrics")
+    print("📡 Live Events: http://localhost:5000/api/events")
     print("\nPress Ctrl+C to stop")
     
-    app.run(host='0.0.0.0', port=5000, debug=False)
+    # Each serving process (every pre-forked worker) receives its own events
+    serve(app, on_worker_start=lambda: get_api_interface().start_events())
@@ -0,0 +1,309 @@
+#!/usr/bin/env python3
+"""
+MIORA Memory Backup
+Backup memori inkremental (base + delta) terkompresi di thread latar, dengan alat restore
+"""
+
+import argparse
+import gzip
+import json
+import os
+import queue
+import sys
+import threading
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, Any, Optional
+
+import miora_config
+from miora_metrics import METRICS
+
+BACKUP_SECONDS = METRICS.histogram(
+    "miora_memory_backup_seconds", "Time to write one memory backup file", ("kind",))
+
+MANIFEST_NAME = "manifest.json"
+
+
+class MIORABackupEngine:
+    """Writes memory backups as a chain of a full base plus deltas.
+
+    A backup request only takes a view of the memory store under its lock
+    (references to all values for a base, to the values changed since the
+    previous backup for a delta); a background thread then decodes values
+    still in the record file, serializes and gzip-compresses it, so
+    MEMORY_BACKUP returns at once. A new base starts a chain after
+    MIORA_BACKUP_MAX_DELTAS deltas, when the deltas together touched more
+    keys than half the memory, and for the first backup of every process
+    (changes made before a restart are not tracked). Only the newest
+    MIORA_BACKUP_KEEP_CHAINS chains are kept.
+    """
+
+    def __init__(self, store, backup_dir: Optional[str] = None,
+                 on_done: Optional[Callable[[bool, str], None]] = None):
+        self.store = store
+        self.backup_dir = backup_dir or miora_config.BACKUP_DIR
+        self.on_done = on_done
+        self.max_deltas = miora_config.BACKUP_MAX_DELTAS
+        self.keep_chains = miora_config.BACKUP_KEEP_CHAINS
+        self.compress_level = miora_config.BACKUP_COMPRESS_LEVEL
+
+        os.makedirs(self.backup_dir, exist_ok=True)
+        self.manifest_file = os.path.join(self.backup_dir, MANIFEST_NAME)
+        self._entries = read_manifest(self.backup_dir)
+        self._need_base = True
+        self._lock = threading.Lock()
+        # Queued deltas whose base failed; they are skipped instead of written
+        self._discarded = set()
+        self._jobs: "queue.Queue[Optional[Dict[str, Any]]]" = queue.Queue()
+        self._thread = None
+
+    def _ensure_thread(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name="miora-memory-backup", daemon=True)
+            self._thread.start()
+
+    # ------------------------------------------------------------------
+    # Requests
+    # ------------------------------------------------------------------
+
+    def _chain_since_base(self) -> List[Dict[str, Any]]:
+        for index in range(len(self._entries) - 1, -1, -1):
+            if self._entries[index]["kind"] == "base":
+                return self._entries[index + 1:]
+        return []
+
+    def request(self, full: bool = False) -> str:
+        """Take a view of memory now and write it in the background; returns the backup file"""
+        with self._lock:
+            deltas = self._chain_since_base()
+            changed = sum(entry["keys"] for entry in deltas)
+            kind = "base" if (full or self._need_base or len(deltas) >= self.max_deltas
+                              or changed > len(self.store) // 2) else "delta"
+            view = self.store.backup_view(full=kind == "base")
+            self._need_base = False
+            seq = (self._entries[-1]["seq"] if self._entries else 0) + 1
+            created = time.time()
+            name = f"{kind}_{seq:08d}_{datetime.fromtimestamp(created).strftime('%Y%m%d-%H%M%S')}.json.gz"
+            # Reserve the sequence number before the background write
+            self._entries.append({"seq": seq, "kind": kind, "file": name, "created": created,
+                                  "keys": len(view) + len(view.deleted), "pending": True})
+        self._jobs.put({"seq": seq, "kind": kind, "file": name, "created": created, "view": view})
+        self._ensure_thread()
+        return os.path.join(self.backup_dir, name)
+
+    def export(self, path: str) -> str:
+        """Write a standalone full copy of memory to `path` in the background (gzip if it ends in .gz)"""
+        # A plain copy leaves the changed-key set of the chain untouched
+        self._jobs.put({"export": path, "view": self.store.backup_view(full=True, track=False),
+                        "created": time.time()})
+        self._ensure_thread()
+        return path
+
+    # ------------------------------------------------------------------
+    # Background writer
+    # ------------------------------------------------------------------
+
+    def _run(self):
+        while True:
+            job = self._jobs.get()
+            if job is None:
+                return
+            with self._lock:
+                discarded = job.get("seq") in self._discarded
+                self._discarded.discard(job.get("seq"))
+            if discarded:
+                job["view"].release()
+                self.store.mark_dirty(job["view"].keys() + job["view"].deleted)
+                if self.on_done is not None:
+                    self.on_done(False, f"Memory delta backup #{job['seq']} discarded: its base backup failed")
+                continue
+            try:
+                message = self._write_export(job) if "export" in job else self._write_backup(job)
+                success = True
+            except Exception as e:
+                message = f"Memory backup failed: {str(e)}"
+                success = False
+                job["view"].release()
+                if "export" not in job:
+                    self._abandon(job)
+            if self.on_done is not None:
+                self.on_done(success, message)
+
+    def _write_gzip(self, path: str, payload: Dict[str, Any]) -> int:
+        tmp_file = path + ".tmp"
+        with gzip.open(tmp_file, "wt", encoding="utf-8", compresslevel=self.compress_level) as f:
+            json.dump(payload, f, ensure_ascii=False, separators=(",", ":"))
+        with open(tmp_file, "rb") as f:
+            os.fsync(f.fileno())
+        os.replace(tmp_file, path)
+        return os.path.getsize(path)
+
+    def _write_backup(self, job: Dict[str, Any]) -> str:
+        started = time.perf_counter()
+        path = os.path.join(self.backup_dir, job["file"])
+        data = job["view"].resolve()
+        size = self._write_gzip(path, {"seq": job["seq"], "kind": job["kind"], "created": job["created"],
+                                       "set": data, "deleted": job["view"].deleted})
+        with self._lock:
+            for entry in self._entries:
+                if entry["seq"] == job["seq"]:
+                    entry.pop("pending", None)
+                    entry["bytes"] = size
+            self._prune_locked()
+            self._store_manifest_locked()
+        BACKUP_SECONDS.observe(time.perf_counter() - started, kind=job["kind"])
+        return f"Memory {job['kind']} backup #{job['seq']} written to {path} ({len(data)} keys, {size} bytes)"
+
+    def _write_export(self, job: Dict[str, Any]) -> str:
+        path = job["export"]
+        payload = {"timestamp": datetime.fromtimestamp(job["created"]).isoformat(),
+                   "backup_type": "full_memory", "data": job["view"].resolve()}
+        if path.endswith(".gz"):
+            self._write_gzip(path, payload)
+        else:
+            tmp_file = path + ".tmp"
+            with open(tmp_file, "w", encoding="utf-8") as f:
+                json.dump(payload, f, ensure_ascii=False)
+            os.replace(tmp_file, path)
+        return f"Memory backup saved to {path}"
+
+    def _abandon(self, job: Dict[str, Any]):
+        """Forget a failed backup; its changes go into the next one
+
+        Deltas already queued on top of a failed base would chain onto the
+        previous base and miss everything the failed base held, so they are
+        discarded too and the next backup starts a new chain. Deltas queued
+        behind a failed delta miss its changes until the next backup picks
+        them up; they are marked with "gap" so a restore cannot end there.
+        """
+        with self._lock:
+            dropped = {job["seq"]}
+            for entry in self._entries:
+                if entry["seq"] <= job["seq"]:
+                    continue
+                if entry["kind"] == "base" or not entry.get("pending"):
+                    break
+                if job["kind"] == "base":
+                    dropped.add(entry["seq"])
+                else:
+                    entry["gap"] = job["seq"]
+            if job["kind"] == "base":
+                self._need_base = True
+                self._discarded.update(dropped - {job["seq"]})
+            self._entries = [entry for entry in self._entries if entry["seq"] not in dropped]
+            # Under the engine lock, so no view is taken between the two steps
+            self.store.mark_dirty(job["view"].keys() + job["view"].deleted)
+
+    def _prune_locked(self):
+        bases = [index for index, entry in enumerate(self._entries) if entry["kind"] == "base"]
+        if len(bases) <= self.keep_chains:
+            return
+        cut = bases[-self.keep_chains]
+        for entry in self._entries[:cut]:
+            try:
+                os.remove(os.path.join(self.backup_dir, entry["file"]))
+            except OSError:
+                pass
+        self._entries = self._entries[cut:]
+
+    def _store_manifest_locked(self):
+        tmp_file = self.manifest_file + ".tmp"
+        with open(tmp_file, "w", encoding="utf-8") as f:
+            json.dump([entry for entry in self._entries if not entry.get("pending")], f, indent=2)
+        os.replace(tmp_file, self.manifest_file)
+
+    def close(self, timeout: float = 30.0):
+        """Finish queued backups"""
+        if self._thread is not None and self._thread.is_alive():
+            self._jobs.put(None)
+            self._thread.join(timeout)
+
+
+# ----------------------------------------------------------------------
+# Restore
+# ----------------------------------------------------------------------
+
+def read_manifest(backup_dir: str) -> List[Dict[str, Any]]:
+    """Chain entries in sequence order; rebuilt from the file names if the manifest is missing"""
+    try:
+        with open(os.path.join(backup_dir, MANIFEST_NAME), "r", encoding="utf-8") as f:
+            return sorted(json.load(f), key=lambda entry: entry["seq"])
+    except (OSError, ValueError, KeyError, TypeError):
+        pass
+    entries = []
+    try:
+        names = os.listdir(backup_dir)
+    except OSError:
+        return []
+    for name in names:
+        kind, _, rest = name.partition("_")
+        if kind in ("base", "delta") and name.endswith(".json.gz") and rest[:8].isdigit():
+            entries.append({"seq": int(rest[:8]), "kind": kind, "file": name,
+                            "created": os.path.getmtime(os.path.join(backup_dir, name))})
+    return sorted(entries, key=lambda entry: entry["seq"])
+
+
+def restore_chain(backup_dir: str, until_seq: Optional[int] = None,
+                  until_time: Optional[float] = None) -> Dict[str, Any]:
+    """Replay the newest base and its deltas up to a sequence number or time"""
+    entries = [entry for entry in read_manifest(backup_dir)
+               if (until_seq is None or entry["seq"] <= until_seq)
+               and (until_time is None or entry["created"] <= until_time)]
+    bases = [index for index, entry in enumerate(entries) if entry["kind"] == "base"]
+    if not bases:
+        raise ValueError(f"No base backup in {backup_dir} for the requested point")
+    if "gap" in entries[-1]:
+        raise ValueError(f"Backup #{entries[-1]['seq']} lacks the changes of failed backup "
+                         f"#{entries[-1]['gap']}; restore to an earlier or a later backup")
+
+    data: Dict[str, Any] = {}
+    for entry in entries[bases[-1]:]:
+        with gzip.open(os.path.join(backup_dir, entry["file"]), "rt", encoding="utf-8") as f:
+            payload = json.load(f)
+        if payload["kind"] == "base":
+            data = dict(payload["set"])
+        else:
+            data.update(payload["set"])
+            for key in payload["deleted"]:
+                data.pop(key, None)
+    return data
+
+
+def main():
+    parser = argparse.ArgumentParser(description="List or restore MIORA memory backups")
+    parser.add_argument("action", choices=["list", "restore"])
+    parser.add_argument("--dir", default=miora_config.BACKUP_DIR, help="backup directory")
+    parser.add_argument("--seq", type=int, help="restore up to this backup number")
+    parser.add_argument("--time", help="restore up to this ISO 8601 time")
+    parser.add_argument("--output", default=miora_config.MEMORY_FILE,
+                        help="memory file to write (default: the live memory file)")
+    args = parser.parse_args()
+
+    if args.action == "list":
+        for entry in read_manifest(args.dir):
+            created = datetime.fromtimestamp(entry["created"]).isoformat(timespec="seconds")
+            gap = f"  (misses failed #{entry['gap']})" if "gap" in entry else ""
+            print(f"#{entry['seq']:<6} {entry['kind']:<5} {created}  {entry.get('keys', '?'):>8} keys  "
+                  f"{entry.get('bytes', '?'):>10} bytes  {entry['file']}{gap}")
+        return
+
+    until_time = datetime.fromisoformat(args.time).timestamp() if args.time else None
+    try:
+        data = restore_chain(args.dir, args.seq, until_time)
+    except ValueError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+
+    tmp_file = args.output + ".tmp"
+    with open(tmp_file, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False)
+    os.replace(tmp_file, args.output)
+    # Logged updates would otherwise be replayed on top of the restored state
+    for wal_file in (args.output + ".wal", args.output + ".wal.old"):
+        if os.path.exists(wal_file):
+            os.remove(wal_file)
+    print(f"✅ Restored {len(data)} keys into {args.output} (stop the handler before restoring)")
+
+
+if __name__ == "__main__":
+    main()
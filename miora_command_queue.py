@@ -0,0 +1,642 @@
+#!/usr/bin/env python3
+"""
+MIORA Command Queue
+Antrian perintah append-only berbasis segment file dengan offset consumer
+"""
+
+import atexit
+import json
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Any, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows: only in-process locking is available
+    fcntl = None
+
+import miora_config
+from miora_metrics import METRICS
+from miora_wakeup import notify_wakeup
+
+# (segment number, byte offset after the record)
+Position = Tuple[int, int]
+
+
+class MIORACommandQueue:
+    """Durable append-only command queue shared by the API and the handler.
+
+    Producers append one JSON line per command to the active segment file
+    under an exclusive file lock, so enqueue cost does not depend on the
+    backlog size. The consumer keeps its read position in a separate offset
+    file and only moves it forward, which means producers never lose
+    commands to a concurrent clear.
+    """
+
+    SEGMENT_PREFIX = "segment_"
+    SEGMENT_SUFFIX = ".log"
+
+    def __init__(self, queue_dir: Optional[str] = None,
+                 segment_bytes: Optional[int] = None,
+                 fsync_interval: Optional[float] = None,
+                 fsync_batch: Optional[int] = None,
+                 sync_mode: Optional[str] = None,
+                 read_batch_size: Optional[int] = None):
+        self.queue_dir = queue_dir or miora_config.QUEUE_DIR
+        self.segment_bytes = segment_bytes or miora_config.QUEUE_SEGMENT_BYTES
+        self.fsync_interval = fsync_interval or miora_config.QUEUE_FSYNC_INTERVAL
+        self.fsync_batch = fsync_batch or miora_config.QUEUE_FSYNC_BATCH
+        self.sync_mode = sync_mode or miora_config.QUEUE_SYNC_MODE
+        self.read_batch_size = read_batch_size or miora_config.QUEUE_READ_BATCH
+
+        os.makedirs(self.queue_dir, exist_ok=True)
+        self.lock_file = os.path.join(self.queue_dir, ".lock")
+        self.offset_file = os.path.join(self.queue_dir, "consumer.offset")
+        self.stats_file = os.path.join(self.queue_dir, "stats.json")
+
+        self._thread_lock = threading.RLock()
+        self._sync_cond = threading.Condition()
+        self._pid = None
+        self._lock_fd = None
+        self._stats_fd = None
+        self._active_segment = None
+        self._active_fd = None
+        self._written_seq = 0
+        self._synced_seq = 0
+        self._flusher = None
+        self._closed = False
+
+        self._open_files()
+        atexit.register(self.close)
+
+    # ------------------------------------------------------------------
+    # File helpers
+    # ------------------------------------------------------------------
+
+    def _open_files(self):
+        """(Re)open per-process file descriptors, e.g. after a fork"""
+        self._pid = os.getpid()
+        self._lock_fd = os.open(self.lock_file, os.O_RDWR | os.O_CREAT, 0o644)
+        self._stats_fd = os.open(self.stats_file, os.O_RDWR | os.O_CREAT, 0o644)
+        self._active_segment = None
+        self._active_fd = None
+        self._flusher = None
+
+    def _check_pid(self):
+        """Make sure descriptors inherited over fork are not shared"""
+        if self._pid != os.getpid():
+            self._open_files()
+
+    @contextmanager
+    def _locked(self):
+        """Hold the in-process lock and the cross-process file lock"""
+        with self._thread_lock:
+            self._check_pid()
+            if fcntl:
+                fcntl.flock(self._lock_fd, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl:
+                    fcntl.flock(self._lock_fd, fcntl.LOCK_UN)
+
+    def _segment_path(self, number: int) -> str:
+        return os.path.join(self.queue_dir, f"{self.SEGMENT_PREFIX}{number:08d}{self.SEGMENT_SUFFIX}")
+
+    def _list_segments(self) -> List[int]:
+        segments = []
+        for name in os.listdir(self.queue_dir):
+            if name.startswith(self.SEGMENT_PREFIX) and name.endswith(self.SEGMENT_SUFFIX):
+                try:
+                    segments.append(int(name[len(self.SEGMENT_PREFIX):-len(self.SEGMENT_SUFFIX)]))
+                except ValueError:
+                    continue
+        return sorted(segments)
+
+    def _switch_segment(self, number: int):
+        """Make `number` the active segment (caller holds the lock)"""
+        if self._active_fd is not None:
+            os.fsync(self._active_fd)
+            os.close(self._active_fd)
+        self._active_segment = number
+        self._active_fd = os.open(self._segment_path(number),
+                                  os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+
+    def _writable_fd(self, incoming: int) -> int:
+        """Return the fd of the segment the next write goes to (caller holds the lock)"""
+        if self._active_segment is None or not os.path.exists(self._segment_path(self._active_segment)):
+            segments = self._list_segments()
+            if segments:
+                number = segments[-1]
+            else:
+                number = max(1, self.read_offset()[0])
+            self._switch_segment(number)
+
+        # Another producer may have rolled over to a newer segment
+        while os.path.exists(self._segment_path(self._active_segment + 1)):
+            self._switch_segment(self._active_segment + 1)
+
+        size = os.fstat(self._active_fd).st_size
+        if size > 0 and size + incoming > self.segment_bytes:
+            self._switch_segment(self._active_segment + 1)
+        return self._active_fd
+
+    @staticmethod
+    def _write_all(fd: int, data: bytes):
+        view = memoryview(data)
+        while view:
+            written = os.write(fd, view)
+            view = view[written:]
+
+    # ------------------------------------------------------------------
+    # Producer side
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def prepare_record(record: Dict[str, Any]) -> Dict[str, Any]:
+        """Fill in the queue metadata of a command record"""
+        prepared = dict(record)
+        prepared.setdefault("id", uuid.uuid4().hex)
+        prepared.setdefault("source", "api")
+        prepared.setdefault("enqueued_at", time.time())
+        return prepared
+
+    @staticmethod
+    def encode_record(record: Dict[str, Any]) -> bytes:
+        return (json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n").encode("utf-8")
+
+    def append(self, record: Dict[str, Any]) -> Dict[str, Any]:
+        """Append a single command record to the queue"""
+        return self.append_many([record])[0]
+
+    def append_many(self, records: List[Dict[str, Any]], durable: bool = False) -> List[Dict[str, Any]]:
+        """Append several command records with a single write
+
+        With durable=True the call returns only after the write is fsynced,
+        regardless of the configured sync mode.
+        """
+        prepared = [self.prepare_record(record) for record in records]
+        if not prepared:
+            return prepared
+        data = b"".join(self.encode_record(record) for record in prepared)
+
+        with self._locked():
+            # Load counters first so a rebuild cannot count this batch twice
+            stats = self._load_stats_locked()
+            self._write_all(self._writable_fd(len(data)), data)
+            self._count_enqueued_locked(stats, prepared)
+            self._written_seq += 1
+            seq = self._written_seq
+
+        self._after_write(seq, durable)
+        return prepared
+
+    def import_legacy_file(self, path: Optional[str] = None) -> int:
+        """Move commands from a legacy commands.json list into the queue"""
+        path = path or miora_config.LEGACY_COMMANDS_FILE
+        try:
+            # "[]" is what an empty legacy queue looks like
+            if os.path.getsize(path) <= 2:
+                return 0
+        except OSError:
+            return 0
+
+        with self._locked():
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    commands = json.load(f)
+            except (OSError, ValueError):
+                # Missing, or still being written by an editor
+                return 0
+
+            if not isinstance(commands, list) or not commands:
+                return 0
+
+            records = []
+            for command in commands:
+                if isinstance(command, dict):
+                    records.append(self.prepare_record(command))
+                else:
+                    records.append(self.prepare_record({"command": str(command), "source": "file"}))
+
+            data = b"".join(self.encode_record(record) for record in records)
+            stats = self._load_stats_locked()
+            self._write_all(self._writable_fd(len(data)), data)
+            self._count_enqueued_locked(stats, records)
+            self._written_seq += 1
+            seq = self._written_seq
+
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump([], f)
+
+        self._after_write(seq)
+        return len(records)
+
+    # ------------------------------------------------------------------
+    # Batched fsync
+    # ------------------------------------------------------------------
+
+    def _after_write(self, seq: int, durable: bool = False):
+        notify_wakeup()
+        if self.sync_mode == "none" and not durable:
+            return
+        if durable or self.sync_mode == "always":
+            self.wait_synced(seq)
+            return
+        self._ensure_flusher()
+        with self._sync_cond:
+            if seq - self._synced_seq >= self.fsync_batch:
+                self._sync_cond.notify_all()
+
+    def wait_synced(self, seq: Optional[int] = None):
+        """Block until a flush covers write `seq` (default: every write so far)"""
+        if seq is None:
+            seq = self._written_seq
+        self._ensure_flusher()
+        with self._sync_cond:
+            # Group commit: one fsync releases every writer waiting here
+            self._sync_cond.notify_all()
+            while self._synced_seq < seq and not self._closed:
+                self._sync_cond.wait(self.fsync_interval)
+
+    def _ensure_flusher(self):
+        if self._flusher is not None and self._flusher.is_alive():
+            return
+        with self._thread_lock:
+            if self._flusher is None or not self._flusher.is_alive():
+                self._flusher = threading.Thread(target=self._flush_loop,
+                                                 name="miora-queue-fsync", daemon=True)
+                self._flusher.start()
+
+    def _flush_loop(self):
+        while not self._closed:
+            with self._sync_cond:
+                self._sync_cond.wait(self.fsync_interval)
+            self.sync()
+
+    def sync(self):
+        """Flush appended records to stable storage"""
+        with self._thread_lock:
+            seq = self._written_seq
+            if seq == self._synced_seq or self._active_fd is None or self._pid != os.getpid():
+                return
+            fd = os.dup(self._active_fd)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+        with self._sync_cond:
+            self._synced_seq = max(self._synced_seq, seq)
+            self._sync_cond.notify_all()
+
+    def close(self):
+        """Flush pending writes and release file descriptors"""
+        if self._closed:
+            return
+        try:
+            self.sync()
+        except OSError:
+            pass
+        self._closed = True
+        with self._sync_cond:
+            self._sync_cond.notify_all()
+        with self._thread_lock:
+            if self._pid == os.getpid():
+                for fd in (self._active_fd, self._stats_fd, self._lock_fd):
+                    if fd is not None:
+                        os.close(fd)
+            self._active_fd = None
+            self._stats_fd = None
+            self._lock_fd = None
+
+    # ------------------------------------------------------------------
+    # Consumer side
+    # ------------------------------------------------------------------
+
+    def read_offset(self) -> Position:
+        """Return the committed consumer position"""
+        try:
+            with open(self.offset_file, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            return int(data["segment"]), int(data["offset"])
+        except (OSError, ValueError, KeyError, TypeError):
+            segments = self._list_segments()
+            return (segments[0] if segments else 1), 0
+
+    def _write_offset(self, position: Position):
+        tmp_file = self.offset_file + ".tmp"
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump({"segment": position[0], "offset": position[1]}, f)
+        os.replace(tmp_file, self.offset_file)
+
+    @staticmethod
+    def decode_record(line: bytes) -> Dict[str, Any]:
+        try:
+            record = json.loads(line)
+            if isinstance(record, dict) and "command" in record:
+                return record
+        except ValueError:
+            pass
+        return {"id": None, "command": line.decode('utf-8', 'replace').strip(),
+                "source": "queue", "corrupt": True}
+
+    def read_from(self, position: Position, max_items: int) -> List[Tuple[Dict[str, Any], Position]]:
+        """Read up to `max_items` records starting at `position`"""
+        results = []
+        segment, offset = position
+        while len(results) < max_items:
+            # A segment is sealed once its successor exists; check before reading
+            sealed = os.path.exists(self._segment_path(segment + 1))
+            try:
+                f = open(self._segment_path(segment), 'rb')
+            except FileNotFoundError:
+                if not sealed:
+                    break
+                segment, offset = segment + 1, 0
+                continue
+
+            with f:
+                f.seek(offset)
+                for line in f:
+                    if not line.endswith(b"\n"):
+                        # Record still being written by a producer
+                        break
+                    offset += len(line)
+                    if line.strip():
+                        results.append((self.decode_record(line), (segment, offset)))
+                    if len(results) >= max_items:
+                        return results
+
+            if not sealed:
+                break
+            segment, offset = segment + 1, 0
+        return results
+
+    def read_batch(self, max_items: Optional[int] = None) -> List[Tuple[Dict[str, Any], Position]]:
+        """Read the next batch of pending records without consuming them"""
+        return self.read_from(self.read_offset(), max_items or self.read_batch_size)
+
+    def commit(self, position: Position, records: Optional[List[Dict[str, Any]]] = None):
+        """Mark every record up to `position` as consumed
+
+        `records` are the consumed records, used to keep the per-type
+        counters exact; without them the counters are rebuilt by a scan.
+        """
+        with self._locked():
+            if self._commit_locked(position):
+                if records is None:
+                    self._rebuild_stats_locked()
+                else:
+                    self._count_consumed_locked(records)
+
+    def _commit_locked(self, position: Position) -> bool:
+        current = self.read_offset()
+        if tuple(position) <= current:
+            return False
+        self._write_offset(position)
+        # Drop segments the consumer has fully moved past
+        for number in range(current[0], position[0]):
+            try:
+                os.remove(self._segment_path(number))
+            except FileNotFoundError:
+                pass
+        return True
+
+    def clear(self):
+        """Discard every pending command"""
+        with self._locked():
+            segments = self._list_segments()
+            if not segments:
+                return
+            last = segments[-1]
+            self._commit_locked((last, os.path.getsize(self._segment_path(last))))
+            stats = self._load_stats_locked()
+            stats["consumed"] = stats["enqueued"]
+            stats["pending_by_type"] = {}
+            self._store_stats_locked(stats)
+
+    # ------------------------------------------------------------------
+    # Statistics and listing
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def record_type(record: Dict[str, Any]) -> str:
+        if record.get("type"):
+            return record["type"]
+        command = str(record.get("command", ""))
+        return command.split(':', 1)[0].strip().upper() or "UNKNOWN"
+
+    def _load_stats_locked(self) -> Dict[str, Any]:
+        try:
+            os.lseek(self._stats_fd, 0, os.SEEK_SET)
+            raw = os.read(self._stats_fd, 1024 * 1024)
+            stats = json.loads(raw) if raw else None
+        except (OSError, ValueError):
+            stats = None
+        if not isinstance(stats, dict) or "enqueued" not in stats:
+            stats = self._rebuild_stats_locked()
+        return stats
+
+    def _store_stats_locked(self, stats: Dict[str, Any]):
+        data = json.dumps(stats, separators=(",", ":")).encode("utf-8")
+        os.lseek(self._stats_fd, 0, os.SEEK_SET)
+        self._write_all(self._stats_fd, data)
+        os.ftruncate(self._stats_fd, len(data))
+
+    def _rebuild_stats_locked(self) -> Dict[str, Any]:
+        """Recount pending records (after a crash or an unknown commit)"""
+        pending_by_type: Dict[str, int] = {}
+        total = 0
+        for record, _ in self.read_from(self.read_offset(), float('inf')):
+            record_type = self.record_type(record)
+            pending_by_type[record_type] = pending_by_type.get(record_type, 0) + 1
+            total += 1
+        stats = {"enqueued": total, "consumed": 0, "pending_by_type": pending_by_type}
+        self._store_stats_locked(stats)
+        return stats
+
+    def _count_enqueued_locked(self, stats: Dict[str, Any], records: List[Dict[str, Any]]):
+        by_type = stats["pending_by_type"]
+        for record in records:
+            record_type = self.record_type(record)
+            by_type[record_type] = by_type.get(record_type, 0) + 1
+        stats["enqueued"] += len(records)
+        self._store_stats_locked(stats)
+
+    def _count_consumed_locked(self, records: List[Dict[str, Any]]):
+        stats = self._load_stats_locked()
+        by_type = stats["pending_by_type"]
+        for record in records:
+            record_type = self.record_type(record)
+            remaining = by_type.get(record_type, 0) - 1
+            if remaining > 0:
+                by_type[record_type] = remaining
+            else:
+                by_type.pop(record_type, None)
+        stats["consumed"] = min(stats["enqueued"], stats["consumed"] + len(records))
+        self._store_stats_locked(stats)
+
+    def stats(self) -> Dict[str, Any]:
+        """Queue depth, oldest item age and per-type counts from maintained counters"""
+        with self._locked():
+            stats = self._load_stats_locked()
+            position = self.read_offset()
+        oldest = self.read_from(position, 1)
+        oldest_at = oldest[0][0].get("enqueued_at") if oldest else None
+        return {
+            "depth": max(0, stats["enqueued"] - stats["consumed"]),
+            "enqueued_total": stats["enqueued"],
+            "consumed_total": stats["consumed"],
+            "by_type": dict(stats["pending_by_type"]),
+            "oldest_enqueued_at": oldest_at,
+            "oldest_age_seconds": round(time.time() - oldest_at, 3) if oldest_at else 0.0
+        }
+
+    @staticmethod
+    def encode_cursor(position: Position) -> str:
+        return f"{position[0]}-{position[1]}"
+
+    @staticmethod
+    def decode_cursor(cursor: str) -> Position:
+        """Parse a cursor from list_pending; raises ValueError if malformed"""
+        segment, offset = cursor.split("-", 1)
+        return int(segment), int(offset)
+
+    def list_pending(self, cursor: Optional[str] = None, limit: int = 100) -> tuple[List[Dict[str, Any]], Optional[str]]:
+        """Return one page of pending records and the cursor of the next page"""
+        committed = self.read_offset()
+        position = committed
+        if cursor:
+            # Pages that were consumed in the meantime start at the committed offset
+            position = max(committed, self.decode_cursor(cursor))
+        entries = self.read_from(position, limit)
+        next_cursor = self.encode_cursor(entries[-1][1]) if len(entries) == limit else None
+        return [record for record, _ in entries], next_cursor
+
+    def register_metrics(self, registry=None):
+        """Expose queue depth, oldest age and per-type counts as gauges"""
+        registry = registry or METRICS
+        registry.gauge("miora_queue_depth", "Commands waiting in the queue",
+                       callback=lambda: self.stats()["depth"])
+        registry.gauge("miora_queue_oldest_age_seconds", "Age of the oldest pending command",
+                       callback=lambda: self.stats()["oldest_age_seconds"])
+        registry.gauge("miora_queue_pending", "Pending commands per type", ("type",),
+                       callback=lambda: {(t,): n for t, n in self.stats()["by_type"].items()})
+
+    def pending(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Return pending records without consuming them"""
+        records = self.read_from(self.read_offset(), limit or float('inf'))
+        return [record for record, _ in records]
+
+
+class MIORAGroupWriter:
+    """Coalesces concurrent enqueue calls into one queue write.
+
+    Request threads hand their records to a single writer thread and wait
+    until the batch containing them has been written, so under load many
+    requests share one lock acquisition and one write instead of
+    contending for the queue lock one by one.
+    """
+
+    def __init__(self, write: Callable[[List[Dict[str, Any]]], None]):
+        self.write = write
+        self._pending: List[Tuple[List[Dict[str, Any]], "_GroupWaiter"]] = []
+        self._cond = threading.Condition()
+        self._thread = None
+        self._pid = None
+
+    def _ensure_thread(self):
+        # Threads do not survive fork, so each pre-forked worker starts its own
+        if self._thread is not None and self._pid == os.getpid():
+            return
+        with self._cond:
+            if self._thread is None or self._pid != os.getpid():
+                self._pid = os.getpid()
+                self._pending = []
+                self._thread = threading.Thread(target=self._run, name="miora-queue-writer", daemon=True)
+                self._thread.start()
+
+    def submit(self, records: List[Dict[str, Any]]):
+        """Write records as part of the next batch; raises whatever the write raised"""
+        self._ensure_thread()
+        waiter = _GroupWaiter()
+        with self._cond:
+            self._pending.append((records, waiter))
+            self._cond.notify()
+        waiter.event.wait()
+        if waiter.error is not None:
+            raise waiter.error
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._pending:
+                    self._cond.wait()
+                batch, self._pending = self._pending, []
+            error = None
+            try:
+                self.write([record for records, _ in batch for record in records])
+            except Exception as e:
+                error = e
+            for _, waiter in batch:
+                waiter.error = error
+                waiter.event.set()
+
+
+class _GroupWaiter:
+    __slots__ = ("event", "error")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.error = None
+
+
+class MIORAConsumerCheckpoint:
+    """Commits a read batch in small steps while its commands finish.
+
+    Commands of one batch finish out of order across worker pools, but a
+    queue can only commit a contiguous prefix. The finished prefix is
+    committed after `batch_size` more commands finished or `interval`
+    seconds passed, so a crash or restart re-executes at most that many
+    finished commands instead of the whole batch.
+    """
+
+    def __init__(self, commands: List[Tuple[Dict[str, Any], Any]],
+                 commit: Callable[[Any, List[Dict[str, Any]]], None],
+                 batch_size: Optional[int] = None,
+                 interval: Optional[float] = None):
+        self.commands = commands
+        self.commit = commit
+        self.batch_size = max(1, batch_size or miora_config.CHECKPOINT_BATCH)
+        self.interval = miora_config.CHECKPOINT_INTERVAL if interval is None else interval
+
+        self._done = [False] * len(commands)
+        self._finished_to = 0
+        self._committed_to = 0
+        self._last_commit = time.monotonic()
+        self._lock = threading.Lock()
+
+    def done(self, index: int):
+        """Mark command `index` of the batch as finished"""
+        with self._lock:
+            self._done[index] = True
+            while self._finished_to < len(self._done) and self._done[self._finished_to]:
+                self._finished_to += 1
+            if (self._finished_to - self._committed_to >= self.batch_size
+                    or time.monotonic() - self._last_commit >= self.interval):
+                self._commit_locked()
+
+    def flush(self):
+        """Commit the finished prefix now"""
+        with self._lock:
+            self._commit_locked()
+
+    def _commit_locked(self):
+        if self._finished_to > self._committed_to:
+            self.commit(self.commands[self._finished_to - 1][1],
+                        [record for record, _ in self.commands[self._committed_to:self._finished_to]])
+            self._committed_to = self._finished_to
+        self._last_commit = time.monotonic()
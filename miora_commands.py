@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+MIORA Command Registry
+Registry deklaratif perintah gateway dengan skema parameter dan validasi
+"""
+
+import re
+from typing import Dict, List, Any, Optional, Tuple
+
+# Parameter schemas understood by CommandSpec
+PARAM_NONE = "none"
+PARAM_TEXT = "text"
+PARAM_OPTIONAL_TEXT = "optional_text"
+PARAM_FILENAME = "filename"
+PARAM_OPTIONAL_FILENAME = "optional_filename"
+PARAM_MODULE = "module_name"
+
+_MODULE_NAME = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*(\.[A-Za-z_][A-Za-z0-9_]*)*$")
+
+MAX_PARAMETER_LENGTH = 100000
+
+
+class CommandValidationError(ValueError):
+    """Raised when a command is unknown or its parameters do not match the schema"""
+
+
+class CommandFailed(Exception):
+    """Raised by a command handler when the command did not do what it was asked to"""
+
+
+class CommandSpec:
+    """Declaration of one command type"""
+
+    def __init__(self, name: str, handler: str, params: str = PARAM_TEXT,
+                 concurrency: str = "parallel", description: str = "", max_length: int = MAX_PARAMETER_LENGTH,
+                 choices: Optional[Tuple[str, ...]] = None):
+        self.name = name
+        self.handler = handler
+        self.params = params
+        self.concurrency = concurrency
+        self.description = description
+        self.max_length = max_length
+        # Accepted values of a (case-insensitive) keyword parameter
+        self.choices = choices
+
+    def validate(self, parameters: str) -> str:
+        """Check parameters against the schema and return them normalized"""
+        parameters = parameters.strip()
+
+        if len(parameters) > self.max_length:
+            raise CommandValidationError(f"{self.name} parameter exceeds {self.max_length} characters")
+
+        if self.params == PARAM_NONE:
+            if parameters:
+                raise CommandValidationError(f"{self.name} takes no parameters")
+        elif self.params in (PARAM_TEXT, PARAM_FILENAME, PARAM_MODULE) and not parameters:
+            raise CommandValidationError(f"{self.name} requires a parameter")
+
+        if self.params in (PARAM_FILENAME, PARAM_OPTIONAL_FILENAME) and "\0" in parameters:
+            raise CommandValidationError(f"{self.name} filename contains a NUL byte")
+
+        if self.params == PARAM_MODULE and not _MODULE_NAME.match(parameters):
+            raise CommandValidationError(f"Invalid module name: {parameters}")
+
+        if self.choices and parameters:
+            parameters = parameters.lower()
+            if parameters not in self.choices:
+                raise CommandValidationError(f"{self.name} parameter must be one of: {', '.join(self.choices)}")
+
+        return parameters
+
+    def to_dict(self) -> Dict[str, Any]:
+        spec = {"name": self.name, "params": self.params,
+                "concurrency": self.concurrency, "description": self.description}
+        if self.choices:
+            spec["choices"] = list(self.choices)
+        return spec
+
+
+class MIORACommandRegistry:
+    """Maps command types to their specs for O(1) validation and dispatch"""
+
+    def __init__(self):
+        self._specs: Dict[str, CommandSpec] = {}
+
+    def register(self, spec: CommandSpec):
+        self._specs[spec.name] = spec
+
+    def get(self, name: str) -> Optional[CommandSpec]:
+        return self._specs.get(name)
+
+    def names(self) -> List[str]:
+        return list(self._specs)
+
+    def specs(self) -> List[CommandSpec]:
+        return list(self._specs.values())
+
+    def concurrency_map(self) -> Dict[str, str]:
+        return {name: spec.concurrency for name, spec in self._specs.items()}
+
+    @staticmethod
+    def split(command_text: str) -> tuple[str, str]:
+        """Split a command into its type and raw parameters"""
+        command_text = command_text.strip()
+
+        # Handle commands without parameters
+        if ':' not in command_text:
+            return command_text.upper(), ""
+
+        # Parse command with parameters
+        parts = command_text.split(':', 1)
+        return parts[0].strip().upper(), parts[1].strip()
+
+    def parse(self, command_text: Any) -> Dict[str, str]:
+        """Parse and validate a command string into {"type", "params"}"""
+        if not isinstance(command_text, str) or not command_text.strip():
+            raise CommandValidationError("Command is required")
+
+        command_type, parameters = self.split(command_text)
+        spec = self._specs.get(command_type)
+        if spec is None:
+            raise CommandValidationError(f"Unknown command: {command_type}")
+
+        return {"type": command_type, "params": spec.validate(parameters)}
+
+
+def build_default_registry() -> MIORACommandRegistry:
+    """Registry with every built-in gateway command"""
+    registry = MIORACommandRegistry()
+    for spec in [
+        CommandSpec("PRINT", "execute_print", PARAM_TEXT, "parallel",
+                    "Print message to console"),
+        CommandSpec("CREATE_FILE", "execute_create_file", PARAM_FILENAME, "parallel",
+                    "Create a new file"),
+        CommandSpec("SPEAK_NOW", "execute_speak_now", PARAM_TEXT, "tts",
+                    "Text-to-speech", max_length=5000),
+        CommandSpec("VOICE_SPEAK", "execute_speak_now", PARAM_TEXT, "tts",
+                    "Same as SPEAK_NOW", max_length=5000),
+        CommandSpec("UPDATE_MEMORY", "execute_update_memory", PARAM_TEXT, "memory",
+                    "Update memory (key=value or free text)"),
+        CommandSpec("UPDATE_BRAIN", "execute_update_brain", PARAM_TEXT, "memory",
+                    "Update brain knowledge"),
+        CommandSpec("SET_MODE", "execute_set_mode", PARAM_TEXT, "memory",
+                    "Set operational mode", max_length=200),
+        CommandSpec("MEMORY_BACKUP", "execute_memory_backup", PARAM_OPTIONAL_FILENAME, "memory",
+                    "Backup memory"),
+        CommandSpec("RUN_MODULE", "execute_run_module", PARAM_MODULE, "module",
+                    "Execute Python module"),
+        CommandSpec("LOAD_SCRIPT", "execute_load_script", PARAM_OPTIONAL_TEXT, "parallel",
+                    "Load a script (not implemented yet)"),
+        CommandSpec("CANCEL_SCHEDULE", "execute_cancel_schedule", PARAM_TEXT, "parallel",
+                    "Cancel a delayed or recurring command by its id"),
+        CommandSpec("RESTART_SYSTEM", "execute_restart_system", PARAM_OPTIONAL_TEXT, "system",
+                    "Restart MIORA (hot: reload code in place, hard: restart the process)",
+                    choices=("hot", "hard")),
+    ]:
+        registry.register(spec)
+    return registry
+
+
+# Shared by the command handler and the API
+COMMAND_REGISTRY = build_default_registry()
@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+MIORA Gateway Configuration
+Konfigurasi gateway yang dapat diubah melalui environment variable
+"""
+
+import os
+
+
+def env_str(name: str, default: str) -> str:
+    """Read a string setting from the environment"""
+    value = os.environ.get(name)
+    return value if value not in (None, "") else default
+
+
+def env_int(name: str, default: int) -> int:
+    """Read an integer setting from the environment"""
+    try:
+        return int(os.environ.get(name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+def env_float(name: str, default: float) -> float:
+    """Read a float setting from the environment"""
+    try:
+        return float(os.environ.get(name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+def env_bool(name: str, default: bool) -> bool:
+    """Read a boolean setting from the environment"""
+    value = os.environ.get(name)
+    if value in (None, ""):
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+# Command queue
+LEGACY_COMMANDS_FILE = env_str("MIORA_COMMANDS_FILE", "commands.json")
+QUEUE_DIR = env_str("MIORA_QUEUE_DIR", "command_queue")
+QUEUE_SEGMENT_BYTES = env_int("MIORA_QUEUE_SEGMENT_BYTES", 16 * 1024 * 1024)
+QUEUE_FSYNC_INTERVAL = env_float("MIORA_QUEUE_FSYNC_INTERVAL", 0.05)
+QUEUE_FSYNC_BATCH = env_int("MIORA_QUEUE_FSYNC_BATCH", 256)
+QUEUE_SYNC_MODE = env_str("MIORA_QUEUE_SYNC_MODE", "batch")
+QUEUE_READ_BATCH = env_int("MIORA_QUEUE_READ_BATCH", 1000)
+QUEUE_BACKEND = env_str("MIORA_QUEUE_BACKEND", "segment")  # segment | sqlite
+QUEUE_DB_FILE = env_str("MIORA_QUEUE_DB_FILE", "command_queue.db")
+QUEUE_SQLITE_JOURNAL_MODE = env_str("MIORA_QUEUE_SQLITE_JOURNAL_MODE", "wal")
+QUEUE_LEASE_SECONDS = env_float("MIORA_QUEUE_LEASE_SECONDS", 30.0)
+QUEUE_MAX_ATTEMPTS = env_int("MIORA_QUEUE_MAX_ATTEMPTS", 5)
+
+# Priority lanes and scheduled commands
+LANE_WEIGHT_HIGH = env_int("MIORA_LANE_WEIGHT_HIGH", 8)
+LANE_WEIGHT_NORMAL = env_int("MIORA_LANE_WEIGHT_NORMAL", 4)
+LANE_WEIGHT_LOW = env_int("MIORA_LANE_WEIGHT_LOW", 1)
+# Records per lane batch: an urgent command waits behind at most this many
+LANE_BATCH = env_int("MIORA_LANE_BATCH", 64)
+SCHEDULE_FILE = env_str("MIORA_SCHEDULE_FILE", "miora_schedule.json")
+SCHEDULE_MIN_INTERVAL = env_float("MIORA_SCHEDULE_MIN_INTERVAL", 1.0)
+
+# Command handler
+POLL_INTERVAL = env_float("MIORA_POLL_INTERVAL", 5.0)
+COMMAND_DELAY = env_float("MIORA_COMMAND_DELAY", 0.0)
+WAKEUP_ENABLED = env_bool("MIORA_WAKEUP_ENABLED", True)
+WAKEUP_HOST = env_str("MIORA_WAKEUP_HOST", "127.0.0.1")
+WAKEUP_PORT = env_int("MIORA_WAKEUP_PORT", 5051)
+CHECKPOINT_BATCH = env_int("MIORA_CHECKPOINT_BATCH", 32)
+CHECKPOINT_INTERVAL = env_float("MIORA_CHECKPOINT_INTERVAL", 0.5)
+RESTART_MODE = env_str("MIORA_RESTART_MODE", "hot")  # hot | hard
+
+# Executor worker counts (ordered classes always use a single worker)
+WORKERS_PARALLEL = env_int("MIORA_WORKERS_PARALLEL", os.cpu_count() or 4)
+WORKERS_MODULE = env_int("MIORA_WORKERS_MODULE", os.cpu_count() or 4)
+
+# Memory store
+MEMORY_FILE = env_str("MIORA_MEMORY_FILE", "miora_memory.json")
+MEMORY_FORMAT = env_str("MIORA_MEMORY_FORMAT", "json")  # json | records
+MEMORY_SNAPSHOT_INTERVAL = env_float("MIORA_MEMORY_SNAPSHOT_INTERVAL", 5.0)
+MEMORY_SNAPSHOT_OPS = env_int("MIORA_MEMORY_SNAPSHOT_OPS", 10000)
+MEMORY_SYNC_MODE = env_str("MIORA_MEMORY_SYNC_MODE", "batch")  # batch | always | none
+
+# Memory backups
+BACKUP_DIR = env_str("MIORA_BACKUP_DIR", "memory_backups")
+BACKUP_MAX_DELTAS = env_int("MIORA_BACKUP_MAX_DELTAS", 20)
+BACKUP_KEEP_CHAINS = env_int("MIORA_BACKUP_KEEP_CHAINS", 3)
+BACKUP_COMPRESS_LEVEL = env_int("MIORA_BACKUP_COMPRESS_LEVEL", 6)
+
+# Text-to-speech
+TTS_BACKEND = env_str("MIORA_TTS_BACKEND", "auto")
+TTS_VOICE = env_str("MIORA_TTS_VOICE", "")
+TTS_CACHE_ENTRIES = env_int("MIORA_TTS_CACHE_ENTRIES", 256)
+TTS_CACHE_BYTES = env_int("MIORA_TTS_CACHE_BYTES", 64 * 1024 * 1024)
+TTS_QUEUE_SIZE = env_int("MIORA_TTS_QUEUE_SIZE", 1000)
+TTS_OUTPUT_FILE = env_str("MIORA_TTS_OUTPUT_FILE", "tts_output.jsonl")
+
+# RUN_MODULE execution
+MODULE_MODE = env_str("MIORA_MODULE_MODE", "process")
+MODULE_TIMEOUT = env_float("MIORA_MODULE_TIMEOUT", 60.0)
+MODULE_MEMORY_LIMIT_MB = env_int("MIORA_MODULE_MEMORY_LIMIT_MB", 0)
+
+# API
+BULK_MAX_ITEMS = env_int("MIORA_BULK_MAX_ITEMS", 100000)
+
+# Rate limiting and backpressure (0 disables a limit)
+RATE_LIMIT_PER_SOURCE = env_float("MIORA_RATE_LIMIT_PER_SOURCE", 0.0)  # 0 = unlimited
+RATE_LIMIT_BURST = env_float("MIORA_RATE_LIMIT_BURST", 200.0)
+RATE_LIMIT_OVERRIDES = env_str("MIORA_RATE_LIMIT_OVERRIDES", "")  # e.g. "monitor=5,batch=1000"
+QUEUE_HIGH_WATERMARK = env_int("MIORA_QUEUE_HIGH_WATERMARK", 100000)
+QUEUE_LOW_WATERMARK = env_int("MIORA_QUEUE_LOW_WATERMARK", 80000)
+BACKPRESSURE_CHECK_INTERVAL = env_float("MIORA_BACKPRESSURE_CHECK_INTERVAL", 0.5)
+BACKPRESSURE_RETRY_AFTER = env_float("MIORA_BACKPRESSURE_RETRY_AFTER", 5.0)
+
+# Logging
+HANDLER_LOG_FILE = env_str("MIORA_HANDLER_LOG_FILE", "external_command_log.jsonl")
+API_LOG_FILE = env_str("MIORA_API_LOG_FILE", "api_command_log.jsonl")
+LOG_BUFFER_SIZE = env_int("MIORA_LOG_BUFFER_SIZE", 10000)
+LOG_FLUSH_INTERVAL = env_float("MIORA_LOG_FLUSH_INTERVAL", 0.2)
+LOG_FLUSH_BATCH = env_int("MIORA_LOG_FLUSH_BATCH", 1000)
+LOG_ROTATE_BYTES = env_int("MIORA_LOG_ROTATE_BYTES", 50 * 1024 * 1024)
+LOG_ROTATE_INTERVAL = env_float("MIORA_LOG_ROTATE_INTERVAL", 0)
+LOG_BACKUP_COUNT = env_int("MIORA_LOG_BACKUP_COUNT", 5)
+LOG_POLICY = env_str("MIORA_LOG_POLICY", "block")
+LOG_ECHO = env_bool("MIORA_LOG_ECHO", True)
+LIST_MAX_LIMIT = env_int("MIORA_LIST_MAX_LIMIT", 1000)
+
+# Command results
+RESULTS_FILE = env_str("MIORA_RESULTS_FILE", "command_results.db")
+RESULT_TTL = env_float("MIORA_RESULT_TTL", 3600.0)
+RESULT_EVICT_INTERVAL = env_float("MIORA_RESULT_EVICT_INTERVAL", 60.0)
+RESULT_MAX_WAIT = env_float("MIORA_RESULT_MAX_WAIT", 30.0)
+RESULT_POLL_INTERVAL = env_float("MIORA_RESULT_POLL_INTERVAL", 0.05)
+SSE_HEARTBEAT = env_float("MIORA_SSE_HEARTBEAT", 15.0)
+
+# Duplicate suppression at enqueue
+DEDUP_MODE = env_str("MIORA_DEDUP_MODE", "key")  # off | key | content
+DEDUP_FILE = env_str("MIORA_DEDUP_FILE", RESULTS_FILE)
+DEDUP_TTL = env_float("MIORA_DEDUP_TTL", RESULT_TTL)
+DEDUP_CONTENT_WINDOW = env_float("MIORA_DEDUP_CONTENT_WINDOW", 10.0)
+DEDUP_MAX_ENTRIES = env_int("MIORA_DEDUP_MAX_ENTRIES", 100000)
+
+# API server
+API_HOST = env_str("MIORA_API_HOST", "0.0.0.0")
+API_PORT = env_int("MIORA_API_PORT", 5000)
+API_SERVER = env_str("MIORA_API_SERVER", "production")  # production | development
+API_WORKERS = env_int("MIORA_API_WORKERS", min(4, os.cpu_count() or 1))
+API_THREADS = env_int("MIORA_API_THREADS", 32)
+# SSE streams and long-polls per worker; the other threads stay free for submissions
+API_MAX_STREAMS = env_int("MIORA_API_MAX_STREAMS", max(1, API_THREADS // 2))
+API_KEEPALIVE = env_int("MIORA_API_KEEPALIVE", 5)
+API_GROUP_WRITES = env_bool("MIORA_API_GROUP_WRITES", True)
+
+# Unified single-process gateway
+UNIFIED_JOURNAL = env_bool("MIORA_UNIFIED_JOURNAL", False)
+SHUTDOWN_DRAIN_TIMEOUT = env_float("MIORA_SHUTDOWN_DRAIN_TIMEOUT", 30.0)
+
+# Live events
+EVENTS_ENABLED = env_bool("MIORA_EVENTS_ENABLED", True)
+EVENTS_HOST = env_str("MIORA_EVENTS_HOST", "127.0.0.1")
+EVENTS_PORT = env_int("MIORA_EVENTS_PORT", 5052)
+EVENTS_BUFFER = env_int("MIORA_EVENTS_BUFFER", 1024)
+EVENTS_QUEUE_INTERVAL = env_float("MIORA_EVENTS_QUEUE_INTERVAL", 2.0)
+EVENTS_REGISTRY_DIR = env_str("MIORA_EVENTS_REGISTRY_DIR", "miora_events.d")
+
+# Metrics
+METRICS_ENABLED = env_bool("MIORA_METRICS_ENABLED", True)
+METRICS_HOST = env_str("MIORA_METRICS_HOST", "127.0.0.1")
+METRICS_PORT = env_int("MIORA_METRICS_PORT", 9101)
+
+# Memory queries (served by the handler on the metrics listener, proxied by GET /api/memory)
+MEMORY_API_ENABLED = env_bool("MIORA_MEMORY_API_ENABLED", True)
+MEMORY_API_URL = env_str("MIORA_MEMORY_API_URL", f"http://{METRICS_HOST}:{METRICS_PORT}/memory")
+MEMORY_API_TIMEOUT = env_float("MIORA_MEMORY_API_TIMEOUT", 5.0)
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+MIORA Dedup Index
+Indeks idempotency key / hash konten dengan jendela waktu untuk menekan perintah ganda
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Any, Optional, Tuple
+
+import miora_config
+from miora_commands import CommandValidationError
+
+MAX_KEY_LENGTH = 255
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS dedup_keys (
+    key TEXT PRIMARY KEY,
+    command_id TEXT NOT NULL,
+    expires_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS dedup_keys_expires ON dedup_keys (expires_at);
+"""
+
+
+class MIORADedupIndex:
+    """Maps idempotency keys (or command content hashes) to the first command ID.
+
+    A claim inserts the key inside one write transaction, so concurrent
+    requests in any API process agree on which one was first. Keys expire
+    after their window (MIORA_DEDUP_TTL for explicit keys,
+    MIORA_DEDUP_CONTENT_WINDOW for content hashes) and the table is trimmed
+    to MIORA_DEDUP_MAX_ENTRIES, oldest first.
+    """
+
+    def __init__(self, db_file: Optional[str] = None,
+                 mode: Optional[str] = None,
+                 ttl: Optional[float] = None,
+                 content_window: Optional[float] = None,
+                 max_entries: Optional[int] = None):
+        self.db_file = db_file or miora_config.DEDUP_FILE
+        self.mode = mode or miora_config.DEDUP_MODE
+        self.ttl = ttl or miora_config.DEDUP_TTL
+        self.content_window = content_window or miora_config.DEDUP_CONTENT_WINDOW
+        self.max_entries = max_entries or miora_config.DEDUP_MAX_ENTRIES
+        self._local = threading.local()
+        self._last_evict = 0.0
+        self._evict_lock = threading.Lock()
+
+        self._connection().executescript(_SCHEMA)
+
+    def _connection(self) -> sqlite3.Connection:
+        # SQLite connections are per thread and must not cross a fork
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.db_file, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    @property
+    def enabled(self) -> bool:
+        return self.mode != "off"
+
+    def key_for(self, record: Dict[str, Any], idempotency_key: Any = None) -> Optional[Tuple[str, float]]:
+        """Dedup key and window of a record, or None if it is not deduplicated
+
+        Raises CommandValidationError for a malformed idempotency key.
+        """
+        if not self.enabled:
+            return None
+        if idempotency_key not in (None, ""):
+            if not isinstance(idempotency_key, str) or len(idempotency_key) > MAX_KEY_LENGTH:
+                raise CommandValidationError(f"idempotency_key must be a string of at most {MAX_KEY_LENGTH} characters")
+            return f"key:{idempotency_key}", self.ttl
+        if self.mode != "content":
+            return None
+        content = json.dumps([record.get("source"), record.get("type"), record.get("params"),
+                              record.get("priority"), record.get("not_before"), record.get("every")],
+                             ensure_ascii=False, separators=(",", ":"))
+        return f"content:{hashlib.sha256(content.encode('utf-8')).hexdigest()}", self.content_window
+
+    def claim_many(self, claims: List[Tuple[str, float, str]]) -> Dict[str, str]:
+        """Register (key, window, command_id) claims in one transaction
+
+        Returns {command_id: original command_id} for every claim whose key
+        was already taken, including by an earlier claim in the same call.
+        """
+        now = time.time()
+        duplicates = {}
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            for key, window, command_id in claims:
+                row = conn.execute("SELECT command_id FROM dedup_keys WHERE key = ? AND expires_at > ?",
+                                   (key, now)).fetchone()
+                if row:
+                    duplicates[command_id] = row[0]
+                else:
+                    conn.execute("INSERT OR REPLACE INTO dedup_keys (key, command_id, expires_at) VALUES (?, ?, ?)",
+                                 (key, command_id, now + window))
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+        self.maybe_evict(now)
+        return duplicates
+
+    def claim(self, key: str, window: float, command_id: str) -> Optional[str]:
+        """Original command ID if `key` was seen within its window, else None (and `key` is taken)"""
+        return self.claim_many([(key, window, command_id)]).get(command_id)
+
+    def release_many(self, claims: List[Tuple[str, str]]):
+        """Forget (key, command_id) claims whose commands could not be queued"""
+        try:
+            with self._connection() as conn:
+                conn.executemany("DELETE FROM dedup_keys WHERE key = ? AND command_id = ?", claims)
+        except sqlite3.Error as e:
+            print(f"⚠️ Failed to release dedup keys: {str(e)}")
+
+    def maybe_evict(self, now: Optional[float] = None):
+        now = now or time.time()
+        if now - self._last_evict < miora_config.RESULT_EVICT_INTERVAL or not self._evict_lock.acquire(blocking=False):
+            return
+        try:
+            self._last_evict = now
+            self.evict(now)
+        finally:
+            self._evict_lock.release()
+
+    def evict(self, now: Optional[float] = None) -> int:
+        """Delete expired keys and trim the index to max_entries; returns how many were removed"""
+        try:
+            conn = self._connection()
+            removed = conn.execute("DELETE FROM dedup_keys WHERE expires_at <= ?", (now or time.time(),)).rowcount
+            excess = conn.execute("SELECT COUNT(*) FROM dedup_keys").fetchone()[0] - self.max_entries
+            if excess > 0:
+                removed += conn.execute("DELETE FROM dedup_keys WHERE key IN "
+                                        "(SELECT key FROM dedup_keys ORDER BY expires_at LIMIT ?)",
+                                        (excess,)).rowcount
+            return removed
+        except sqlite3.Error as e:
+            print(f"⚠️ Failed to evict dedup keys: {str(e)}")
+            return 0
+
+    def close(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is not None and self._local.pid == os.getpid():
+            conn.close()
+            self._local.conn = None
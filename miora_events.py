@@ -0,0 +1,259 @@
+#!/usr/bin/env python3
+"""
+MIORA Live Events
+Event eksekusi handler dikirim lewat UDP lokal dan disiarkan ke dashboard via SSE
+"""
+
+import atexit
+import json
+import os
+import socket
+import threading
+import time
+from collections import deque
+from typing import Dict, List, Any, Optional, Tuple
+
+import miora_config
+
+# Results are truncated so an event always fits in one datagram
+MAX_RESULT_CHARS = 512
+
+
+class MIORAEventPublisher:
+    """Sends handler events to the API process (best effort, never blocks)
+
+    Events go to the well-known events port and to every additional
+    receiver registered by pre-forked API workers.
+    """
+
+    def __init__(self, host: Optional[str] = None, port: Optional[int] = None):
+        self.host = host or miora_config.EVENTS_HOST
+        self.port = port or miora_config.EVENTS_PORT
+        self.sock = None
+        self._targets: List[Tuple[str, int]] = [(self.host, self.port)]
+        self._targets_checked = 0.0
+        if miora_config.EVENTS_ENABLED:
+            self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            self.sock.setblocking(False)
+
+    def _refresh_targets(self):
+        now = time.monotonic()
+        if now - self._targets_checked < 1.0:
+            return
+        self._targets_checked = now
+        self._targets = [(self.host, self.port)] + [(self.host, port) for port in registered_ports()]
+
+    def publish(self, event: str, **fields):
+        if self.sock is None:
+            return
+        if isinstance(fields.get("result"), str) and len(fields["result"]) > MAX_RESULT_CHARS:
+            fields["result"] = fields["result"][:MAX_RESULT_CHARS] + "…"
+        payload = json.dumps({"event": event, "timestamp": time.time(), **fields},
+                             ensure_ascii=False, default=str).encode("utf-8")
+        self._refresh_targets()
+        for target in self._targets:
+            try:
+                self.sock.sendto(payload, target)
+            except OSError:
+                # No dashboard listening or socket buffer full: the event is simply lost
+                pass
+
+    def close(self):
+        if self.sock is not None:
+            self.sock.close()
+            self.sock = None
+
+
+def _pid_alive(pid: int) -> bool:
+    if os.name == "nt":
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def registered_ports() -> List[int]:
+    """Ports of extra event receivers (one per pre-forked API worker), pruning dead ones"""
+    registry = miora_config.EVENTS_REGISTRY_DIR
+    try:
+        names = os.listdir(registry)
+    except OSError:
+        return []
+    ports = []
+    for name in names:
+        pid, _, port = name.partition(".")
+        if not (pid.isdigit() and port.isdigit()):
+            continue
+        if _pid_alive(int(pid)):
+            ports.append(int(port))
+        else:
+            try:
+                os.remove(os.path.join(registry, name))
+            except OSError:
+                pass
+    return ports
+
+
+class MIORALocalEventPublisher:
+    """Publishes handler events straight onto an event bus in the same process"""
+
+    def __init__(self, bus: "MIORAEventBus"):
+        self.bus = bus
+
+    def publish(self, event: str, **fields):
+        self.bus.publish({"event": event, "timestamp": time.time(), **fields})
+
+    def close(self):
+        pass
+
+
+class SlowConsumer(Exception):
+    """Raised when a subscriber fell so far behind that events it needs were overwritten"""
+
+
+class MIORAEventBus:
+    """Fan-out of events to any number of SSE subscribers.
+
+    Each event is encoded once into an SSE frame and appended to a bounded
+    ring. Subscribers only keep a sequence number and read frames from the
+    shared ring, so publishing costs the same for one viewer or hundreds.
+    A subscriber that lags more than the ring capacity is dropped.
+    """
+
+    def __init__(self, capacity: Optional[int] = None):
+        self.capacity = capacity or miora_config.EVENTS_BUFFER
+        self._frames: "deque[Tuple[int, str]]" = deque(maxlen=self.capacity)
+        self._seq = 0
+        self._cond = threading.Condition()
+        self.subscribers = 0
+        self.stats = {"published": 0, "dropped_subscribers": 0}
+
+    @staticmethod
+    def format_frame(seq: int, event: Dict[str, Any]) -> str:
+        data = json.dumps(event, ensure_ascii=False, default=str)
+        return f"id: {seq}\nevent: {event.get('event', 'message')}\ndata: {data}\n\n"
+
+    def publish(self, event: Dict[str, Any]):
+        with self._cond:
+            self._seq += 1
+            self._frames.append((self._seq, self.format_frame(self._seq, event)))
+            self.stats["published"] += 1
+            self._cond.notify_all()
+
+    @property
+    def last_seq(self) -> int:
+        return self._seq
+
+    def resume_point(self, last_event_id: Optional[str]) -> int:
+        """Sequence number to continue after for a client reconnecting with Last-Event-ID"""
+        with self._cond:
+            try:
+                after = int(last_event_id)
+            except (TypeError, ValueError):
+                return self._seq
+            # Unknown (API restarted) or already overwritten: start from now
+            if after > self._seq or not self._frames or after + 1 < self._frames[0][0]:
+                return self._seq
+            return after
+
+    def read(self, after: int, timeout: float) -> Tuple[List[str], int]:
+        """Frames published after sequence number `after`; waits up to timeout for new ones
+
+        Raises SlowConsumer if some of those frames were already overwritten.
+        """
+        with self._cond:
+            if self._seq <= after:
+                self._cond.wait(timeout)
+            if self._seq <= after:
+                return [], after
+            oldest = self._frames[0][0]
+            if after + 1 < oldest:
+                self.stats["dropped_subscribers"] += 1
+                raise SlowConsumer(f"missed {oldest - after - 1} events")
+            start = len(self._frames) - (self._seq - after)
+            frames = [frame for _, frame in list(self._frames)[start:]]
+            return frames, self._seq
+
+    def subscribe(self):
+        with self._cond:
+            self.subscribers += 1
+
+    def unsubscribe(self):
+        with self._cond:
+            self.subscribers -= 1
+
+
+class MIORAEventReceiver:
+    """Receives handler events over UDP and publishes them on an event bus"""
+
+    def __init__(self, bus: MIORAEventBus, host: Optional[str] = None, port: Optional[int] = None):
+        self.bus = bus
+        self.host = host or miora_config.EVENTS_HOST
+        self.port = port or miora_config.EVENTS_PORT
+        self.sock = None
+        self.registration = None
+        self._thread = None
+
+    def start(self) -> bool:
+        """Start receiving in a daemon thread; returns False if no socket could be bound
+
+        The first receiver takes the well-known port. Further ones (other
+        pre-forked API workers) bind an ephemeral port and register it so
+        the handler sends them every event as well.
+        """
+        if not miora_config.EVENTS_ENABLED:
+            return False
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        try:
+            self.sock.bind((self.host, self.port))
+        except OSError:
+            try:
+                self.sock.bind((self.host, 0))
+                self._register(self.sock.getsockname()[1])
+            except OSError as e:
+                print(f"⚠️ Event listener unavailable on {self.host}:{self.port} ({e})")
+                self.sock.close()
+                self.sock = None
+                return False
+        # Lets close() stop the thread without another datagram arriving
+        self.sock.settimeout(1.0)
+        self._thread = threading.Thread(target=self._run, name="miora-events", daemon=True)
+        self._thread.start()
+        return True
+
+    def _register(self, port: int):
+        os.makedirs(miora_config.EVENTS_REGISTRY_DIR, exist_ok=True)
+        self.registration = os.path.join(miora_config.EVENTS_REGISTRY_DIR, f"{os.getpid()}.{port}")
+        open(self.registration, "w").close()
+        atexit.register(self.close)
+
+    def _run(self):
+        while True:
+            sock = self.sock
+            if sock is None:
+                return
+            try:
+                payload = sock.recv(65536)
+            except socket.timeout:
+                continue
+            except OSError:
+                return
+            try:
+                self.bus.publish(json.loads(payload))
+            except ValueError:
+                continue
+
+    def close(self):
+        sock, self.sock = self.sock, None
+        if sock is not None:
+            sock.close()
+        if self.registration:
+            try:
+                os.remove(self.registration)
+            except OSError:
+                pass
+            self.registration = None
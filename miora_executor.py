@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+MIORA Command Executor
+Worker pool untuk eksekusi perintah dengan kelas konkurensi per jenis perintah
+"""
+
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from typing import Callable, Dict, List, Any, Optional
+
+import miora_config
+
+
+class ConcurrencyClass:
+    """Execution policy shared by a group of command types.
+
+    ordered    -- commands of the class run one at a time in enqueue order
+    exclusive  -- the class waits for every in-flight command, then runs alone
+    max_workers -- worker threads for unordered classes
+    """
+
+    def __init__(self, name: str, max_workers: int = 1, ordered: bool = False, exclusive: bool = False):
+        self.name = name
+        self.ordered = ordered or exclusive
+        self.exclusive = exclusive
+        self.max_workers = 1 if self.ordered else max(1, max_workers)
+
+    def __repr__(self):
+        return (f"ConcurrencyClass({self.name!r}, max_workers={self.max_workers}, "
+                f"ordered={self.ordered}, exclusive={self.exclusive})")
+
+
+def default_concurrency_classes() -> Dict[str, ConcurrencyClass]:
+    """Built-in classes; worker counts come from miora_config"""
+    return {
+        "parallel": ConcurrencyClass("parallel", max_workers=miora_config.WORKERS_PARALLEL),
+        "module": ConcurrencyClass("module", max_workers=miora_config.WORKERS_MODULE),
+        "tts": ConcurrencyClass("tts", ordered=True),
+        "memory": ConcurrencyClass("memory", ordered=True),
+        "system": ConcurrencyClass("system", exclusive=True),
+    }
+
+
+class MIORACommandExecutor:
+    """Runs command callables on per-class thread pools"""
+
+    def __init__(self, classes: Optional[Dict[str, ConcurrencyClass]] = None,
+                 command_classes: Optional[Dict[str, str]] = None,
+                 default_class: str = "parallel"):
+        self.classes = classes or default_concurrency_classes()
+        # Command type -> class name, usually COMMAND_REGISTRY.concurrency_map()
+        self.command_classes = dict(command_classes or {})
+        self.default_class = default_class
+        self._pools: Dict[str, ThreadPoolExecutor] = {}
+        self._in_flight: set = set()
+        self._lock = threading.Lock()
+
+    def class_for(self, command_type: str) -> ConcurrencyClass:
+        name = self.command_classes.get(command_type, self.default_class)
+        return self.classes.get(name) or self.classes[self.default_class]
+
+    def _pool(self, concurrency: ConcurrencyClass) -> ThreadPoolExecutor:
+        pool = self._pools.get(concurrency.name)
+        if pool is None:
+            pool = ThreadPoolExecutor(max_workers=concurrency.max_workers,
+                                      thread_name_prefix=f"miora-{concurrency.name}")
+            self._pools[concurrency.name] = pool
+        return pool
+
+    def submit(self, command_type: str, fn: Callable, *args, **kwargs) -> Future:
+        """Schedule `fn` according to the concurrency class of `command_type`"""
+        concurrency = self.class_for(command_type)
+
+        if concurrency.exclusive:
+            # Barrier: let everything in flight finish, then run inline
+            self.drain()
+            future = Future()
+            try:
+                future.set_result(fn(*args, **kwargs))
+            except BaseException as e:
+                future.set_exception(e)
+            return future
+
+        with self._lock:
+            future = self._pool(concurrency).submit(fn, *args, **kwargs)
+            self._in_flight.add(future)
+        future.add_done_callback(self._discard)
+        return future
+
+    def _discard(self, future: Future):
+        with self._lock:
+            self._in_flight.discard(future)
+
+    def drain(self, timeout: Optional[float] = None) -> bool:
+        """Wait for every in-flight command; returns False on timeout"""
+        with self._lock:
+            pending = list(self._in_flight)
+        if not pending:
+            return True
+        _, not_done = wait(pending, timeout=timeout)
+        return not not_done
+
+    def shutdown(self, wait_for: bool = True):
+        with self._lock:
+            pools = list(self._pools.values())
+            self._pools = {}
+        for pool in pools:
+            pool.shutdown(wait=wait_for)
+
+    def describe(self) -> List[Dict[str, Any]]:
+        return [
+            {"name": c.name, "max_workers": c.max_workers, "ordered": c.ordered, "exclusive": c.exclusive}
+            for c in self.classes.values()
+        ]
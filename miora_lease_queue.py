@@ -0,0 +1,397 @@
+#!/usr/bin/env python3
+"""
+MIORA Lease Queue
+Antrian perintah SQLite (WAL) dengan claim/lease/ack untuk beberapa handler sekaligus
+"""
+
+import atexit
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Dict, List, Any, Optional, Tuple
+
+import miora_config
+from miora_command_queue import MIORACommandQueue, Position
+from miora_metrics import METRICS
+from miora_scheduler import LANES, MIORALaneQueue, lane_path
+from miora_wakeup import notify_wakeup
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS queue_commands (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    type TEXT NOT NULL,
+    record TEXT NOT NULL,
+    enqueued_at REAL,
+    status TEXT NOT NULL DEFAULT 'ready',
+    lease_owner TEXT,
+    lease_expires_at REAL,
+    attempts INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS queue_commands_status ON queue_commands (status, id);
+CREATE TABLE IF NOT EXISTS queue_totals (
+    name TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS queue_pending_by_type (
+    type TEXT PRIMARY KEY,
+    pending INTEGER NOT NULL
+);
+"""
+
+
+class MIORALeaseQueue:
+    """Command queue that several handler instances can consume at once.
+
+    `read_batch` claims the oldest ready commands for this consumer with a
+    lease and `commit` acknowledges (deletes) them, both inside one SQLite
+    write transaction, so two handlers never receive the same command. A
+    background thread renews the leases of this process while its commands
+    run. When a handler dies its leases expire and the commands are
+    delivered again; after MIORA_QUEUE_MAX_ATTEMPTS deliveries a command is
+    parked as dead instead. Positions are (0, row id).
+    """
+
+    record_type = staticmethod(MIORACommandQueue.record_type)
+    prepare_record = staticmethod(MIORACommandQueue.prepare_record)
+    encode_cursor = staticmethod(MIORACommandQueue.encode_cursor)
+    decode_cursor = staticmethod(MIORACommandQueue.decode_cursor)
+    decode_record = staticmethod(MIORACommandQueue.decode_record)
+
+    def __init__(self, db_file: Optional[str] = None,
+                 lease_seconds: Optional[float] = None,
+                 max_attempts: Optional[int] = None,
+                 sync_mode: Optional[str] = None,
+                 read_batch_size: Optional[int] = None):
+        self.db_file = db_file or miora_config.QUEUE_DB_FILE
+        self.queue_dir = self.db_file
+        self.lease_seconds = lease_seconds or miora_config.QUEUE_LEASE_SECONDS
+        self.max_attempts = max_attempts or miora_config.QUEUE_MAX_ATTEMPTS
+        self.sync_mode = sync_mode or miora_config.QUEUE_SYNC_MODE
+        self.read_batch_size = read_batch_size or miora_config.QUEUE_READ_BATCH
+
+        self._local = threading.local()
+        self._pid = None
+        self._consumer_id = None
+        self._renewer = None
+        self._renew_wake = threading.Event()
+        self._thread_lock = threading.Lock()
+        self._closed = False
+
+        self._connection().executescript(_SCHEMA)
+        atexit.register(self.close)
+
+    # ------------------------------------------------------------------
+    # Connection helpers
+    # ------------------------------------------------------------------
+
+    def _connection(self) -> sqlite3.Connection:
+        # SQLite connections are per thread and must not cross a fork
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.db_file, timeout=30, isolation_level=None)
+            conn.execute(f"PRAGMA journal_mode={miora_config.QUEUE_SQLITE_JOURNAL_MODE}")
+            conn.execute(f"PRAGMA synchronous={'FULL' if self.sync_mode == 'always' else 'NORMAL'}")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    @contextmanager
+    def _transaction(self, durable: bool = False):
+        """Write transaction holding the database write lock from the start"""
+        conn = self._connection()
+        if durable and self.sync_mode != "always":
+            conn.execute("PRAGMA synchronous=FULL")
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        else:
+            conn.execute("COMMIT")
+        finally:
+            if durable and self.sync_mode != "always":
+                conn.execute("PRAGMA synchronous=NORMAL")
+
+    @property
+    def consumer_id(self) -> str:
+        """Lease owner name of this process (a forked child gets its own)"""
+        if self._pid != os.getpid():
+            self._pid = os.getpid()
+            self._consumer_id = f"{socket.gethostname()}:{self._pid}:{uuid.uuid4().hex[:8]}"
+            self._renewer = None
+        return self._consumer_id
+
+    # ------------------------------------------------------------------
+    # Counters (maintained in the same transactions as the rows)
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _add_total(conn: sqlite3.Connection, name: str, amount: int):
+        conn.execute("INSERT INTO queue_totals (name, value) VALUES (?, ?) "
+                     "ON CONFLICT(name) DO UPDATE SET value = value + excluded.value", (name, amount))
+
+    @staticmethod
+    def _add_pending(conn: sqlite3.Connection, counts: Dict[str, int]):
+        conn.executemany("INSERT INTO queue_pending_by_type (type, pending) VALUES (?, ?) "
+                         "ON CONFLICT(type) DO UPDATE SET pending = pending + excluded.pending",
+                         counts.items())
+        conn.execute("DELETE FROM queue_pending_by_type WHERE pending <= 0")
+
+    def _remove_rows(self, conn: sqlite3.Connection, where: str, params: tuple) -> Dict[str, int]:
+        """Subtract the rows matching `where` from the pending counters; returns them per type"""
+        counts = dict(conn.execute(f"SELECT type, COUNT(*) FROM queue_commands WHERE {where} GROUP BY type",
+                                   params).fetchall())
+        if counts:
+            self._add_pending(conn, {record_type: -n for record_type, n in counts.items()})
+        return counts
+
+    # ------------------------------------------------------------------
+    # Producer side
+    # ------------------------------------------------------------------
+
+    def _insert_locked(self, conn: sqlite3.Connection, records: List[Dict[str, Any]]):
+        counts: Dict[str, int] = {}
+        rows = []
+        for record in records:
+            record_type = self.record_type(record)
+            counts[record_type] = counts.get(record_type, 0) + 1
+            rows.append((record_type, json.dumps(record, ensure_ascii=False, separators=(",", ":")),
+                         record.get("enqueued_at")))
+        conn.executemany("INSERT INTO queue_commands (type, record, enqueued_at) VALUES (?, ?, ?)", rows)
+        self._add_total(conn, "enqueued", len(records))
+        self._add_pending(conn, counts)
+
+    def append(self, record: Dict[str, Any]) -> Dict[str, Any]:
+        """Append a single command record to the queue"""
+        return self.append_many([record])[0]
+
+    def append_many(self, records: List[Dict[str, Any]], durable: bool = False) -> List[Dict[str, Any]]:
+        """Append several command records in one transaction
+
+        With durable=True the transaction is committed with a full sync,
+        regardless of the configured sync mode.
+        """
+        prepared = [self.prepare_record(record) for record in records]
+        if not prepared:
+            return prepared
+        with self._transaction(durable) as conn:
+            self._insert_locked(conn, prepared)
+        notify_wakeup()
+        return prepared
+
+    def import_legacy_file(self, path: Optional[str] = None) -> int:
+        """Move commands from a legacy commands.json list into the queue"""
+        path = path or miora_config.LEGACY_COMMANDS_FILE
+        try:
+            if os.path.getsize(path) <= 2:
+                return 0
+        except OSError:
+            return 0
+
+        # The write lock keeps concurrent handlers from importing the file twice
+        with self._transaction() as conn:
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    commands = json.load(f)
+            except (OSError, ValueError):
+                return 0
+            if not isinstance(commands, list) or not commands:
+                return 0
+
+            records = [self.prepare_record(command if isinstance(command, dict)
+                                           else {"command": str(command), "source": "file"})
+                       for command in commands]
+            self._insert_locked(conn, records)
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump([], f)
+
+        notify_wakeup()
+        return len(records)
+
+    # ------------------------------------------------------------------
+    # Consumer side
+    # ------------------------------------------------------------------
+
+    def _expire_leases_locked(self, conn: sqlite3.Connection, now: float):
+        """Return commands of dead consumers to the queue, or park them once out of attempts"""
+        expired = "status = 'leased' AND lease_expires_at <= ?"
+        dead = self._remove_rows(conn, f"{expired} AND attempts >= ?", (now, self.max_attempts))
+        if dead:
+            conn.execute(f"UPDATE queue_commands SET status = 'dead', lease_owner = NULL "
+                         f"WHERE {expired} AND attempts >= ?", (now, self.max_attempts))
+            self._add_total(conn, "dead", sum(dead.values()))
+        conn.execute(f"UPDATE queue_commands SET status = 'ready', lease_owner = NULL WHERE {expired}", (now,))
+
+    def claim(self, max_items: Optional[int] = None) -> List[Tuple[Dict[str, Any], Position]]:
+        """Lease the oldest ready commands to this consumer"""
+        max_items = max_items or self.read_batch_size
+        owner = self.consumer_id
+        now = time.time()
+        with self._transaction() as conn:
+            self._expire_leases_locked(conn, now)
+            rows = conn.execute("SELECT id, record FROM queue_commands WHERE status = 'ready' "
+                                "ORDER BY id LIMIT ?", (max_items,)).fetchall()
+            conn.executemany("UPDATE queue_commands SET status = 'leased', lease_owner = ?, "
+                             "lease_expires_at = ?, attempts = attempts + 1 WHERE id = ?",
+                             [(owner, now + self.lease_seconds, row_id) for row_id, _ in rows])
+        if rows:
+            self._ensure_renewer()
+        return [(self.decode_record(record), (0, row_id)) for row_id, record in rows]
+
+    def read_batch(self, max_items: Optional[int] = None) -> List[Tuple[Dict[str, Any], Position]]:
+        """Claim the next batch of commands (the handler's read step)"""
+        return self.claim(max_items)
+
+    def ack(self, positions: List[Position]) -> int:
+        """Delete executed commands still leased to this consumer; returns how many"""
+        owner = self.consumer_id
+        with self._transaction() as conn:
+            acked = 0
+            for _, row_id in positions:
+                counts = self._remove_rows(conn, "id = ? AND status = 'leased' AND lease_owner = ?",
+                                           (row_id, owner))
+                if counts:
+                    conn.execute("DELETE FROM queue_commands WHERE id = ?", (row_id,))
+                    acked += 1
+            self._add_total(conn, "consumed", acked)
+        return acked
+
+    def commit(self, position: Position, records: Optional[List[Dict[str, Any]]] = None):
+        """Acknowledge every command leased to this consumer up to `position`"""
+        owner = self.consumer_id
+        where = "status = 'leased' AND lease_owner = ? AND id <= ?"
+        with self._transaction() as conn:
+            counts = self._remove_rows(conn, where, (owner, position[1]))
+            if counts:
+                conn.execute(f"DELETE FROM queue_commands WHERE {where}", (owner, position[1]))
+                self._add_total(conn, "consumed", sum(counts.values()))
+
+    def release(self):
+        """Give every command leased to this consumer back to the queue at once"""
+        if self._pid is None:
+            return
+        with self._transaction() as conn:
+            conn.execute("UPDATE queue_commands SET status = 'ready', lease_owner = NULL, "
+                         "attempts = MAX(attempts - 1, 0) WHERE status = 'leased' AND lease_owner = ?",
+                         (self.consumer_id,))
+
+    def renew(self) -> int:
+        """Extend the leases of this consumer; returns how many were extended"""
+        with self._transaction() as conn:
+            return conn.execute("UPDATE queue_commands SET lease_expires_at = ? "
+                                "WHERE status = 'leased' AND lease_owner = ?",
+                                (time.time() + self.lease_seconds, self.consumer_id)).rowcount
+
+    def _ensure_renewer(self):
+        if self._renewer is not None and self._renewer.is_alive():
+            return
+        with self._thread_lock:
+            if self._renewer is None or not self._renewer.is_alive():
+                self._renewer = threading.Thread(target=self._renew_loop,
+                                                 name="miora-queue-lease", daemon=True)
+                self._renewer.start()
+
+    def _renew_loop(self):
+        # Renewing well before expiry keeps long-running commands leased
+        while not self._renew_wake.wait(self.lease_seconds / 3):
+            try:
+                self.renew()
+            except sqlite3.Error as e:
+                print(f"⚠️ Failed to renew command leases: {str(e)}")
+
+    def clear(self):
+        """Discard every pending command (leased ones included)"""
+        with self._transaction() as conn:
+            counts = self._remove_rows(conn, "status != 'dead'", ())
+            conn.execute("DELETE FROM queue_commands WHERE status != 'dead'")
+            self._add_total(conn, "consumed", sum(counts.values()))
+
+    # ------------------------------------------------------------------
+    # Statistics and listing
+    # ------------------------------------------------------------------
+
+    def stats(self) -> Dict[str, Any]:
+        """Queue depth, lease and dead-letter counts and per-type counts from maintained counters"""
+        conn = self._connection()
+        totals = dict(conn.execute("SELECT name, value FROM queue_totals").fetchall())
+        by_type = dict(conn.execute("SELECT type, pending FROM queue_pending_by_type").fetchall())
+        leased = conn.execute("SELECT COUNT(*) FROM queue_commands WHERE status = 'leased'").fetchone()[0]
+        oldest = conn.execute("SELECT enqueued_at FROM queue_commands WHERE status != 'dead' "
+                              "ORDER BY id LIMIT 1").fetchone()
+        oldest_at = oldest[0] if oldest else None
+        enqueued, consumed, dead = totals.get("enqueued", 0), totals.get("consumed", 0), totals.get("dead", 0)
+        return {
+            "depth": max(0, enqueued - consumed - dead),
+            "enqueued_total": enqueued,
+            "consumed_total": consumed,
+            "leased": leased,
+            "dead": dead,
+            "by_type": by_type,
+            "oldest_enqueued_at": oldest_at,
+            "oldest_age_seconds": round(time.time() - oldest_at, 3) if oldest_at else 0.0
+        }
+
+    def read_from(self, position: Position, max_items: int) -> List[Tuple[Dict[str, Any], Position]]:
+        """Read pending records after `position` without claiming them"""
+        limit = -1 if max_items == float('inf') else max_items
+        rows = self._connection().execute(
+            "SELECT id, record FROM queue_commands WHERE id > ? AND status != 'dead' ORDER BY id LIMIT ?",
+            (position[1], limit)).fetchall()
+        return [(self.decode_record(record), (0, row_id)) for row_id, record in rows]
+
+    def list_pending(self, cursor: Optional[str] = None, limit: int = 100) -> tuple[List[Dict[str, Any]], Optional[str]]:
+        """Return one page of pending records and the cursor of the next page"""
+        position = self.decode_cursor(cursor) if cursor else (0, 0)
+        entries = self.read_from(position, limit)
+        next_cursor = self.encode_cursor(entries[-1][1]) if len(entries) == limit else None
+        return [record for record, _ in entries], next_cursor
+
+    def pending(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Return pending records without claiming them"""
+        return [record for record, _ in self.read_from((0, 0), limit or float('inf'))]
+
+    def dead_letters(self, limit: int = 100) -> List[Dict[str, Any]]:
+        """Commands that were delivered max_attempts times without being acknowledged"""
+        rows = self._connection().execute(
+            "SELECT record, attempts FROM queue_commands WHERE status = 'dead' ORDER BY id LIMIT ?",
+            (limit,)).fetchall()
+        return [{**self.decode_record(record), "attempts": attempts} for record, attempts in rows]
+
+    def register_metrics(self, registry=None):
+        """Expose the queue gauges plus leased and dead-lettered commands"""
+        registry = registry or METRICS
+        MIORACommandQueue.register_metrics(self, registry)
+        registry.gauge("miora_queue_leased", "Commands leased to a handler and not yet acknowledged",
+                       callback=lambda: self.stats()["leased"])
+        registry.gauge("miora_queue_dead", "Commands parked after too many delivery attempts",
+                       callback=lambda: self.stats()["dead"])
+
+    def close(self):
+        """Stop renewing leases and hand unfinished commands to other consumers"""
+        if self._closed:
+            return
+        self._closed = True
+        self._renew_wake.set()
+        try:
+            self.release()
+        except sqlite3.Error:
+            pass
+        conn = getattr(self._local, "conn", None)
+        if conn is not None and self._local.pid == os.getpid():
+            conn.close()
+            self._local.conn = None
+
+
+def open_command_queue() -> MIORALaneQueue:
+    """Priority lanes on the configured MIORA_QUEUE_BACKEND (segment or sqlite)"""
+    if miora_config.QUEUE_BACKEND == "sqlite":
+        return MIORALaneQueue({lane: MIORALeaseQueue(lane_path(miora_config.QUEUE_DB_FILE, lane))
+                               for lane in LANES})
+    return MIORALaneQueue({lane: MIORACommandQueue(lane_path(miora_config.QUEUE_DIR, lane))
+                           for lane in LANES})
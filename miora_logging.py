@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+"""
+MIORA Log Writer
+Logging terstruktur (JSON lines) dengan buffer, flush berkala dan rotasi file
+"""
+
+import atexit
+import json
+import os
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Callable, Dict, List, Any, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows: only in-process locking is available
+    fcntl = None
+
+import miora_config
+from miora_metrics import METRICS
+
+LOG_WRITE_SECONDS = METRICS.histogram(
+    "miora_log_write_seconds", "Time to write one batch of log records", ("component",))
+LOG_DROPPED_TOTAL = METRICS.counter(
+    "miora_log_dropped_total", "Log records dropped because the buffer was full", ("component",))
+
+
+class MIORALogWriter:
+    """Background JSON-lines log writer with a bounded buffer.
+
+    Callers only enqueue a record; a writer thread batches records into a
+    single write per flush and rotates the file by size and/or age. When
+    the buffer is full the policy decides whether callers block or the
+    record is dropped (drops are counted and reported in the log).
+
+    Pre-forked API workers share one log file, so every write and rotation
+    holds "<log file>.lock", which also stores when the current file was
+    started: only one process rotates, and the others append to the new file.
+    """
+
+    def __init__(self, log_file: str, component: str,
+                 buffer_size: Optional[int] = None,
+                 flush_interval: Optional[float] = None,
+                 flush_batch: Optional[int] = None,
+                 rotate_bytes: Optional[int] = None,
+                 rotate_interval: Optional[float] = None,
+                 backup_count: Optional[int] = None,
+                 policy: Optional[str] = None,
+                 echo: Optional[Callable[[Dict[str, Any]], str]] = None):
+        self.log_file = log_file
+        self.component = component
+        self.flush_interval = flush_interval or miora_config.LOG_FLUSH_INTERVAL
+        self.flush_batch = flush_batch or miora_config.LOG_FLUSH_BATCH
+        self.rotate_bytes = rotate_bytes if rotate_bytes is not None else miora_config.LOG_ROTATE_BYTES
+        self.rotate_interval = rotate_interval if rotate_interval is not None else miora_config.LOG_ROTATE_INTERVAL
+        self.backup_count = backup_count if backup_count is not None else miora_config.LOG_BACKUP_COUNT
+        self.policy = policy or miora_config.LOG_POLICY
+        self.echo = echo if miora_config.LOG_ECHO else None
+
+        self._buffer: "queue.Queue[List[Dict[str, Any]]]" = queue.Queue(
+            maxsize=buffer_size or miora_config.LOG_BUFFER_SIZE)
+        self._thread = None
+        self._pid = None
+        self._start_lock = threading.Lock()
+        self.lock_file = log_file + ".lock"
+        self._lock_fd = None
+        self._lock_pid = None
+        self.stats = {"written": 0, "dropped": 0, "flushes": 0, "rotations": 0, "last_flush_seconds": 0.0}
+        self._unreported_drops = 0
+        atexit.register(self.close)
+
+    def _ensure_thread(self):
+        # Threads do not survive fork, so a forked worker starts its own writer
+        if self._thread is not None and self._pid == os.getpid():
+            return
+        with self._start_lock:
+            if self._thread is None or self._pid != os.getpid():
+                self._pid = os.getpid()
+                self._thread = threading.Thread(target=self._run, name=f"miora-log-{self.component}", daemon=True)
+                self._thread.start()
+
+    def log(self, **fields) -> bool:
+        """Queue one record; returns False if it was dropped"""
+        return self.log_many([fields])
+
+    def log_many(self, records: List[Dict[str, Any]]) -> bool:
+        """Queue several records as one buffer entry"""
+        now = datetime.now().isoformat(timespec="milliseconds")
+        entry = [{"timestamp": now, "component": self.component, **fields} for fields in records]
+        self._ensure_thread()
+        try:
+            self._buffer.put(entry, block=self.policy == "block")
+            return True
+        except queue.Full:
+            self.stats["dropped"] += len(entry)
+            self._unreported_drops += len(entry)
+            LOG_DROPPED_TOTAL.inc(len(entry), component=self.component)
+            return False
+
+    def _run(self):
+        while True:
+            try:
+                batch = [self._buffer.get(timeout=self.flush_interval)]
+            except queue.Empty:
+                continue
+
+            # Collect whatever else is already buffered, up to the batch size
+            count = len(batch[0] or [])
+            while count < self.flush_batch and batch[-1] is not None:
+                try:
+                    batch.append(self._buffer.get_nowait())
+                except queue.Empty:
+                    break
+                count += len(batch[-1] or [])
+
+            try:
+                self._write([record for entry in batch if entry for record in entry])
+            except Exception as e:
+                print(f"⚠️ Log write failed ({self.log_file}): {str(e)}")
+            finally:
+                for _ in batch:
+                    self._buffer.task_done()
+
+            if any(entry is None for entry in batch):
+                return
+
+    def _write(self, records: List[Dict[str, Any]]):
+        if self._unreported_drops:
+            records.append({"timestamp": datetime.now().isoformat(timespec="milliseconds"),
+                            "component": self.component, "status": "dropped",
+                            "dropped": self._unreported_drops})
+            self._unreported_drops = 0
+        if not records:
+            return
+
+        started = time.perf_counter()
+        data = "".join(json.dumps(record, ensure_ascii=False, default=str) + "\n" for record in records)
+        with self._locked():
+            self._maybe_rotate()
+            with open(self.log_file, 'a', encoding='utf-8') as f:
+                f.write(data)
+
+        self.stats["written"] += len(records)
+        self.stats["flushes"] += 1
+        self.stats["last_flush_seconds"] = time.perf_counter() - started
+        LOG_WRITE_SECONDS.observe(self.stats["last_flush_seconds"], component=self.component)
+
+        if self.echo:
+            for record in records:
+                line = self.echo(record)
+                if line:
+                    print(line)
+
+    @contextmanager
+    def _locked(self):
+        """Hold the cross-process lock of the log file (writer thread only)"""
+        if self._lock_pid != os.getpid():
+            self._lock_fd = os.open(self.lock_file, os.O_RDWR | os.O_CREAT, 0o644)
+            self._lock_pid = os.getpid()
+        if fcntl:
+            fcntl.flock(self._lock_fd, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl:
+                fcntl.flock(self._lock_fd, fcntl.LOCK_UN)
+
+    def _read_started_at(self) -> Optional[float]:
+        try:
+            os.lseek(self._lock_fd, 0, os.SEEK_SET)
+            return float(os.read(self._lock_fd, 64))
+        except (OSError, ValueError):
+            return None
+
+    def _store_started_at(self, started_at: float):
+        os.ftruncate(self._lock_fd, 0)
+        os.lseek(self._lock_fd, 0, os.SEEK_SET)
+        os.write(self._lock_fd, repr(started_at).encode("ascii"))
+
+    def _maybe_rotate(self):
+        """Rotate by size or age; call with the lock held"""
+        now = time.time()
+        try:
+            size = os.path.getsize(self.log_file)
+        except OSError:
+            self._store_started_at(now)
+            return
+        started_at = self._read_started_at()
+        if started_at is None:
+            self._store_started_at(now)
+            started_at = now
+
+        too_big = self.rotate_bytes > 0 and size >= self.rotate_bytes
+        too_old = self.rotate_interval > 0 and now - started_at >= self.rotate_interval
+        if not (too_big or too_old) or size == 0:
+            return
+
+        if self.backup_count > 0:
+            for index in range(self.backup_count - 1, 0, -1):
+                older = f"{self.log_file}.{index}"
+                if os.path.exists(older):
+                    os.replace(older, f"{self.log_file}.{index + 1}")
+            os.replace(self.log_file, f"{self.log_file}.1")
+        else:
+            os.remove(self.log_file)
+        self._store_started_at(now)
+        self.stats["rotations"] += 1
+
+    def flush(self):
+        """Block until every queued record has been written"""
+        if self._thread is not None and self._pid == os.getpid():
+            self._buffer.join()
+
+    def close(self):
+        if self._thread is None or self._pid != os.getpid() or not self._thread.is_alive():
+            return
+        self._buffer.put(None)
+        self._thread.join(timeout=5)
@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+MIORA Memory Queue
+Antrian perintah in-memory untuk mode gateway satu proses, dengan journal opsional
+"""
+
+import itertools
+import json
+import os
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict, List, Any, Optional, Tuple
+
+import miora_config
+from miora_command_queue import MIORACommandQueue, Position
+from miora_metrics import METRICS
+
+
+class MIORAMemoryQueue:
+    """In-process command queue with the interface of MIORACommandQueue.
+
+    Used when the API and the handler share one process: enqueueing is a
+    deque append and the consumer is woken through `on_append` instead of
+    polling files. With a journal, every append is also written to a
+    MIORACommandQueue and commits advance it, so pending commands survive
+    a crash and are reloaded on start. Positions are (0, sequence number).
+    """
+
+    record_type = staticmethod(MIORACommandQueue.record_type)
+    prepare_record = staticmethod(MIORACommandQueue.prepare_record)
+    encode_cursor = staticmethod(MIORACommandQueue.encode_cursor)
+    decode_cursor = staticmethod(MIORACommandQueue.decode_cursor)
+
+    def __init__(self, journal: Optional[MIORACommandQueue] = None,
+                 read_batch_size: Optional[int] = None):
+        self.journal = journal
+        self.read_batch_size = read_batch_size or miora_config.QUEUE_READ_BATCH
+        self.queue_dir = journal.queue_dir if journal else "(memory)"
+        self.on_append: Optional[Callable[[], None]] = None
+
+        self._items: "deque[Tuple[int, Dict[str, Any]]]" = deque()
+        self._seq = 0
+        self._lock = threading.Lock()
+        self._append_lock = threading.Lock()
+        self._stats = {"enqueued": 0, "consumed": 0, "pending_by_type": {}}
+
+        if journal is not None:
+            # Commands journaled but not executed before the last shutdown
+            pending = [record for record, _ in journal.read_from(journal.read_offset(), float('inf'))]
+            self._push(pending)
+
+    def _push(self, records: List[Dict[str, Any]]):
+        with self._lock:
+            by_type = self._stats["pending_by_type"]
+            for record in records:
+                self._seq += 1
+                self._items.append((self._seq, record))
+                record_type = self.record_type(record)
+                by_type[record_type] = by_type.get(record_type, 0) + 1
+            self._stats["enqueued"] += len(records)
+
+    # ------------------------------------------------------------------
+    # Producer side
+    # ------------------------------------------------------------------
+
+    def append(self, record: Dict[str, Any]) -> Dict[str, Any]:
+        return self.append_many([record])[0]
+
+    def append_many(self, records: List[Dict[str, Any]], durable: bool = False) -> List[Dict[str, Any]]:
+        """Queue several records; `durable` only matters when journaling"""
+        prepared = [self.prepare_record(record) for record in records]
+        if not prepared:
+            return prepared
+        if self.journal is None:
+            self._push(prepared)
+        else:
+            # Journal order must match memory order; the fsync wait happens outside
+            # the lock so concurrent durable appends share one group commit
+            with self._append_lock:
+                self.journal.append_many(prepared)
+                self._push(prepared)
+            if durable or self.journal.sync_mode == "always":
+                self.journal.wait_synced()
+        if self.on_append is not None:
+            self.on_append()
+        return prepared
+
+    def import_legacy_file(self, path: Optional[str] = None) -> int:
+        """Move commands from a legacy commands.json list into the queue"""
+        path = path or miora_config.LEGACY_COMMANDS_FILE
+        try:
+            if os.path.getsize(path) <= 2:
+                return 0
+            with open(path, 'r', encoding='utf-8') as f:
+                commands = json.load(f)
+        except (OSError, ValueError):
+            return 0
+        if not isinstance(commands, list) or not commands:
+            return 0
+
+        records = [command if isinstance(command, dict) else {"command": str(command), "source": "file"}
+                   for command in commands]
+        self.append_many(records)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump([], f)
+        return len(records)
+
+    # ------------------------------------------------------------------
+    # Consumer side
+    # ------------------------------------------------------------------
+
+    def read_offset(self) -> Position:
+        with self._lock:
+            return 0, (self._items[0][0] - 1 if self._items else self._seq)
+
+    def read_from(self, position: Position, max_items: int) -> List[Tuple[Dict[str, Any], Position]]:
+        with self._lock:
+            if not self._items:
+                return []
+            start = max(0, position[1] - self._items[0][0] + 1)
+            stop = None if max_items == float('inf') else start + max_items
+            return [(record, (0, seq)) for seq, record in itertools.islice(self._items, start, stop)]
+
+    def read_batch(self, max_items: Optional[int] = None) -> List[Tuple[Dict[str, Any], Position]]:
+        return self.read_from(self.read_offset(), max_items or self.read_batch_size)
+
+    def commit(self, position: Position, records: Optional[List[Dict[str, Any]]] = None):
+        """Drop every record up to `position`"""
+        consumed = []
+        with self._lock:
+            while self._items and self._items[0][0] <= position[1]:
+                consumed.append(self._items.popleft()[1])
+            self._count_consumed_locked(consumed)
+
+        if self.journal is not None and consumed:
+            with self._append_lock:
+                journaled = self.journal.read_from(self.journal.read_offset(), len(consumed))
+                if journaled:
+                    self.journal.commit(journaled[-1][1], [record for record, _ in journaled])
+
+    def _count_consumed_locked(self, records: List[Dict[str, Any]]):
+        by_type = self._stats["pending_by_type"]
+        for record in records:
+            record_type = self.record_type(record)
+            remaining = by_type.get(record_type, 0) - 1
+            if remaining > 0:
+                by_type[record_type] = remaining
+            else:
+                by_type.pop(record_type, None)
+        self._stats["consumed"] += len(records)
+
+    def clear(self):
+        """Discard every pending command"""
+        with self._append_lock:
+            with self._lock:
+                self._count_consumed_locked([record for _, record in self._items])
+                self._items.clear()
+            if self.journal is not None:
+                self.journal.clear()
+
+    # ------------------------------------------------------------------
+    # Statistics and listing
+    # ------------------------------------------------------------------
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            oldest_at = self._items[0][1].get("enqueued_at") if self._items else None
+            return {
+                "depth": len(self._items),
+                "enqueued_total": self._stats["enqueued"],
+                "consumed_total": self._stats["consumed"],
+                "by_type": dict(self._stats["pending_by_type"]),
+                "oldest_enqueued_at": oldest_at,
+                "oldest_age_seconds": round(time.time() - oldest_at, 3) if oldest_at else 0.0
+            }
+
+    def list_pending(self, cursor: Optional[str] = None, limit: int = 100) -> tuple[List[Dict[str, Any]], Optional[str]]:
+        position = self.read_offset()
+        if cursor:
+            position = max(position, self.decode_cursor(cursor))
+        entries = self.read_from(position, limit)
+        next_cursor = self.encode_cursor(entries[-1][1]) if len(entries) == limit else None
+        return [record for record, _ in entries], next_cursor
+
+    def pending(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        return [record for record, _ in self.read_from(self.read_offset(), limit or float('inf'))]
+
+    def register_metrics(self, registry=None):
+        MIORACommandQueue.register_metrics(self, registry or METRICS)
+
+    def close(self):
+        if self.journal is not None:
+            self.journal.close()
@@ -0,0 +1,293 @@
+#!/usr/bin/env python3
+"""
+MIORA Memory Record File
+Format file memori ringkas (nilai JSON berurutan + indeks kunci terurut lebar tetap) yang dibaca lewat mmap
+"""
+
+import argparse
+import bisect
+import json
+import mmap
+import os
+import struct
+import sys
+import threading
+from array import array
+from typing import Dict, Iterable, Iterator, List, Any, Optional, Tuple
+
+import miora_config
+
+# Layout: header | value bytes ... | keys | key offsets | offsets | lengths | footer
+# The keys are one sorted JSON array. Key offsets (uint64) point at each
+# key's string literal inside it; with the value offsets (uint64) and
+# lengths (uint32) they form fixed-width little-endian tables in key order,
+# so a key is found by binary search over the mapping without parsing the
+# array. Version 1 files have no key offsets and are indexed into a dict.
+MAGIC = b"MIORAMEM"
+FOOTER_MAGIC = b"MIORAEND"
+VERSION = 2
+_HEADER = struct.Struct("<8sI")
+_FOOTER = struct.Struct("<QQQ8s")
+_encode_key = json.JSONEncoder(ensure_ascii=False).encode
+
+
+class _Stored:
+    """Placeholder for a value still in the record file"""
+
+    __slots__ = ()
+
+    def __repr__(self):
+        return "STORED"
+
+
+# Stands in for every value that has not been read out of the record file
+STORED = _Stored()
+
+
+def is_record_file(path: str) -> bool:
+    """True if `path` starts with the record file magic"""
+    try:
+        with open(path, "rb") as f:
+            return f.read(len(MAGIC)) == MAGIC
+    except OSError:
+        return False
+
+
+def _array(typecode: str, data: bytes) -> array:
+    values = array(typecode)
+    values.frombytes(data)
+    if sys.byteorder != "little":
+        values.byteswap()
+    return values
+
+
+def _little_endian(values: array) -> bytes:
+    if sys.byteorder != "little":
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+
+class MIORARecordFile:
+    """Read-only memory-mapped view of a record file.
+
+    Opening it reads only the header and footer: keys are found by binary
+    search over the fixed-width index tables in the mapping, and load()
+    decodes a single value on demand, so neither startup cost nor memory
+    use grows with the file. Readers that need every key call keys() once.
+    The mapping is reference counted: retain() keeps it open for another
+    reader and every holder calls close() once.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._refs = 1
+        self._refs_lock = threading.Lock()
+        self._views: List[memoryview] = []
+        self._file = open(path, "rb")
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            self._file.close()
+            raise ValueError(f"{path} is empty")
+        magic, version = _HEADER.unpack_from(self._map, 0)
+        keys_offset, keys_length, count, footer_magic = _FOOTER.unpack_from(self._map, len(self._map) - _FOOTER.size)
+        if magic != MAGIC or footer_magic != FOOTER_MAGIC or version not in (1, VERSION):
+            self.close()
+            raise ValueError(f"{path} is not a version {VERSION} memory record file")
+
+        self._count = count
+        self._keys_offset = keys_offset
+        self._keys_end = keys_offset + keys_length
+        # Version 1: no key offsets, so the keys are parsed into a dict
+        self._positions: Optional[Dict[str, int]] = None
+        table = self._keys_end
+        if version == 1:
+            self._keys: List[str] = self.keys()
+            self._positions = dict(zip(self._keys, range(count)))
+        else:
+            self._key_offsets = self._table("Q", table, count)
+            table += 8 * count
+        self._offsets = self._table("Q", table, count)
+        self._lengths = self._table("I", table + 8 * count, count)
+
+    def _table(self, typecode: str, start: int, count: int):
+        size = array(typecode).itemsize
+        if sys.byteorder != "little":
+            return _array(typecode, self._map[start:start + size * count])
+        view = memoryview(self._map)[start:start + size * count].cast(typecode)
+        self._views.append(view)
+        return view
+
+    def __len__(self) -> int:
+        return self._count
+
+    def key_at(self, position: int) -> str:
+        if self._positions is not None:
+            return self._keys[position]
+        start = self._key_offsets[position]
+        # Literals are separated by "," and the last one is followed by "]"
+        end = self._key_offsets[position + 1] - 1 if position + 1 < self._count else self._keys_end - 1
+        literal = self._map[start:end]
+        return json.loads(literal) if b"\\" in literal else literal[1:-1].decode("utf-8")
+
+    def find(self, key: str) -> Optional[int]:
+        """Position of `key` in the index, or None"""
+        if self._positions is not None:
+            return self._positions.get(key)
+        low, high = 0, self._count
+        while low < high:
+            middle = (low + high) // 2
+            if self.key_at(middle) < key:
+                low = middle + 1
+            else:
+                high = middle
+        return low if low < self._count and self.key_at(low) == key else None
+
+    def keys(self) -> List[str]:
+        """All keys in sorted order (parses the whole key array)"""
+        if self._positions is not None:
+            return list(self._keys)
+        return json.loads(self._map[self._keys_offset:self._keys_end])
+
+    def positions(self, keys: Iterable[str]) -> Iterator[Tuple[str, int]]:
+        """(key, position) of every key present, for keys given in sorted order
+
+        One pass over the key array, for callers that look up many keys.
+        """
+        index = self.keys()
+        position = 0
+        for key in keys:
+            position = bisect.bisect_left(index, key, position)
+            if position < len(index) and index[position] == key:
+                yield key, position
+
+    def __contains__(self, key: str) -> bool:
+        return self.find(key) is not None
+
+    def raw_at(self, position: int) -> bytes:
+        """Encoded JSON bytes of the value at an index position"""
+        offset = self._offsets[position]
+        return self._map[offset:offset + self._lengths[position]]
+
+    def raw(self, key: str) -> bytes:
+        """Encoded JSON bytes of a value"""
+        position = self.find(key)
+        if position is None:
+            raise KeyError(key)
+        return self.raw_at(position)
+
+    def load_at(self, position: int) -> Any:
+        return json.loads(self.raw_at(position))
+
+    def load(self, key: str) -> Any:
+        return json.loads(self.raw(key))
+
+    def retain(self) -> "MIORARecordFile":
+        with self._refs_lock:
+            self._refs += 1
+        return self
+
+    def close(self):
+        with self._refs_lock:
+            self._refs -= 1
+            if self._refs > 0:
+                return
+        # Views into the mapping must be released before it can be closed
+        for view in self._views:
+            view.release()
+        self._views = []
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        self._file.close()
+
+
+def load_stored(records: MIORARecordFile, items: Dict[str, Any]) -> Dict[str, Any]:
+    """Replace the STORED placeholders in `items` with their values from `records`"""
+    stored = sorted(key for key, value in items.items() if value is STORED)
+    for key, position in records.positions(stored):
+        items[key] = records.load_at(position)
+    return items
+
+
+def write_record_file(path: str, items: Iterable[Tuple[str, bytes]]):
+    """Write (key, encoded JSON value) pairs, sorted by key, to `path` and fsync it"""
+    literals: List[bytes] = []
+    offsets = array("Q")
+    lengths = array("I")
+    with open(path, "wb") as f:
+        f.write(_HEADER.pack(MAGIC, VERSION))
+        position = _HEADER.size
+        for key, value in items:
+            f.write(value)
+            literals.append(_encode_key(key).encode("utf-8"))
+            offsets.append(position)
+            lengths.append(len(value))
+            position += len(value)
+        key_offsets = array("Q")
+        key_position = position + 1
+        for literal in literals:
+            key_offsets.append(key_position)
+            key_position += len(literal) + 1
+        encoded_keys = b"[" + b",".join(literals) + b"]"
+        f.write(encoded_keys)
+        f.write(_little_endian(key_offsets))
+        f.write(_little_endian(offsets))
+        f.write(_little_endian(lengths))
+        f.write(_FOOTER.pack(position, len(encoded_keys), len(literals), FOOTER_MAGIC))
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def encode_value(value: Any) -> bytes:
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+# ----------------------------------------------------------------------
+# Import / export
+# ----------------------------------------------------------------------
+
+def import_json(json_file: str, record_file: str) -> int:
+    """Convert a JSON memory file into a record file; returns the number of keys"""
+    with open(json_file, "r", encoding="utf-8") as f:
+        content = f.read()
+    data = json.loads(content) if content.strip() else {}
+    tmp_file = record_file + ".tmp"
+    write_record_file(tmp_file, ((key, encode_value(data[key])) for key in sorted(data)))
+    os.replace(tmp_file, record_file)
+    return len(data)
+
+
+def export_json(record_file: str, json_file: str, indent: Optional[int] = 2) -> int:
+    """Convert a record file into the JSON memory format; returns the number of keys"""
+    records = MIORARecordFile(record_file)
+    try:
+        data = {key: records.load_at(position) for position, key in enumerate(records.keys())}
+    finally:
+        records.close()
+    tmp_file = json_file + ".tmp"
+    with open(tmp_file, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=indent, ensure_ascii=False)
+    os.replace(tmp_file, json_file)
+    return len(data)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert MIORA memory between JSON and the record format")
+    parser.add_argument("action", choices=["import", "export"],
+                        help="import: JSON -> record file, export: record file -> JSON")
+    parser.add_argument("source")
+    parser.add_argument("target", nargs="?", default=miora_config.MEMORY_FILE,
+                        help="file to write (default: the live memory file)")
+    args = parser.parse_args()
+
+    if args.action == "import":
+        count = import_json(args.source, args.target)
+    else:
+        count = export_json(args.source, args.target)
+    print(f"✅ Wrote {count} keys to {args.target} (stop the handler before replacing the live memory file)")
+
+
+if __name__ == "__main__":
+    main()
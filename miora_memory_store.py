@@ -0,0 +1,516 @@
+#!/usr/bin/env python3
+"""
+MIORA Memory Store
+Memori resident dengan write-ahead log dan snapshot berkala ke miora_memory.json
+"""
+
+import atexit
+import bisect
+import json
+import os
+import re
+import threading
+import time
+from datetime import datetime
+from typing import Dict, List, Any, Optional, Tuple
+
+import miora_config
+from miora_memory_records import STORED, MIORARecordFile, encode_value, is_record_file, load_stored, write_record_file
+from miora_metrics import METRICS
+
+MEMORY_WRITE_SECONDS = METRICS.histogram(
+    "miora_memory_write_seconds", "Time to apply and log one memory update")
+MEMORY_SNAPSHOT_SECONDS = METRICS.histogram(
+    "miora_memory_snapshot_seconds", "Time to write a memory snapshot")
+
+# Keys written by UPDATE_MEMORY without "key=" (data_<unix seconds>)
+TIMESTAMP_KEY = re.compile(r"^data_(\d+)$")
+
+
+def timestamp_of(key: str) -> Optional[int]:
+    """Unix time encoded in a data_<ts> key, or None for other keys"""
+    match = TIMESTAMP_KEY.match(key)
+    return int(match.group(1)) if match else None
+
+
+def parse_time(value: str) -> float:
+    """Unix timestamp or ISO 8601 time from a query parameter"""
+    try:
+        return float(value)
+    except ValueError:
+        return datetime.fromisoformat(value).timestamp()
+
+
+def query_memory(store: "MIORAMemoryStore", args: Dict[str, str]) -> Tuple[int, Dict[str, Any]]:
+    """Answer a memory query; returns (HTTP status, JSON body)
+
+    `key` looks up one entry, `since`/`until` select data_<ts> entries by
+    time and otherwise `prefix` (default: every key) scans in key order.
+    Scans return at most `limit` entries and a `next_cursor` to pass back
+    as `cursor`.
+    """
+    key = args.get("key")
+    if key is not None:
+        if key not in store:
+            return 404, {"success": False, "message": f"No memory entry {key}"}
+        return 200, {"success": True, "key": key, "value": store.get(key)}
+
+    try:
+        limit = min(max(int(args.get("limit") or 100), 1), miora_config.LIST_MAX_LIMIT)
+        cursor = args.get("cursor") or None
+        if args.get("since") or args.get("until"):
+            start = parse_time(args["since"]) if args.get("since") else None
+            end = parse_time(args["until"]) if args.get("until") else None
+            items, next_cursor = store.scan_time(start, end, cursor, limit)
+            entries = [{"key": key, "timestamp": ts, "value": value} for ts, key, value in items]
+        else:
+            items, next_cursor = store.scan_prefix(args.get("prefix") or "", cursor, limit)
+            entries = [{"key": key, "value": value} for key, value in items]
+    except ValueError as e:
+        return 400, {"success": False, "message": str(e)}
+    return 200, {"success": True, "entries": entries, "next_cursor": next_cursor}
+
+
+class MIORAMemoryView:
+    """Values and deleted keys of a memory backup view (see MIORAMemoryStore.backup_view)
+
+    Values still in the record file are placeholders until resolve(); the
+    view keeps that file mapped until it is resolved or released, even if a
+    snapshot replaces it meanwhile.
+    """
+
+    def __init__(self, items: Dict[str, Any], deleted: List[str], records: Optional[MIORARecordFile]):
+        self._items = items
+        self.deleted = deleted
+        self._records = records
+
+    def keys(self) -> List[str]:
+        return list(self._items)
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def resolve(self) -> Dict[str, Any]:
+        """Decode the remaining stored values and release the record file"""
+        if self._records is not None:
+            try:
+                load_stored(self._records, self._items)
+            finally:
+                self.release()
+        return self._items
+
+    def release(self):
+        if self._records is not None:
+            self._records.close()
+            self._records = None
+
+
+class MIORAMemoryStore:
+    """In-memory key/value store owned by the command handler.
+
+    Every update is applied to the resident dict and appended to a small
+    write-ahead log. A background thread periodically writes a coalesced
+    snapshot to the memory file and truncates the log, so a burst of
+    updates costs one append each instead of a full rewrite. A sorted key
+    list and a timeline of data_<ts> keys are kept alongside the dict for
+    prefix and time-range queries. Appends reach the OS at once and are
+    fsynced according to MIORA_MEMORY_SYNC_MODE (see sync()).
+
+    With MIORA_MEMORY_FORMAT=records snapshots are record files: only the
+    keys are read at startup and values stay in the memory-mapped file
+    (as the STORED placeholder) until they are read or replaced. The format of an
+    existing file is detected on load, so switching formats converts the
+    file at the next snapshot.
+    """
+
+    def __init__(self, memory_file: Optional[str] = None,
+                 snapshot_interval: Optional[float] = None,
+                 snapshot_ops: Optional[int] = None,
+                 memory_format: Optional[str] = None,
+                 sync_mode: Optional[str] = None):
+        self.memory_file = memory_file or miora_config.MEMORY_FILE
+        self.format = memory_format or miora_config.MEMORY_FORMAT
+        self.wal_file = self.memory_file + ".wal"
+        self.old_wal_file = self.memory_file + ".wal.old"
+        self.snapshot_interval = snapshot_interval or miora_config.MEMORY_SNAPSHOT_INTERVAL
+        self.snapshot_ops = snapshot_ops or miora_config.MEMORY_SNAPSHOT_OPS
+        self.sync_mode = sync_mode or miora_config.MEMORY_SYNC_MODE
+
+        self._data: Dict[str, Any] = {}
+        self._sorted_keys: List[str] = []
+        self._timeline: List[Tuple[int, str]] = []
+        self._records: Optional[MIORARecordFile] = None
+        self._lock = threading.RLock()
+        self._snapshot_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._pending_ops = 0
+        # Log lines written but not fsynced yet (see sync)
+        self._unsynced = False
+        # Keys changed since the last backup view (see backup_view)
+        self._dirty: Dict[str, None] = {}
+        self._wal = None
+        self._closed = False
+
+        self.load()
+        self._wal = open(self.wal_file, 'a', encoding='utf-8')
+        self._thread = threading.Thread(target=self._snapshot_loop, name="miora-memory-snapshot", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    # ------------------------------------------------------------------
+    # Loading
+    # ------------------------------------------------------------------
+
+    def load(self):
+        """Load the last snapshot and replay any logged updates on top of it"""
+        data = {}
+        records = None
+        converted = False
+        if is_record_file(self.memory_file):
+            records = MIORARecordFile(self.memory_file)
+            data = dict.fromkeys(records.keys(), STORED)
+            if self.format != "records":
+                load_stored(records, data)
+                records.close()
+                records = None
+                converted = True
+        elif os.path.exists(self.memory_file):
+            with open(self.memory_file, 'r', encoding='utf-8') as f:
+                content = f.read()
+            if content.strip():
+                data = json.loads(content)
+            converted = self.format == "records"
+
+        replayed = 0
+        for wal_file in (self.old_wal_file, self.wal_file):
+            replayed += self._replay(wal_file, data)
+
+        with self._lock:
+            if self._records is not None:
+                self._records.close()
+            self._records = records
+            self._data = data
+            self._sorted_keys = sorted(data)
+            # Only the data_ range of the sorted keys can hold timestamped keys
+            first = bisect.bisect_left(self._sorted_keys, "data_")
+            last = bisect.bisect_left(self._sorted_keys, "data`")
+            self._timeline = sorted((ts, key) for key, ts in
+                                    ((key, timestamp_of(key)) for key in self._sorted_keys[first:last])
+                                    if ts is not None)
+            # A file in the other format is rewritten by the next snapshot
+            self._pending_ops = replayed + converted
+
+    @staticmethod
+    def _replay(wal_file: str, data: Dict[str, Any]) -> int:
+        if not os.path.exists(wal_file):
+            return 0
+        count = 0
+        with open(wal_file, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    # Torn write at the end of the log
+                    break
+                if entry.get("op") == "set":
+                    data[entry["key"]] = entry["value"]
+                elif entry.get("op") == "del":
+                    data.pop(entry["key"], None)
+                count += 1
+        return count
+
+    # ------------------------------------------------------------------
+    # Access
+    # ------------------------------------------------------------------
+
+    def _value(self, key: str, value: Any) -> Any:
+        """Decode a value still stored in the record file (caller holds the lock)"""
+        return self._records.load(key) if value is STORED else value
+
+    def get(self, key: str, default: Any = None) -> Any:
+        with self._lock:
+            return self._value(key, self._data[key]) if key in self._data else default
+
+    def __contains__(self, key: str) -> bool:
+        with self._lock:
+            return key in self._data
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._data)
+
+    def keys(self) -> List[str]:
+        with self._lock:
+            return list(self._data.keys())
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Return a point-in-time copy of the whole memory"""
+        with self._lock:
+            data = dict(self._data)
+            return load_stored(self._records, data) if self._records is not None else data
+
+    def set(self, key: str, value: Any):
+        """Store a value and append the update to the write-ahead log"""
+        started = time.perf_counter()
+        line = self._encode({"op": "set", "key": key, "value": value})
+        # Log and apply under one lock so a snapshot sees both or neither
+        with self._lock:
+            self._append_locked(line)
+            if key not in self._data:
+                self._index_add(key)
+            self._data[key] = value
+            self._dirty[key] = None
+        MEMORY_WRITE_SECONDS.observe(time.perf_counter() - started)
+
+    def delete(self, key: str) -> bool:
+        started = time.perf_counter()
+        line = self._encode({"op": "del", "key": key})
+        with self._lock:
+            if key not in self._data:
+                return False
+            self._append_locked(line)
+            del self._data[key]
+            self._index_remove(key)
+            self._dirty[key] = None
+        MEMORY_WRITE_SECONDS.observe(time.perf_counter() - started)
+        return True
+
+    def _index_add(self, key: str):
+        """Insert a new key into the sorted indexes (caller holds the lock)"""
+        bisect.insort(self._sorted_keys, key)
+        ts = timestamp_of(key)
+        if ts is not None:
+            bisect.insort(self._timeline, (ts, key))
+
+    def _index_remove(self, key: str):
+        """Remove a deleted key from the sorted indexes (caller holds the lock)"""
+        index = bisect.bisect_left(self._sorted_keys, key)
+        if index < len(self._sorted_keys) and self._sorted_keys[index] == key:
+            del self._sorted_keys[index]
+        ts = timestamp_of(key)
+        if ts is not None:
+            index = bisect.bisect_left(self._timeline, (ts, key))
+            if index < len(self._timeline) and self._timeline[index] == (ts, key):
+                del self._timeline[index]
+
+    # ------------------------------------------------------------------
+    # Queries
+    # ------------------------------------------------------------------
+
+    def scan_prefix(self, prefix: str = "", after: Optional[str] = None,
+                    limit: int = 100) -> Tuple[List[Tuple[str, Any]], Optional[str]]:
+        """Up to `limit` (key, value) pairs whose key starts with `prefix`, in key order
+
+        Pass the returned cursor as `after` to get the next page; it is None
+        on the last page.
+        """
+        with self._lock:
+            keys = self._sorted_keys
+            if after is not None and after >= prefix:
+                index = bisect.bisect_right(keys, after)
+            else:
+                index = bisect.bisect_left(keys, prefix)
+            items = []
+            while index < len(keys) and keys[index].startswith(prefix) and len(items) < limit:
+                key = keys[index]
+                items.append((key, self._value(key, self._data[key])))
+                index += 1
+            more = index < len(keys) and keys[index].startswith(prefix)
+        return items, items[-1][0] if items and more else None
+
+    def scan_time(self, start: Optional[float] = None, end: Optional[float] = None,
+                  after: Optional[str] = None,
+                  limit: int = 100) -> Tuple[List[Tuple[int, str, Any]], Optional[str]]:
+        """Up to `limit` (timestamp, key, value) data_<ts> entries with start <= ts < end, oldest first
+
+        `after` is the cursor (last key) returned by the previous page.
+        """
+        after_ts = timestamp_of(after) if after is not None else None
+        if after is not None and after_ts is None:
+            raise ValueError(f"Invalid cursor: {after}")
+        with self._lock:
+            timeline = self._timeline
+            if after_ts is not None:
+                index = bisect.bisect_right(timeline, (after_ts, after))
+            elif start is not None:
+                index = bisect.bisect_left(timeline, (start, ""))
+            else:
+                index = 0
+            items = []
+            while index < len(timeline) and (end is None or timeline[index][0] < end) and len(items) < limit:
+                ts, key = timeline[index]
+                if start is None or ts >= start:
+                    items.append((ts, key, self._value(key, self._data[key])))
+                index += 1
+            more = index < len(timeline) and (end is None or timeline[index][0] < end)
+        return items, items[-1][1] if items and more else None
+
+    def backup_view(self, full: bool = False, track: bool = True) -> "MIORAMemoryView":
+        """Point-in-time view of memory for a backup
+
+        With full=True the view holds the whole memory, otherwise only keys
+        changed since the previous view (and the keys deleted since then).
+        With track=True the changed-key set is reset. Only references are
+        copied under the lock: values still in the record file are decoded
+        by MIORAMemoryView.resolve() in the caller's thread, from the file
+        as it was when the view was taken.
+        """
+        with self._lock:
+            if track:
+                dirty, self._dirty = self._dirty, {}
+            if full:
+                items, deleted = dict(self._data), []
+            else:
+                items = {key: self._data[key] for key in dirty if key in self._data}
+                deleted = [key for key in dirty if key not in self._data]
+            records = self._records.retain() if self._records is not None else None
+        return MIORAMemoryView(items, deleted, records)
+
+    def mark_dirty(self, keys: List[str]):
+        """Include keys in the next backup view again (after a failed backup)"""
+        with self._lock:
+            for key in keys:
+                self._dirty[key] = None
+
+    @staticmethod
+    def _encode(entry: Dict[str, Any]) -> str:
+        return json.dumps(entry, ensure_ascii=False, separators=(",", ":")) + "\n"
+
+    def _append_locked(self, line: str):
+        """Append one log line (caller holds the lock, so a snapshot cannot rotate in between)"""
+        self._wal.write(line)
+        self._wal.flush()
+        if self.sync_mode == "always":
+            os.fsync(self._wal.fileno())
+        else:
+            self._unsynced = True
+        self._pending_ops += 1
+        if self._pending_ops >= self.snapshot_ops:
+            self._wake.set()
+
+    # ------------------------------------------------------------------
+    # Snapshots
+    # ------------------------------------------------------------------
+
+    def _snapshot_loop(self):
+        while not self._closed:
+            self._wake.wait(self.snapshot_interval)
+            self._wake.clear()
+            if self._closed:
+                break
+            try:
+                self.snapshot()
+            except Exception as e:
+                print(f"⚠️ Memory snapshot failed: {str(e)}")
+
+    def snapshot(self, force: bool = False):
+        """Write a coalesced snapshot of memory and truncate the log"""
+        with self._snapshot_lock:
+            started = time.perf_counter()
+            with self._lock:
+                if not self._pending_ops and not force:
+                    return
+                data = dict(self._data)
+                self._rotate_wal()
+                self._pending_ops = 0
+
+            tmp_file = self.memory_file + ".tmp"
+            if self.format == "records":
+                self._write_records(tmp_file, data)
+            else:
+                with open(tmp_file, 'w', encoding='utf-8') as f:
+                    json.dump(data, f, indent=2, ensure_ascii=False)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(tmp_file, self.memory_file)
+
+            # The snapshot now covers everything in the rotated log
+            if os.path.exists(self.old_wal_file):
+                os.remove(self.old_wal_file)
+            MEMORY_SNAPSHOT_SECONDS.observe(time.perf_counter() - started)
+
+    def _write_records(self, tmp_file: str, data: Dict[str, Any]):
+        """Write a record file snapshot and move the written values out of the heap"""
+        keys = sorted(data)
+        # Unchanged values are copied from the current file without decoding
+        stored = dict(self._records.positions(key for key in keys if data[key] is STORED)) \
+            if self._records is not None else {}
+        write_record_file(tmp_file, (
+            (key, self._records.raw_at(stored[key]) if data[key] is STORED else encode_value(data[key]))
+            for key in keys))
+        with self._lock:
+            # The old mapping must be closed before the file can be replaced on Windows
+            # (a backup view still holding it makes this snapshot fail and retry later)
+            if self._records is not None:
+                self._records.close()
+            try:
+                os.replace(tmp_file, self.memory_file)
+            finally:
+                # Reopen whichever file is in place so stored values stay readable
+                self._records = MIORARecordFile(self.memory_file)
+            for key, value in data.items():
+                # Keys updated since the copy keep their newer value
+                if key in self._data and self._data[key] is value:
+                    self._data[key] = STORED
+
+    def _rotate_wal(self):
+        """Move the current log aside (caller holds the lock)"""
+        self._wal.flush()
+        os.fsync(self._wal.fileno())
+        self._wal.close()
+        self._unsynced = False
+
+        if os.path.exists(self.old_wal_file):
+            # A previous snapshot failed: keep its log entries in order
+            with open(self.wal_file, 'r', encoding='utf-8') as src, \
+                    open(self.old_wal_file, 'a', encoding='utf-8') as dst:
+                dst.write(src.read())
+            os.remove(self.wal_file)
+        else:
+            os.replace(self.wal_file, self.old_wal_file)
+
+        self._wal = open(self.wal_file, 'a', encoding='utf-8')
+
+    def flush(self):
+        """Force logged updates to stable storage"""
+        with self._lock:
+            if self._wal is None or not self._unsynced:
+                return
+            self._unsynced = False
+            # fsync a duplicate outside the lock: writers keep appending, and a
+            # snapshot may rotate the log meanwhile (rotation fsyncs it anyway)
+            fd = os.dup(self._wal.fileno())
+        try:
+            os.fsync(fd)
+        except OSError:
+            with self._lock:
+                self._unsynced = True
+            raise
+        finally:
+            os.close(fd)
+
+    def sync(self):
+        """Group commit: fsync the log before the commands that wrote it are committed
+
+        In the default batch mode the handler calls this once per queue
+        commit, so an update is durable before its command can no longer be
+        replayed. `always` fsyncs every append, `none` leaves it to the OS.
+        """
+        if self.sync_mode == "batch":
+            self.flush()
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        self._wake.set()
+        try:
+            self.snapshot()
+        finally:
+            with self._lock:
+                if self._wal is not None:
+                    self._wal.close()
+                    self._wal = None
+                if self._records is not None:
+                    self._records.close()
+                    self._records = None
@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+"""
+MIORA Module Runner
+Eksekusi RUN_MODULE dengan cache modul, hot reload, timeout dan worker process
+"""
+
+import importlib
+import multiprocessing
+import os
+import queue
+import sys
+import threading
+from typing import Dict, Any, Optional, Tuple
+
+try:
+    import resource
+except ImportError:  # Windows has no rlimits
+    resource = None
+
+import miora_config
+
+# Per-process cache: module name -> (module, source mtime when loaded)
+_module_cache: Dict[str, Tuple[Any, Optional[float]]] = {}
+# One lock per module name, so a module that hangs while importing only
+# blocks later runs of that same module
+_import_locks: Dict[str, threading.Lock] = {}
+_import_locks_guard = threading.Lock()
+
+
+def _source_mtime(module) -> Optional[float]:
+    path = getattr(module, "__file__", None)
+    try:
+        return os.path.getmtime(path) if path else None
+    except OSError:
+        return None
+
+
+def load_module(module_name: str):
+    """Import a module once and reload it when its source file changes"""
+    with _import_locks_guard:
+        if os.getcwd() not in sys.path:
+            sys.path.insert(0, os.getcwd())
+        lock = _import_locks.setdefault(module_name, threading.Lock())
+
+    with lock:
+        cached = _module_cache.get(module_name)
+        if cached is not None:
+            module, mtime = cached
+            current = _source_mtime(module)
+            if current == mtime:
+                return module
+            module = importlib.reload(module)
+        else:
+            module = importlib.import_module(module_name)
+
+        _module_cache[module_name] = (module, _source_mtime(module))
+        return module
+
+
+def run_module(module_name: str) -> Tuple[bool, str]:
+    """Load a module and call its main(), returning (success, result message)"""
+    try:
+        module = load_module(module_name)
+    except ImportError:
+        return False, f"Module '{module_name}' not found"
+
+    if hasattr(module, 'main'):
+        result = module.main()
+        return True, f"Module '{module_name}' executed successfully: {result}"
+    return False, f"Module '{module_name}' loaded but no main() function found"
+
+
+def _limit_memory(memory_limit_mb: int):
+    if resource is None or memory_limit_mb <= 0:
+        return
+    limit = memory_limit_mb * 1024 * 1024
+    resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+
+
+def _worker_main(conn, memory_limit_mb: int):
+    """Entry point of a warm module worker process"""
+    _limit_memory(memory_limit_mb)
+    while True:
+        try:
+            module_name = conn.recv()
+        except (EOFError, OSError):
+            return
+        if module_name is None:
+            return
+        try:
+            conn.send(run_module(module_name))
+        except MemoryError:
+            conn.send((False, "Module execution failed: memory limit exceeded"))
+        except BaseException as e:
+            conn.send((False, f"Module execution failed: {str(e)}"))
+
+
+class _ModuleWorker:
+    """One warm worker process and the pipe used to talk to it"""
+
+    def __init__(self, context, memory_limit_mb: int):
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(target=_worker_main, args=(child_conn, memory_limit_mb),
+                                       name="miora-module-worker", daemon=True)
+        self.process.start()
+        child_conn.close()
+
+    def call(self, module_name: str, timeout: float) -> Tuple[bool, str]:
+        self.conn.send(module_name)
+        if not self.conn.poll(timeout):
+            raise TimeoutError
+        return self.conn.recv()
+
+    def kill(self):
+        self.process.kill()
+        self.process.join(timeout=5)
+        self.conn.close()
+
+    def stop(self):
+        try:
+            self.conn.send(None)
+        except OSError:
+            pass
+        self.process.join(timeout=2)
+        if self.process.is_alive():
+            self.process.kill()
+        self.conn.close()
+
+
+class MIORAModuleRunner:
+    """Runs RUN_MODULE on warm worker processes (default) or inline.
+
+    In process mode a module that times out or exceeds its memory limit
+    only costs its worker, which is killed and replaced. Workers are
+    spawned on demand, up to `workers`, and then kept warm. Inline mode
+    runs modules on threads of the handler process: it has no memory
+    limit, and a module that times out keeps running on its abandoned
+    thread for as long as it hangs.
+    """
+
+    def __init__(self, mode: Optional[str] = None,
+                 workers: Optional[int] = None,
+                 timeout: Optional[float] = None,
+                 memory_limit_mb: Optional[int] = None):
+        self.mode = mode or miora_config.MODULE_MODE
+        self.workers = workers or miora_config.WORKERS_MODULE
+        self.timeout = timeout or miora_config.MODULE_TIMEOUT
+        self.memory_limit_mb = memory_limit_mb if memory_limit_mb is not None else miora_config.MODULE_MEMORY_LIMIT_MB
+        self._idle: "queue.Queue[_ModuleWorker]" = queue.Queue()
+        self._spawned = 0
+        self._spawn_lock = threading.Lock()
+        self._context = multiprocessing.get_context("spawn") if self.mode == "process" else None
+
+    def _spawn(self) -> _ModuleWorker:
+        return _ModuleWorker(self._context, self.memory_limit_mb)
+
+    def _acquire_worker(self) -> _ModuleWorker:
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._spawn_lock:
+            grow = self._spawned < self.workers
+            if grow:
+                self._spawned += 1
+        if not grow:
+            return self._idle.get()
+        try:
+            return self._spawn()
+        except BaseException:
+            with self._spawn_lock:
+                self._spawned -= 1
+            raise
+
+    def run(self, module_name: str) -> Tuple[bool, str]:
+        """Run a module's main() and return (success, result message)"""
+        if self.mode == "process":
+            return self._run_in_worker(module_name)
+        return self._run_inline(module_name)
+
+    def _run_inline(self, module_name: str) -> Tuple[bool, str]:
+        outcome: Dict[str, Any] = {}
+
+        def target():
+            try:
+                outcome["result"] = run_module(module_name)
+            except BaseException as e:
+                outcome["error"] = e
+
+        # No isolation: a hung module keeps its thread, the handler just stops waiting
+        thread = threading.Thread(target=target, name=f"miora-module-{module_name}", daemon=True)
+        thread.start()
+        thread.join(self.timeout)
+        if thread.is_alive():
+            return False, f"Module '{module_name}' timed out after {self.timeout:g}s"
+        if "error" in outcome:
+            return False, f"Module execution failed: {str(outcome['error'])}"
+        return outcome["result"]
+
+    def _run_in_worker(self, module_name: str) -> Tuple[bool, str]:
+        worker = self._acquire_worker()
+        try:
+            success, result = worker.call(module_name, self.timeout)
+        except TimeoutError:
+            worker.kill()
+            worker = self._spawn()
+            return False, f"Module '{module_name}' timed out after {self.timeout:g}s"
+        except (EOFError, OSError):
+            # The worker died (e.g. killed for exceeding its memory limit)
+            worker.kill()
+            worker = self._spawn()
+            return False, f"Module execution failed: worker process for '{module_name}' exited"
+        finally:
+            self._idle.put(worker)
+        return success, result
+
+    def close(self):
+        while True:
+            try:
+                self._idle.get_nowait().stop()
+            except queue.Empty:
+                break
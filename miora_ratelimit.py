@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+"""
+MIORA Rate Limiting
+Token bucket per source dan backpressure berbasis kedalaman antrian untuk API
+"""
+
+import math
+import threading
+import time
+from typing import Dict, Any, Optional
+
+import miora_config
+from miora_metrics import METRICS
+
+THROTTLED_TOTAL = METRICS.counter(
+    "miora_commands_throttled_total", "Commands refused with 429", ("source", "reason"))
+
+# Sources beyond this many distinct names share the "other" metric label
+MAX_SOURCE_LABELS = 100
+# Idle buckets are dropped once this many sources were seen
+MAX_BUCKETS = 10000
+
+
+class Throttled(Exception):
+    """Raised when a request must be refused with 429 Too Many Requests"""
+
+    def __init__(self, message: str, retry_after: float, reason: str):
+        super().__init__(message)
+        self.retry_after = max(1, math.ceil(retry_after))
+        self.reason = reason
+
+
+def parse_overrides(text: str) -> Dict[str, float]:
+    """Parse "source=rate,source=rate" into a dict, skipping malformed entries"""
+    overrides = {}
+    for item in text.split(","):
+        source, _, rate = item.partition("=")
+        try:
+            overrides[source.strip()] = float(rate)
+        except ValueError:
+            continue
+    return overrides
+
+
+class TokenBucket:
+    """Refills `rate` tokens per second up to `capacity`; may go into debt for large batches"""
+
+    __slots__ = ("rate", "capacity", "tokens", "updated")
+
+    def __init__(self, rate: float, capacity: float, now: Optional[float] = None):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic() if now is None else now
+
+    def _refill(self, now: float):
+        if now > self.updated:
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+
+    def take(self, amount: float, now: float) -> float:
+        """Take `amount` tokens; returns 0 on success, otherwise seconds until it would succeed
+
+        A batch larger than the bucket is admitted once the bucket is full
+        and leaves it in debt, so it cannot be starved forever.
+        """
+        self._refill(now)
+        needed = min(amount, self.capacity)
+        if self.tokens >= needed:
+            self.tokens -= amount
+            return 0.0
+        return (needed - self.tokens) / self.rate
+
+    def is_full(self, now: float) -> bool:
+        self._refill(now)
+        return self.tokens >= self.capacity
+
+
+class MIORARateLimiter:
+    """Per-source token buckets plus queue depth watermarks with hysteresis.
+
+    Once the queue depth reaches the high watermark every enqueue is refused
+    until the handler has drained it below the low watermark, so producers
+    back off as a whole instead of flapping around a single threshold. The
+    depth comes from queue.stats() at most every MIORA_BACKPRESSURE_CHECK_INTERVAL.
+    Buckets live in each API process.
+    """
+
+    def __init__(self, queue, rate: Optional[float] = None, burst: Optional[float] = None,
+                 overrides: Optional[Dict[str, float]] = None,
+                 high_watermark: Optional[int] = None, low_watermark: Optional[int] = None):
+        self.queue = queue
+        self.rate = miora_config.RATE_LIMIT_PER_SOURCE if rate is None else rate
+        self.burst = burst or miora_config.RATE_LIMIT_BURST
+        self.overrides = parse_overrides(miora_config.RATE_LIMIT_OVERRIDES) if overrides is None else overrides
+        self.high_watermark = miora_config.QUEUE_HIGH_WATERMARK if high_watermark is None else high_watermark
+        self.low_watermark = miora_config.QUEUE_LOW_WATERMARK if low_watermark is None else low_watermark
+
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._lock = threading.Lock()
+        self._throttled: Dict[str, Dict[str, int]] = {}
+        self._labels = set()
+
+        self.saturated = False
+        self._depth = 0
+        self._drain_rate = 0.0
+        self._checked = 0.0
+        self._consumed = None
+        self._depth_lock = threading.Lock()
+
+    # ------------------------------------------------------------------
+    # Checks
+    # ------------------------------------------------------------------
+
+    def check(self, source: str, count: int = 1):
+        """Admit `count` commands from `source` or raise Throttled"""
+        self._check_backpressure(source, count)
+        self._check_rate(source, count)
+
+    def _check_rate(self, source: str, count: int):
+        rate = self.overrides.get(source, self.rate)
+        if rate <= 0:
+            return
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(source)
+            if bucket is None:
+                if len(self._buckets) >= MAX_BUCKETS:
+                    self._prune_locked(now)
+                bucket = self._buckets[source] = TokenBucket(rate, max(self.burst, rate), now)
+            wait = bucket.take(count, now)
+        if wait:
+            self._record(source, "rate_limit", count)
+            raise Throttled(f"Rate limit exceeded for source '{source}' ({rate:g} commands/s)",
+                            wait, "rate_limit")
+
+    def _prune_locked(self, now: float):
+        # Full buckets carry no state worth keeping
+        for source in [s for s, bucket in self._buckets.items() if bucket.is_full(now)]:
+            del self._buckets[source]
+
+    def _check_backpressure(self, source: str, count: int):
+        if self.high_watermark <= 0:
+            return
+        self._refresh_depth()
+        if self.saturated:
+            self._record(source, "backpressure", count)
+            raise Throttled(f"Queue is full ({self._depth} commands waiting), retry later",
+                            self.retry_after_drain(), "backpressure")
+
+    def _refresh_depth(self):
+        now = time.monotonic()
+        if now - self._checked < miora_config.BACKPRESSURE_CHECK_INTERVAL or not self._depth_lock.acquire(blocking=False):
+            return
+        try:
+            stats = self.queue.stats()
+            elapsed = now - self._checked
+            if self._consumed is not None and elapsed > 0:
+                self._drain_rate = max(0.0, stats["consumed_total"] - self._consumed) / elapsed
+            self._consumed = stats["consumed_total"]
+            self._checked = now
+            self._depth = stats["depth"]
+            if self._depth >= self.high_watermark:
+                self.saturated = True
+            elif self._depth <= self.low_watermark:
+                self.saturated = False
+        finally:
+            self._depth_lock.release()
+
+    def retry_after_drain(self) -> float:
+        """Seconds until the handler should be back under the low watermark at its current pace"""
+        if self._drain_rate <= 0:
+            return miora_config.BACKPRESSURE_RETRY_AFTER
+        return min(60.0, max(1.0, (self._depth - self.low_watermark) / self._drain_rate))
+
+    # ------------------------------------------------------------------
+    # Statistics
+    # ------------------------------------------------------------------
+
+    def _record(self, source: str, reason: str, count: int):
+        with self._lock:
+            if source not in self._throttled and len(self._throttled) >= MAX_BUCKETS:
+                source = "other"
+            counts = self._throttled.setdefault(source, {})
+            counts[reason] = counts.get(reason, 0) + count
+            if source in self._labels or len(self._labels) < MAX_SOURCE_LABELS:
+                self._labels.add(source)
+                label = source
+            else:
+                label = "other"
+        THROTTLED_TOTAL.inc(count, source=label, reason=reason)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            throttled = {source: dict(counts) for source, counts in self._throttled.items()}
+        return {
+            "rate_per_source": self.rate,
+            "burst": self.burst,
+            "overrides": self.overrides,
+            "high_watermark": self.high_watermark,
+            "low_watermark": self.low_watermark,
+            "saturated": self.saturated,
+            "throttled": throttled
+        }
@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""
+MIORA Result Store
+Penyimpanan hasil eksekusi perintah per ID (SQLite) dengan TTL dan long-poll
+"""
+
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Any, Optional
+
+import miora_config
+
+STATUS_QUEUED = "queued"
+STATUS_SUCCESS = "success"
+STATUS_FAILED = "failed"
+FINISHED_STATUSES = (STATUS_SUCCESS, STATUS_FAILED)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS command_results (
+    id TEXT PRIMARY KEY,
+    type TEXT,
+    command TEXT,
+    source TEXT,
+    status TEXT NOT NULL,
+    result TEXT,
+    enqueued_at REAL,
+    finished_at REAL,
+    latency_ms REAL,
+    expires_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS command_results_expires ON command_results (expires_at);
+"""
+
+_COLUMNS = ("id", "type", "command", "source", "status", "result",
+            "enqueued_at", "finished_at", "latency_ms")
+
+
+class MIORAResultStore:
+    """Command outcomes indexed by command ID.
+
+    The API records every accepted command as queued and the handler
+    overwrites the row with the outcome, so a lookup by ID is a single
+    primary-key read in either process. Rows expire after the TTL and are
+    evicted in the background of the write path.
+    """
+
+    def __init__(self, db_file: Optional[str] = None,
+                 ttl: Optional[float] = None,
+                 evict_interval: Optional[float] = None):
+        self.db_file = db_file or miora_config.RESULTS_FILE
+        self.ttl = ttl or miora_config.RESULT_TTL
+        self.evict_interval = evict_interval or miora_config.RESULT_EVICT_INTERVAL
+        self._local = threading.local()
+        self._last_evict = 0.0
+        self._evict_lock = threading.Lock()
+        # Wakes waiters in this process at once; other processes poll
+        self._finished = threading.Condition()
+
+        with self._connection() as conn:
+            conn.executescript(_SCHEMA)
+
+    def _connection(self) -> sqlite3.Connection:
+        # SQLite connections are per thread and must not cross a fork
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.db_file, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    # ------------------------------------------------------------------
+    # Writes
+    # ------------------------------------------------------------------
+
+    def record_enqueued(self, records: List[Dict[str, Any]]):
+        """Register accepted commands as queued (never overwrites a finished row)"""
+        now = time.time()
+        rows = [(r["id"], r.get("type"), r.get("command"), r.get("source"), STATUS_QUEUED,
+                 r.get("enqueued_at", now), now + self.ttl) for r in records]
+        try:
+            with self._connection() as conn:
+                conn.executemany(
+                    "INSERT OR IGNORE INTO command_results "
+                    "(id, type, command, source, status, enqueued_at, expires_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    rows)
+        except sqlite3.Error as e:
+            print(f"⚠️ Failed to record queued commands: {str(e)}")
+
+    def record_result(self, record: Dict[str, Any], success: bool, result: str,
+                      latency: Optional[float] = None):
+        """Store the outcome of an executed command"""
+        if not record.get("id"):
+            return
+        now = time.time()
+        row = (record["id"], record.get("type"), record.get("command"), record.get("source"),
+               STATUS_SUCCESS if success else STATUS_FAILED, str(result), record.get("enqueued_at"), now,
+               round(latency * 1000, 3) if latency is not None else None, now + self.ttl)
+        try:
+            with self._connection() as conn:
+                conn.execute(
+                    "INSERT INTO command_results "
+                    "(id, type, command, source, status, result, enqueued_at, finished_at, latency_ms, expires_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?) "
+                    "ON CONFLICT(id) DO UPDATE SET status = excluded.status, result = excluded.result, "
+                    "finished_at = excluded.finished_at, latency_ms = excluded.latency_ms, "
+                    "expires_at = excluded.expires_at",
+                    row)
+        except sqlite3.Error as e:
+            print(f"⚠️ Failed to record command result: {str(e)}")
+        with self._finished:
+            self._finished.notify_all()
+        self.maybe_evict(now)
+
+    def maybe_evict(self, now: Optional[float] = None):
+        now = now or time.time()
+        if now - self._last_evict < self.evict_interval or not self._evict_lock.acquire(blocking=False):
+            return
+        try:
+            self._last_evict = now
+            self.evict(now)
+        finally:
+            self._evict_lock.release()
+
+    def evict(self, now: Optional[float] = None) -> int:
+        """Delete expired rows; returns how many were removed"""
+        try:
+            with self._connection() as conn:
+                return conn.execute("DELETE FROM command_results WHERE expires_at <= ?",
+                                    (now or time.time(),)).rowcount
+        except sqlite3.Error as e:
+            print(f"⚠️ Failed to evict command results: {str(e)}")
+            return 0
+
+    # ------------------------------------------------------------------
+    # Reads
+    # ------------------------------------------------------------------
+
+    def get(self, command_id: str) -> Optional[Dict[str, Any]]:
+        row = self._connection().execute(
+            f"SELECT {', '.join(_COLUMNS)} FROM command_results WHERE id = ? AND expires_at > ?",
+            (command_id, time.time())).fetchone()
+        return dict(zip(_COLUMNS, row)) if row else None
+
+    def wait(self, command_id: str, timeout: float) -> Optional[Dict[str, Any]]:
+        """Return the command once it finished, or its current state after timeout seconds"""
+        deadline = time.monotonic() + max(0.0, timeout)
+        delay = 0.005
+        while True:
+            entry = self.get(command_id)
+            remaining = deadline - time.monotonic()
+            if entry is None or entry["status"] in FINISHED_STATUSES or remaining <= 0:
+                return entry
+            with self._finished:
+                self._finished.wait(min(delay, remaining))
+            delay = min(delay * 2, miora_config.RESULT_POLL_INTERVAL)
+
+    @staticmethod
+    def is_finished(entry: Optional[Dict[str, Any]]) -> bool:
+        return entry is not None and entry["status"] in FINISHED_STATUSES
+
+    def close(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is not None and self._local.pid == os.getpid():
+            conn.close()
+            self._local.conn = None
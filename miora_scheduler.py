@@ -0,0 +1,405 @@
+#!/usr/bin/env python3
+"""
+MIORA Scheduler
+Jalur prioritas antrian dan perintah terjadwal (tertunda / berulang) dengan timer heap
+"""
+
+import heapq
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, List, Any, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows: only in-process locking is available
+    fcntl = None
+
+import miora_config
+from miora_command_queue import MIORACommandQueue
+from miora_commands import CommandValidationError
+from miora_metrics import METRICS
+
+# Highest priority first
+LANES = ("high", "normal", "low")
+DEFAULT_LANE = "normal"
+
+# Record fields that only matter to the scheduler
+SCHEDULE_FIELDS = ("not_before", "every", "due_at", "runs")
+
+
+def lane_path(path: str, lane: str) -> str:
+    """Queue location of a lane: the configured one for normal, a sibling for the others"""
+    if lane == DEFAULT_LANE:
+        return path
+    root, ext = os.path.splitext(path)
+    # command_queue -> command_queue/high, command_queue.db -> command_queue.high.db
+    return f"{root}.{lane}{ext}" if ext else os.path.join(path, lane)
+
+
+def parse_schedule_options(data: Dict[str, Any]) -> Dict[str, Any]:
+    """Validate the priority/not_before/every fields of a request item
+
+    `not_before` is a Unix timestamp or an ISO 8601 time, `every` a repeat
+    interval in seconds. Returns only the fields that were given; raises
+    CommandValidationError for invalid values.
+    """
+    options: Dict[str, Any] = {}
+
+    priority = data.get("priority")
+    if priority not in (None, ""):
+        priority = str(priority).lower()
+        if priority not in LANES:
+            raise CommandValidationError(f"priority must be one of: {', '.join(LANES)}")
+        if priority != DEFAULT_LANE:
+            options["priority"] = priority
+
+    not_before = data.get("not_before")
+    if not_before not in (None, ""):
+        if isinstance(not_before, bool):
+            raise CommandValidationError("not_before must be a Unix timestamp or an ISO 8601 time")
+        if isinstance(not_before, (int, float)):
+            options["not_before"] = float(not_before)
+        else:
+            try:
+                options["not_before"] = datetime.fromisoformat(str(not_before)).timestamp()
+            except ValueError:
+                raise CommandValidationError("not_before must be a Unix timestamp or an ISO 8601 time")
+
+    every = data.get("every")
+    if every not in (None, ""):
+        try:
+            every = float(every)
+        except (TypeError, ValueError):
+            raise CommandValidationError("every must be a number of seconds")
+        if every < miora_config.SCHEDULE_MIN_INTERVAL:
+            raise CommandValidationError(f"every must be at least {miora_config.SCHEDULE_MIN_INTERVAL:g} seconds")
+        options["every"] = every
+
+    return options
+
+
+class MIORALaneQueue:
+    """One command queue per priority lane behind the single-queue interface.
+
+    Records are routed to a lane by their `priority` field. `read_batch`
+    serves lanes in a weighted round robin (MIORA_LANE_WEIGHT_*), so an
+    urgent command waits for at most one batch while low lanes still get a
+    turn every cycle instead of starving behind a busy high lane. A batch
+    holds at most MIORA_LANE_BATCH records, which bounds that wait.
+    Positions are (lane, position in that lane's queue).
+    """
+
+    record_type = staticmethod(MIORACommandQueue.record_type)
+    prepare_record = staticmethod(MIORACommandQueue.prepare_record)
+
+    def __init__(self, lanes: Dict[str, Any], weights: Optional[Dict[str, int]] = None,
+                 lane_batch: Optional[int] = None):
+        self.lanes = lanes
+        self.lane_batch = lane_batch or miora_config.LANE_BATCH
+        self.queue_dir = lanes[DEFAULT_LANE].queue_dir
+        weights = weights or {"high": miora_config.LANE_WEIGHT_HIGH,
+                              "normal": miora_config.LANE_WEIGHT_NORMAL,
+                              "low": miora_config.LANE_WEIGHT_LOW}
+        self._cycle = [lane for lane in lanes for _ in range(max(1, weights.get(lane, 1)))]
+        self._turn = 0
+        self._lock = threading.Lock()
+
+    @property
+    def on_append(self):
+        return self.lanes[DEFAULT_LANE].on_append
+
+    @on_append.setter
+    def on_append(self, callback):
+        for queue in self.lanes.values():
+            queue.on_append = callback
+
+    def lane_of(self, record: Dict[str, Any]) -> str:
+        lane = record.get("priority") or DEFAULT_LANE
+        return lane if lane in self.lanes else DEFAULT_LANE
+
+    # ------------------------------------------------------------------
+    # Producer side
+    # ------------------------------------------------------------------
+
+    def append(self, record: Dict[str, Any]) -> Dict[str, Any]:
+        return self.append_many([record])[0]
+
+    def append_many(self, records: List[Dict[str, Any]], durable: bool = False) -> List[Dict[str, Any]]:
+        """Append records to their lanes (one write per lane)"""
+        prepared = [self.prepare_record(record) for record in records]
+        by_lane: Dict[str, List[Dict[str, Any]]] = {}
+        for record in prepared:
+            by_lane.setdefault(self.lane_of(record), []).append(record)
+        for lane, lane_records in by_lane.items():
+            self.lanes[lane].append_many(lane_records, durable)
+        return prepared
+
+    def import_legacy_file(self, path: Optional[str] = None) -> int:
+        """commands.json entries always go to the normal lane"""
+        return self.lanes[DEFAULT_LANE].import_legacy_file(path)
+
+    # ------------------------------------------------------------------
+    # Consumer side
+    # ------------------------------------------------------------------
+
+    def read_batch(self, max_items: Optional[int] = None) -> List[Tuple[Dict[str, Any], Tuple[str, Any]]]:
+        """Next batch from the lane whose turn it is, skipping empty lanes"""
+        with self._lock:
+            empty = set()
+            for step in range(len(self._cycle)):
+                lane = self._cycle[(self._turn + step) % len(self._cycle)]
+                if lane in empty:
+                    continue
+                batch = self.lanes[lane].read_batch(min(max_items or self.lane_batch, self.lane_batch))
+                if batch:
+                    self._turn = (self._turn + step + 1) % len(self._cycle)
+                    return [(record, (lane, position)) for record, position in batch]
+                empty.add(lane)
+                if len(empty) == len(self.lanes):
+                    break
+            return []
+
+    def commit(self, position: Tuple[str, Any], records: Optional[List[Dict[str, Any]]] = None):
+        lane, lane_position = position
+        self.lanes[lane].commit(lane_position, records)
+
+    def clear(self):
+        for queue in self.lanes.values():
+            queue.clear()
+
+    # ------------------------------------------------------------------
+    # Statistics and listing
+    # ------------------------------------------------------------------
+
+    def stats(self) -> Dict[str, Any]:
+        """Combined queue statistics plus the depth of every lane"""
+        combined: Dict[str, Any] = {"depth": 0, "enqueued_total": 0, "consumed_total": 0,
+                                    "by_type": {}, "lanes": {}}
+        oldest_at = None
+        for lane, queue in self.lanes.items():
+            stats = queue.stats()
+            combined["lanes"][lane] = stats["depth"]
+            for key, value in stats.items():
+                if key == "by_type":
+                    for record_type, count in value.items():
+                        combined["by_type"][record_type] = combined["by_type"].get(record_type, 0) + count
+                elif key in ("depth", "enqueued_total", "consumed_total", "leased", "dead"):
+                    combined[key] = combined.get(key, 0) + value
+            if stats["oldest_enqueued_at"] and (oldest_at is None or stats["oldest_enqueued_at"] < oldest_at):
+                oldest_at = stats["oldest_enqueued_at"]
+        combined["oldest_enqueued_at"] = oldest_at
+        combined["oldest_age_seconds"] = round(time.time() - oldest_at, 3) if oldest_at else 0.0
+        return combined
+
+    def list_pending(self, cursor: Optional[str] = None, limit: int = 100) -> tuple[List[Dict[str, Any]], Optional[str]]:
+        """Pending records lane by lane (high first); cursors are "<lane>:<lane cursor>" """
+        names = list(self.lanes)
+        start, lane_cursor = names[0], None
+        if cursor:
+            start, _, lane_cursor = cursor.partition(":")
+            if start not in self.lanes:
+                raise ValueError(f"Unknown lane in cursor: {start}")
+        commands: List[Dict[str, Any]] = []
+        for index in range(names.index(start), len(names)):
+            lane = names[index]
+            page, next_cursor = self.lanes[lane].list_pending(lane_cursor or None, limit - len(commands))
+            commands.extend(page)
+            if next_cursor:
+                return commands, f"{lane}:{next_cursor}"
+            if len(commands) >= limit:
+                return commands, (f"{names[index + 1]}:" if index + 1 < len(names) else None)
+            lane_cursor = None
+        return commands, None
+
+    def pending(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        records: List[Dict[str, Any]] = []
+        for queue in self.lanes.values():
+            records.extend(queue.pending(limit - len(records) if limit else None))
+            if limit and len(records) >= limit:
+                break
+        return records
+
+    def register_metrics(self, registry=None):
+        """Expose the combined queue gauges plus the depth of every lane"""
+        registry = registry or METRICS
+        MIORACommandQueue.register_metrics(self, registry)
+        registry.gauge("miora_queue_lane_depth", "Commands waiting per priority lane", ("lane",),
+                       callback=lambda: {(lane,): depth for lane, depth in self.stats()["lanes"].items()})
+
+    def release(self):
+        """Give commands read but not committed back to the queue (leased lanes only)"""
+        for queue in self.lanes.values():
+            if hasattr(queue, "release"):
+                queue.release()
+
+    def close(self):
+        for queue in self.lanes.values():
+            queue.close()
+
+
+class MIORAScheduler:
+    """Delayed and recurring commands held by the handler until they are due.
+
+    Entries live in a heap keyed by due time, so the handler can sleep
+    exactly until the next one instead of scanning. The full set is small
+    and rewritten atomically to the schedule file on every change, which
+    lets schedules survive restarts. The file is the shared store: every
+    operation holds a lock file and reloads the file if another handler
+    rewrote it, so all handlers see (and can cancel) every schedule and a
+    due entry is released by exactly one of them.
+    """
+
+    def __init__(self, schedule_file: Optional[str] = None):
+        self.schedule_file = schedule_file or miora_config.SCHEDULE_FILE
+        self.lock_file = self.schedule_file + ".lock"
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        self._heap: List[Tuple[float, str]] = []
+        self._lock = threading.Lock()
+        self._pid = None
+        self._lock_fd = None
+        # Identity of the schedule file as last read or written by this process
+        self._version = None
+
+        with self._locked():
+            pass
+
+    def _file_version(self) -> Optional[Tuple[int, int, int]]:
+        try:
+            st = os.stat(self.schedule_file)
+        except OSError:
+            return None
+        return st.st_ino, st.st_mtime_ns, st.st_size
+
+    @contextmanager
+    def _locked(self):
+        """Hold the in-process and cross-process locks with the entries up to date"""
+        with self._lock:
+            if self._pid != os.getpid():
+                # Descriptors inherited over fork must not share the lock
+                self._lock_fd = os.open(self.lock_file, os.O_RDWR | os.O_CREAT, 0o644)
+                self._pid = os.getpid()
+            if fcntl:
+                fcntl.flock(self._lock_fd, fcntl.LOCK_EX)
+            try:
+                version = self._file_version()
+                if version != self._version:
+                    self._entries = {entry["id"]: entry for entry in self.read_entries(self.schedule_file)}
+                    self._heap = [(entry["due_at"], schedule_id) for schedule_id, entry in self._entries.items()]
+                    heapq.heapify(self._heap)
+                    self._version = version
+                yield
+            finally:
+                if fcntl:
+                    fcntl.flock(self._lock_fd, fcntl.LOCK_UN)
+
+    @staticmethod
+    def read_entries(path: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Scheduled entries stored in a schedule file, soonest first"""
+        try:
+            with open(path or miora_config.SCHEDULE_FILE, 'r', encoding='utf-8') as f:
+                entries = json.load(f)
+        except (OSError, ValueError):
+            return []
+        entries = [e for e in entries if isinstance(e, dict) and e.get("id") and "due_at" in e]
+        return sorted(entries, key=lambda e: e["due_at"])
+
+    @staticmethod
+    def wants(record: Dict[str, Any], now: Optional[float] = None) -> bool:
+        """True for recurring commands and commands not due yet"""
+        return bool(record.get("every")) or (record.get("not_before") or 0) > (now or time.time())
+
+    def _save_locked(self):
+        tmp_file = self.schedule_file + ".tmp"
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump(list(self._entries.values()), f, ensure_ascii=False)
+        os.replace(tmp_file, self.schedule_file)
+        self._version = self._file_version()
+
+    def add_many(self, records: List[Dict[str, Any]]):
+        """Hold records until their not_before time (recurring ones start at once without it)"""
+        if not records:
+            return
+        now = time.time()
+        with self._locked():
+            for record in records:
+                entry = dict(record)
+                entry["due_at"] = record.get("not_before") or now
+                entry.setdefault("runs", 0)
+                self._entries[entry["id"]] = entry
+                heapq.heappush(self._heap, (entry["due_at"], entry["id"]))
+            self._save_locked()
+
+    @contextmanager
+    def release_due(self, now: Optional[float] = None):
+        """Yield the records to enqueue now; the schedule only changes if the block succeeds
+
+        One-shot entries are removed and recurring entries rescheduled when
+        the block (which enqueues the records) returns. If it raises, or the
+        process dies inside it, the entries stay due and are released again.
+        The schedule lock is held throughout, so another handler cannot
+        release the same entries meanwhile.
+
+        A one-shot command keeps its id. Each run of a recurring command is
+        a new record with id "<schedule id>-<run>" that carries the schedule
+        id, so its outcome can also be stored under the id returned when the
+        command was accepted; runs missed while the handler was down are
+        skipped rather than replayed.
+        """
+        now = now or time.time()
+        due = []
+        with self._locked():
+            while self._heap and self._heap[0][0] <= now:
+                due_at, schedule_id = heapq.heappop(self._heap)
+                entry = self._entries.get(schedule_id)
+                if entry is None or entry["due_at"] != due_at:
+                    # Cancelled, or superseded by a newer heap item
+                    continue
+                record = {k: v for k, v in entry.items() if k not in SCHEDULE_FIELDS}
+                record["enqueued_at"] = now
+                every = entry.get("every")
+                if every:
+                    entry["runs"] += 1
+                    record["id"] = f"{schedule_id}-{entry['runs']}"
+                    record["schedule_id"] = schedule_id
+                    next_due = due_at + every
+                    if next_due <= now:
+                        next_due = now + every - (now - due_at) % every
+                    entry["due_at"] = next_due
+                    heapq.heappush(self._heap, (next_due, schedule_id))
+                else:
+                    del self._entries[schedule_id]
+                due.append(record)
+            try:
+                yield due
+            except BaseException:
+                # Drop the changes made above; the schedule file still has the entries
+                self._version = None
+                raise
+            if due:
+                self._save_locked()
+
+    def cancel(self, schedule_id: str) -> bool:
+        with self._locked():
+            if self._entries.pop(schedule_id, None) is None:
+                return False
+            self._save_locked()
+            return True
+
+    def seconds_until_next(self, now: Optional[float] = None) -> Optional[float]:
+        """Time until the next entry is due, or None without entries"""
+        with self._locked():
+            while self._heap:
+                due_at, schedule_id = self._heap[0]
+                entry = self._entries.get(schedule_id)
+                if entry is not None and entry["due_at"] == due_at:
+                    return max(0.0, due_at - (now or time.time()))
+                heapq.heappop(self._heap)
+            return None
+
+    def __len__(self) -> int:
+        with self._locked():
+            return len(self._entries)
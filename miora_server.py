@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+MIORA API Server
+Menjalankan aplikasi Flask dengan gunicorn (pre-fork, keep-alive) atau server thread
+"""
+
+import threading
+from typing import Callable, Optional
+
+from werkzeug.serving import WSGIRequestHandler, make_server
+
+import miora_config
+
+try:
+    from gunicorn.app.base import BaseApplication
+except ImportError:  # optional dependency, not available on Windows
+    BaseApplication = None
+
+
+class MIORAStreamSlots:
+    """Limits the requests of a worker that hold a thread for long (SSE, long-polls)
+
+    gunicorn's gthread workers have a fixed number of threads. Without a
+    limit, enough open streams would leave none for /api/command.
+    """
+
+    def __init__(self, limit: Optional[int] = None):
+        self.limit = limit if limit is not None else miora_config.API_MAX_STREAMS
+        self._slots = threading.BoundedSemaphore(self.limit) if self.limit > 0 else None
+
+    def acquire(self) -> bool:
+        """Take a slot; False when every slot is in use"""
+        return self._slots is None or self._slots.acquire(blocking=False)
+
+    def release(self):
+        if self._slots is not None:
+            self._slots.release()
+
+
+class _QuietRequestHandler(WSGIRequestHandler):
+    """Request handler without the per-request access log line"""
+
+    def log_request(self, *args, **kwargs):
+        # Per-request console lines cost more than the request itself
+        pass
+
+
+def make_threaded_server(app, host: Optional[str] = None, port: Optional[int] = None):
+    """Threaded werkzeug server
+
+    werkzeug closes the connection after every response, so persistent
+    connections are only available under gunicorn.
+    """
+    # Clients that stall mid-request release their thread after this many seconds
+    _QuietRequestHandler.timeout = miora_config.API_KEEPALIVE
+    return make_server(host or miora_config.API_HOST, port or miora_config.API_PORT, app,
+                       threaded=True, request_handler=_QuietRequestHandler)
+
+
+if BaseApplication is not None:
+    class MIORAGunicornApplication(BaseApplication):
+        """Embedded gunicorn master using the already imported Flask app"""
+
+        def __init__(self, app, options, on_worker_start: Optional[Callable[[], None]] = None):
+            self.application = app
+            self.options = options
+            self.on_worker_start = on_worker_start
+            super().__init__()
+
+        def load_config(self):
+            for key, value in self.options.items():
+                self.cfg.set(key, value)
+            if self.on_worker_start is not None:
+                self.cfg.set("post_fork", lambda server, worker: self.on_worker_start())
+
+        def load(self):
+            return self.application
+
+
+def gunicorn_available() -> bool:
+    return BaseApplication is not None
+
+
+def serve(app, host: Optional[str] = None, port: Optional[int] = None,
+          on_worker_start: Optional[Callable[[], None]] = None):
+    """Serve the API according to MIORA_API_SERVER
+
+    `on_worker_start` runs in every serving process (each gunicorn worker
+    after the fork, or once before the threaded server starts).
+    """
+    host = host or miora_config.API_HOST
+    port = port or miora_config.API_PORT
+    mode = miora_config.API_SERVER
+
+    if mode == "development":
+        if on_worker_start is not None:
+            on_worker_start()
+        app.run(host=host, port=port, debug=False, threaded=True)
+        return
+
+    if gunicorn_available():
+        print(f"🏭 gunicorn: {miora_config.API_WORKERS} workers x {miora_config.API_THREADS} threads, "
+              f"keep-alive {miora_config.API_KEEPALIVE}s")
+        MIORAGunicornApplication(app, {
+            "bind": f"{host}:{port}",
+            "workers": miora_config.API_WORKERS,
+            "worker_class": "gthread",
+            "threads": miora_config.API_THREADS,
+            "keepalive": miora_config.API_KEEPALIVE,
+            "backlog": 2048,
+            # Long-polls and SSE streams hold a thread, not the worker heartbeat
+            "timeout": 60,
+            "graceful_timeout": 30,
+            "accesslog": None,
+        }, on_worker_start).run()
+        return
+
+    print("⚠️ gunicorn is not installed: serving with the threaded server (pip install gunicorn)")
+    if on_worker_start is not None:
+        on_worker_start()
+    server = make_threaded_server(app, host, port)
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
@@ -0,0 +1,335 @@
+#!/usr/bin/env python3
+"""
+MIORA TTS Engine
+Text-to-speech asinkron dengan synthesizer persisten dan cache audio LRU
+"""
+
+import io
+import json
+import os
+import queue
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import wave
+from collections import OrderedDict
+from typing import Dict, List, Any, Optional, Tuple
+
+import miora_config
+
+
+class TTSBackend:
+    """Renders text to audio bytes and plays them back"""
+
+    name = "base"
+    # False when play() synthesizes the text itself, so there is no audio to render or cache
+    renders_audio = True
+
+    def render(self, text: str, voice: str) -> bytes:
+        raise NotImplementedError
+
+    def play(self, audio: bytes, text: str, voice: str):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class NullTTSBackend(TTSBackend):
+    """Discards every utterance"""
+
+    name = "null"
+
+    def render(self, text: str, voice: str) -> bytes:
+        return text.encode("utf-8")
+
+    def play(self, audio: bytes, text: str, voice: str):
+        pass
+
+
+class FileTTSBackend(TTSBackend):
+    """Headless stand-in that records utterances as JSON lines instead of playing them"""
+
+    name = "file"
+
+    def __init__(self, output_file: Optional[str] = None):
+        self.output_file = output_file or miora_config.TTS_OUTPUT_FILE
+        self.render_count = 0
+
+    def render(self, text: str, voice: str) -> bytes:
+        self.render_count += 1
+        return text.encode("utf-8")
+
+    def play(self, audio: bytes, text: str, voice: str):
+        entry = {"timestamp": time.time(), "voice": voice, "text": text, "bytes": len(audio)}
+        with open(self.output_file, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+
+
+# Raw PCM sample formats for a persistent player: sample width -> (paplay, aplay)
+_RAW_FORMATS = {1: ("u8", "U8"), 2: ("s16le", "S16_LE"), 4: ("s32le", "S32_LE")}
+
+
+# PowerShell host that keeps one SpeechSynthesizer alive and serves JSON requests on stdin
+_WINDOWS_TTS_HOST = r"""
+Add-Type -AssemblyName System.Speech
+$synth = New-Object System.Speech.Synthesis.SpeechSynthesizer
+while (($line = [Console]::In.ReadLine()) -ne $null) {
+    try {
+        $req = $line | ConvertFrom-Json
+        if ($req.play) {
+            (New-Object System.Media.SoundPlayer $req.play).PlaySync()
+        } else {
+            if ($req.voice) { $synth.SelectVoice($req.voice) }
+            $synth.SetOutputToWaveFile($req.out)
+            $synth.Speak($req.text)
+            $synth.SetOutputToNull()
+        }
+        [Console]::Out.WriteLine("OK")
+    } catch {
+        [Console]::Out.WriteLine("ERR " + $_.Exception.Message)
+    }
+    [Console]::Out.Flush()
+}
+"""
+
+
+class SystemTTSBackend(TTSBackend):
+    """Uses the platform speech tools (SAPI, say, espeak/festival)
+
+    Windows keeps one PowerShell synthesizer alive. On Linux a single
+    paplay/aplay process is kept open in raw PCM mode and fed the samples
+    of every utterance, so only uncached text starts a synthesizer; without
+    a player espeak speaks directly and nothing is rendered or cached. On
+    macOS `say` and `afplay` still run once per utterance.
+    """
+
+    name = "system"
+
+    def __init__(self):
+        self._host = None
+        self._player = None
+        self._player_format = None
+        self._tmp_dir = tempfile.mkdtemp(prefix="miora_tts_")
+        self._counter = 0
+        self.renders_audio = sys.platform in ("win32", "darwin") or self._linux_player() is not None
+
+    @staticmethod
+    def available() -> bool:
+        if sys.platform == "win32":
+            return shutil.which("powershell") is not None
+        if sys.platform == "darwin":
+            return shutil.which("say") is not None
+        # espeak can speak on its own; text2wave output needs a player
+        return shutil.which("espeak") is not None or (
+            shutil.which("text2wave") is not None and SystemTTSBackend._linux_player() is not None)
+
+    @staticmethod
+    def _linux_player() -> Optional[List[str]]:
+        """One-shot player command for a complete audio file on stdin"""
+        if shutil.which("paplay"):
+            return ['paplay']
+        if shutil.which("aplay"):
+            return ['aplay', '-q', '-']
+        return None
+
+    def _tmp_path(self, suffix: str) -> str:
+        self._counter += 1
+        return os.path.join(self._tmp_dir, f"utterance_{self._counter}{suffix}")
+
+    def _windows_request(self, request: Dict[str, Any]):
+        if self._host is None or self._host.poll() is not None:
+            self._host = subprocess.Popen(
+                ['powershell', '-NoProfile', '-NonInteractive', '-Command', _WINDOWS_TTS_HOST],
+                stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True, encoding='utf-8')
+        self._host.stdin.write(json.dumps(request) + "\n")
+        self._host.stdin.flush()
+        reply = self._host.stdout.readline().strip()
+        if reply != "OK":
+            raise RuntimeError(reply or "TTS host exited")
+
+    def render(self, text: str, voice: str) -> bytes:
+        if sys.platform == "win32":
+            path = self._tmp_path(".wav")
+            self._windows_request({"text": text, "voice": voice, "out": path})
+        elif sys.platform == "darwin":
+            path = self._tmp_path(".aiff")
+            command = ['say', '-o', path, '-f', '-'] + (['-v', voice] if voice else [])
+            subprocess.run(command, input=text, text=True, capture_output=True, check=True)
+        elif shutil.which("espeak"):
+            command = ['espeak', '--stdout', '--stdin'] + (['-v', voice] if voice else [])
+            return subprocess.run(command, input=text.encode("utf-8"),
+                                  capture_output=True, check=True).stdout
+        else:
+            command = ['text2wave', '-o', '-']
+            return subprocess.run(command, input=text.encode("utf-8"),
+                                  capture_output=True, check=True).stdout
+
+        try:
+            with open(path, 'rb') as f:
+                return f.read()
+        finally:
+            os.remove(path)
+
+    def play(self, audio: bytes, text: str, voice: str):
+        if sys.platform in ("win32", "darwin"):
+            path = self._tmp_path(".wav" if sys.platform == "win32" else ".aiff")
+            with open(path, 'wb') as f:
+                f.write(audio)
+            try:
+                if sys.platform == "win32":
+                    self._windows_request({"play": path})
+                else:
+                    subprocess.run(['afplay', path], capture_output=True, check=True)
+            finally:
+                os.remove(path)
+        elif self.renders_audio:
+            self._play_pcm(audio)
+        elif shutil.which("espeak"):
+            # No player to pipe audio into: espeak speaks the text itself
+            command = ['espeak', '--stdin'] + (['-v', voice] if voice else [])
+            subprocess.run(command, input=text.encode("utf-8"), capture_output=True, check=True)
+        else:
+            raise RuntimeError("No audio player found (install paplay or aplay)")
+
+    def _play_pcm(self, audio: bytes):
+        """Feed the samples of a WAV file to the persistent raw player"""
+        try:
+            with wave.open(io.BytesIO(audio)) as f:
+                audio_format = (f.getframerate(), f.getnchannels(), f.getsampwidth())
+                # Streamed WAVs (espeak --stdout) carry a bogus length, so read to the end
+                frames = f.readframes(f.getnframes())
+        except (wave.Error, EOFError):
+            audio_format = None
+        if audio_format is None or audio_format[2] not in _RAW_FORMATS:
+            subprocess.run(self._linux_player(), input=audio, capture_output=True, check=True)
+            return
+
+        if self._player is None or self._player.poll() is not None or self._player_format != audio_format:
+            self._stop_player()
+            rate, channels, width = audio_format
+            pulse_format, alsa_format = _RAW_FORMATS[width]
+            if shutil.which("paplay"):
+                command = ['paplay', '--raw', f'--format={pulse_format}', f'--rate={rate}',
+                           f'--channels={channels}']
+            else:
+                command = ['aplay', '-q', '-t', 'raw', '-f', alsa_format, '-r', str(rate), '-c', str(channels)]
+            self._player = subprocess.Popen(command, stdin=subprocess.PIPE,
+                                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            self._player_format = audio_format
+        try:
+            self._player.stdin.write(frames)
+            self._player.stdin.flush()
+        except OSError:
+            self._stop_player()
+            raise RuntimeError("Audio player exited")
+
+    def _stop_player(self):
+        if self._player is None:
+            return
+        try:
+            self._player.stdin.close()
+        except OSError:
+            pass
+        try:
+            # Lets the player finish the audio it has buffered
+            self._player.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            self._player.kill()
+        self._player = None
+
+    def close(self):
+        self._stop_player()
+        if self._host is not None:
+            self._host.stdin.close()
+            self._host.wait(timeout=5)
+            self._host = None
+        shutil.rmtree(self._tmp_dir, ignore_errors=True)
+
+
+def create_backend(name: Optional[str] = None) -> TTSBackend:
+    """Create a backend by name: auto, system, file or null"""
+    name = (name or miora_config.TTS_BACKEND).lower()
+    if name == "system" or (name == "auto" and SystemTTSBackend.available()):
+        return SystemTTSBackend()
+    if name == "file":
+        return FileTTSBackend()
+    return NullTTSBackend()
+
+
+class MIORATTSEngine:
+    """Queues utterances for a dedicated speech thread with an LRU audio cache"""
+
+    def __init__(self, backend: Optional[TTSBackend] = None,
+                 voice: Optional[str] = None,
+                 cache_entries: Optional[int] = None,
+                 cache_bytes: Optional[int] = None,
+                 queue_size: Optional[int] = None):
+        self.backend = backend or create_backend()
+        self.voice = voice if voice is not None else miora_config.TTS_VOICE
+        self.cache_entries = cache_entries or miora_config.TTS_CACHE_ENTRIES
+        self.cache_bytes = cache_bytes or miora_config.TTS_CACHE_BYTES
+
+        self._cache: "OrderedDict[Tuple[str, str], bytes]" = OrderedDict()
+        self._cached_bytes = 0
+        self._queue = queue.Queue(maxsize=queue_size or miora_config.TTS_QUEUE_SIZE)
+        self.stats = {"spoken": 0, "cache_hits": 0, "cache_misses": 0, "errors": 0}
+
+        self._thread = threading.Thread(target=self._worker, name="miora-tts", daemon=True)
+        self._thread.start()
+
+    def speak(self, text: str, voice: Optional[str] = None, block: bool = True) -> bool:
+        """Queue text for speech; returns False if the queue is full and block is False"""
+        try:
+            self._queue.put((text, voice or self.voice), block=block)
+            return True
+        except queue.Full:
+            return False
+
+    def _audio_for(self, text: str, voice: str) -> bytes:
+        key = (text, voice)
+        audio = self._cache.get(key)
+        if audio is not None:
+            self._cache.move_to_end(key)
+            self.stats["cache_hits"] += 1
+            return audio
+
+        self.stats["cache_misses"] += 1
+        audio = self.backend.render(text, voice)
+        if len(audio) <= self.cache_bytes:
+            self._cache[key] = audio
+            self._cached_bytes += len(audio)
+            while len(self._cache) > self.cache_entries or self._cached_bytes > self.cache_bytes:
+                _, evicted = self._cache.popitem(last=False)
+                self._cached_bytes -= len(evicted)
+        return audio
+
+    def _worker(self):
+        while True:
+            item = self._queue.get()
+            try:
+                if item is None:
+                    return
+                text, voice = item
+                audio = self._audio_for(text, voice) if self.backend.renders_audio else b""
+                self.backend.play(audio, text, voice)
+                self.stats["spoken"] += 1
+            except Exception as e:
+                self.stats["errors"] += 1
+                print(f"⚠️ TTS failed: {str(e)}")
+            finally:
+                self._queue.task_done()
+
+    def wait_idle(self):
+        """Block until every queued utterance has been spoken"""
+        self._queue.join()
+
+    def close(self, drain: bool = True):
+        if drain:
+            self.wait_idle()
+        self._queue.put(None)
+        self._thread.join(timeout=5)
+        self.backend.close()
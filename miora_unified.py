@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+MIORA Unified Gateway
+API dan eksekutor perintah dalam satu proses asyncio dengan antrian in-memory
+"""
+
+import asyncio
+import signal
+import threading
+from typing import Optional
+
+import miora_config
+import interface_endpoint
+from external_instruction_handler import MIORAExternalCommandHandler
+from miora_command_queue import MIORACommandQueue
+from miora_events import MIORALocalEventPublisher
+from miora_memory_queue import MIORAMemoryQueue
+from miora_scheduler import LANES, MIORALaneQueue, lane_path
+from miora_server import make_threaded_server
+
+
+class MIORAUnifiedGateway:
+    """Hosts the HTTP API and the command handler in one process.
+
+    Requests enqueue into a shared MIORAMemoryQueue and wake the asyncio
+    consumer directly, so a command never touches the disk on its way to
+    the executor unless journaling is enabled. SIGINT/SIGTERM stop the
+    HTTP server first, then drain the commands already accepted.
+    """
+
+    def __init__(self, host: Optional[str] = None, port: Optional[int] = None,
+                 journal: Optional[bool] = None):
+        self.host = host or miora_config.API_HOST
+        self.port = port or miora_config.API_PORT
+        self.journal = miora_config.UNIFIED_JOURNAL if journal is None else journal
+
+        self.queue = MIORALaneQueue({
+            lane: MIORAMemoryQueue(MIORACommandQueue(lane_path(miora_config.QUEUE_DIR, lane)) if self.journal else None)
+            for lane in LANES})
+        self.api = interface_endpoint.MIORAAPIInterface(queue=self.queue, receive_events=False)
+        # The Flask routes use the module-level interface
+        interface_endpoint.set_api_interface(self.api)
+        self.handler = MIORAExternalCommandHandler(queue=self.queue,
+                                                   events=MIORALocalEventPublisher(self.api.events))
+        self.api.memory = self.handler.memory
+        self.handler.queue_durable = self.journal
+        self._stopping: Optional[asyncio.Event] = None
+
+    def stop(self):
+        """Request a graceful shutdown (call from the event loop thread)"""
+        if self._stopping is not None:
+            self._stopping.set()
+
+    async def _wait(self, wake: asyncio.Event, timeout: float):
+        waiters = [asyncio.ensure_future(wake.wait()), asyncio.ensure_future(self._stopping.wait())]
+        try:
+            await asyncio.wait(waiters, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            for waiter in waiters:
+                waiter.cancel()
+
+    async def serve(self):
+        loop = asyncio.get_running_loop()
+        self._stopping = asyncio.Event()
+        wake = asyncio.Event()
+        self.queue.on_append = lambda: loop.call_soon_threadsafe(wake.set)
+
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(sig, self.stop)
+            except (NotImplementedError, RuntimeError):
+                # Windows: Ctrl+C arrives as KeyboardInterrupt instead
+                pass
+
+        server = make_threaded_server(interface_endpoint.app, self.host, self.port)
+        threading.Thread(target=server.serve_forever, name="miora-http", daemon=True).start()
+        self.api.start_events()
+        self.queue.register_metrics()
+
+        print("🌐 MIORA Unified Gateway Started (API + handler in one process)")
+        print(f"📱 Web Interface: http://localhost:{self.port}")
+        print(f"💾 Queue: in-memory{' + journal in ' + self.queue.queue_dir if self.journal else ''}")
+        print("Press Ctrl+C to stop\n")
+
+        try:
+            while not self._stopping.is_set():
+                wake.clear()
+                if await asyncio.to_thread(self.handler.process_commands):
+                    continue
+                # Idle until a request arrives or a scheduled command is due;
+                # the timeout still picks up commands.json
+                await self._wait(wake, self.handler.idle_timeout())
+        finally:
+            print("\n🛑 Stopping: no longer accepting requests")
+            await asyncio.to_thread(server.shutdown)
+            await self._drain()
+            self.close()
+
+    async def _drain(self):
+        """Execute the commands that were accepted before shutdown"""
+        if self.journal:
+            depth = self.queue.stats()["depth"]
+            if depth:
+                print(f"💾 {depth} pending commands stay in the journal for the next start")
+            return
+
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + miora_config.SHUTDOWN_DRAIN_TIMEOUT
+        while loop.time() < deadline:
+            if not await asyncio.to_thread(self.handler.process_commands):
+                break
+        depth = self.queue.stats()["depth"]
+        if depth:
+            print(f"⚠️ Drain timeout: {depth} queued commands were not executed")
+            self.handler.log_execution("SHUTDOWN", f"{depth} queued commands dropped at shutdown", False)
+
+    def close(self):
+        self.handler.close()
+        self.api.logger.close()
+        self.api.results.close()
+        self.queue.close()
+
+
+def main():
+    gateway = MIORAUnifiedGateway()
+    try:
+        asyncio.run(gateway.serve())
+    except KeyboardInterrupt:
+        pass
+    print("🛑 MIORA Unified Gateway Stopped")
+
+
+if __name__ == "__main__":
+    main()
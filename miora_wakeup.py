@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+MIORA Wakeup Signal
+Sinyal UDP lokal untuk membangunkan handler saat ada perintah baru
+"""
+
+import select
+import socket
+import time
+from typing import Optional
+
+import miora_config
+
+_sender = None
+
+
+def notify_wakeup(host: Optional[str] = None, port: Optional[int] = None):
+    """Tell a waiting command handler that new work has arrived (best effort)"""
+    global _sender
+    if not miora_config.WAKEUP_ENABLED:
+        return
+    try:
+        if _sender is None:
+            _sender = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            _sender.setblocking(False)
+        _sender.sendto(b"1", (host or miora_config.WAKEUP_HOST, port or miora_config.WAKEUP_PORT))
+    except OSError:
+        # Nobody listening or buffer full: the handler falls back to polling
+        pass
+
+
+class MIORAWakeupListener:
+    """Blocks the handler until a wakeup datagram arrives or the poll interval passes"""
+
+    def __init__(self, host: Optional[str] = None, port: Optional[int] = None):
+        self.host = host or miora_config.WAKEUP_HOST
+        self.port = port or miora_config.WAKEUP_PORT
+        self.sock = None
+
+        if not miora_config.WAKEUP_ENABLED:
+            return
+        try:
+            self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            self.sock.bind((self.host, self.port))
+            self.sock.setblocking(False)
+        except OSError as e:
+            print(f"⚠️ Wakeup socket unavailable ({e}), using polling only")
+            self.sock = None
+
+    @property
+    def event_driven(self) -> bool:
+        return self.sock is not None
+
+    def wait(self, timeout: float) -> bool:
+        """Wait for a wakeup signal; returns True if one was received"""
+        if self.sock is None:
+            time.sleep(timeout)
+            return False
+
+        readable, _, _ = select.select([self.sock], [], [], timeout)
+        if not readable:
+            return False
+
+        # Coalesce every signal that piled up into one wakeup
+        while True:
+            try:
+                self.sock.recv(64)
+            except (BlockingIOError, InterruptedError):
+                break
+            except OSError:
+                break
+        return True
+
+    def close(self):
+        if self.sock is not None:
+            self.sock.close()
+            self.sock = None
@@ -22,6 +22,11 @@ def run_api_interface():
     print("🌐 Starting MIORA API Interface...")
     subprocess.run([sys.executable, "interface_endpoint.py"])
 
+def run_unified_gateway():
+    """Run the API and the command handler in one process"""
+    print("⚡ Starting MIORA Unified Gateway...")
+    subprocess.run([sys.executable, "miora_unified.py"])
+
 def create_sample_commands():
     """Create sample commands file for testing"""
     sample_commands = [
@@ -62,9 +67,10 @@ def main():
     print("2. API Interface only (web interface + API)")
     print("3. Both (recommended)")
     print("4. Create sample commands and exit")
+    print("5. Unified single-process mode (API + handler, in-memory queue)")
     print()
     
-    choice = input("Enter your choice (1-4): ").strip()
+    choice = input("Enter your choice (1-5): ").strip()
     
     if choice == "1":
         print("\n🚀 Starting Command Handler only...")
@@ -94,6 +100,12 @@ def main():
         print("\n✅ Sample commands created!")
         print("Now you can run the command handler to process them.")
     
+    elif choice == "5":
+        print("\n🚀 Starting Unified Gateway...")
+        print("Note: API Interface will run on http://localhost:5000")
+        print()
+        run_unified_gateway()
+    
     else:
         print("❌ Invalid choice. Please run again.")
 
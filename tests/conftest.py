@@ -0,0 +1,47 @@
+"""
+Konfigurasi pytest: lingkungan MIORA yang terisolasi per tes
+"""
+
+import os
+import sys
+
+# miora_config reads the environment once at import time
+os.environ.update({
+    "MIORA_METRICS_ENABLED": "false",
+    "MIORA_LOG_ECHO": "false",
+    "MIORA_TTS_BACKEND": "null",
+    "MIORA_EVENTS_ENABLED": "false",
+    "MIORA_WAKEUP_ENABLED": "false",
+    "MIORA_MODULE_MODE": "inline",
+})
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def workdir(tmp_path, monkeypatch):
+    """Run every test in its own directory, where all default MIORA files are created"""
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+class FakeClock:
+    """Stands in for the time module where a test needs to move time forward"""
+
+    def __init__(self, now: float = 1_000_000.0):
+        self.now = now
+
+    def time(self) -> float:
+        return self.now
+
+    def monotonic(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float):
+        self.now += seconds
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
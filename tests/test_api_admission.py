@@ -0,0 +1,118 @@
+"""
+Tes urutan dedup dan rate limit saat API menerima perintah
+"""
+
+import pytest
+
+from interface_endpoint import MIORAAPIInterface
+from miora_commands import CommandValidationError
+from miora_memory_queue import MIORAMemoryQueue
+from miora_ratelimit import MIORARateLimiter, Throttled
+from miora_scheduler import LANES, MIORALaneQueue
+
+
+@pytest.fixture
+def api():
+    api = MIORAAPIInterface(queue=MIORALaneQueue({lane: MIORAMemoryQueue() for lane in LANES}),
+                            receive_events=False)
+    api.writer = None
+    yield api
+    api.logger.close()
+    api.results.close()
+    api.dedup.close()
+
+
+def limit(api, rate: float, overrides=None):
+    api.limiter = MIORARateLimiter(api.queue, rate=rate, burst=rate,
+                                   overrides=overrides or {}, high_watermark=0)
+
+
+def queued(api):
+    return [record["command"] for record in api.queue.pending()]
+
+
+def test_idempotent_retry_is_answered_while_over_the_limit(api):
+    limit(api, 1)
+    first = api.add_command("PRINT: pay", "shop", {"idempotency_key": "order-1"})
+    retry = api.add_command("PRINT: pay", "shop", {"idempotency_key": "order-1"})
+    assert retry["duplicate"] is True
+    assert retry["id"] == first["id"]
+
+    with pytest.raises(Throttled):
+        api.add_command("PRINT: other", "shop")
+    assert queued(api) == ["PRINT: pay"]
+
+
+def test_throttled_command_does_not_keep_its_idempotency_key(api):
+    limit(api, 1)
+    api.add_command("PRINT: first", "shop")
+    with pytest.raises(Throttled):
+        api.add_command("PRINT: second", "shop", {"idempotency_key": "order-2"})
+
+    limit(api, 0)
+    retry = api.add_command("PRINT: second", "shop", {"idempotency_key": "order-2"})
+    assert "duplicate" not in retry
+    assert queued(api) == ["PRINT: first", "PRINT: second"]
+
+
+def test_invalid_commands_are_not_charged(api):
+    limit(api, 1)
+    with pytest.raises(CommandValidationError):
+        api.add_command("NOT_A_COMMAND: x", "shop")
+    assert api.add_command("PRINT: valid", "shop")["command"] == "PRINT: valid"
+
+
+def test_bulk_dedups_before_charging(api):
+    limit(api, 2)
+    first = api.add_command("PRINT: a", "shop", {"idempotency_key": "a"})
+
+    results = api.add_commands([
+        {"command": "PRINT: a", "idempotency_key": "a"},
+        {"command": "PRINT: b", "idempotency_key": "b"},
+        {"command": "PRINT: b again", "idempotency_key": "b"},
+    ], "shop")
+    assert results[0]["duplicate"] is True and results[0]["id"] == first["id"]
+    assert results[1]["success"] is True and "duplicate" not in results[1]
+    assert results[2]["duplicate"] is True and results[2]["id"] == results[1]["id"]
+    # Two new commands in total fit the burst of 2
+    assert queued(api) == ["PRINT: a", "PRINT: b"]
+
+
+def test_bulk_charges_each_item_to_its_own_source(api):
+    limit(api, 1, overrides={"busy": 1, "idle": 5})
+    api.add_command("PRINT: warm up", "busy")
+
+    results = api.add_commands([
+        {"command": "PRINT: from busy", "source": "busy", "idempotency_key": "busy-1"},
+        {"command": "PRINT: from idle", "source": "idle"},
+        "PRINT: default source",
+    ], "idle")
+    assert results[0]["success"] is False
+    assert results[0]["reason"] == "rate_limit"
+    assert results[0]["retry_after"] >= 1
+    assert results[1]["success"] is True
+    assert results[2]["success"] is True
+    assert queued(api) == ["PRINT: warm up", "PRINT: from idle", "PRINT: default source"]
+
+    # The throttled item's idempotency key was released
+    limit(api, 0)
+    retry = api.add_commands([{"command": "PRINT: from busy", "source": "busy",
+                               "idempotency_key": "busy-1"}], "idle")
+    assert retry[0]["success"] is True and "duplicate" not in retry[0]
+
+
+def test_bulk_of_only_throttled_items_raises(api):
+    limit(api, 1)
+    api.add_command("PRINT: warm up", "shop")
+    with pytest.raises(Throttled):
+        api.add_commands(["PRINT: x", "PRINT: y"], "shop")
+
+
+def test_backpressure_refuses_every_source(api):
+    limit(api, 0)
+    api.add_commands(["PRINT: 1", "PRINT: 2"], "shop")
+    # The queue depth is sampled on the first check
+    api.limiter = MIORARateLimiter(api.queue, rate=0, high_watermark=2, low_watermark=0)
+    with pytest.raises(Throttled) as error:
+        api.add_command("PRINT: 3", "elsewhere")
+    assert error.value.reason == "backpressure"
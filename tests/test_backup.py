@@ -0,0 +1,113 @@
+"""
+Tes backup inkremental: rantai base + delta dan restore ke nomor urut tertentu
+"""
+
+import threading
+
+import pytest
+
+from miora_backup import MIORABackupEngine, read_manifest, restore_chain
+from miora_memory_store import MIORAMemoryStore
+
+
+@pytest.fixture
+def store():
+    store = MIORAMemoryStore("memory.json", snapshot_interval=3600, memory_format="records")
+    for i in range(20):
+        store.set(f"key{i:02d}", i)
+    yield store
+    store.close()
+
+
+def backup(engine, full=False):
+    engine.request(full=full)
+    # Wait for the background writer
+    engine.close()
+    return engine._entries[-1]
+
+
+def test_chain_restores_to_each_sequence_number(store):
+    engine = MIORABackupEngine(store, "backups")
+    base = backup(engine)
+    store.set("key00", "changed")
+    store.delete("key01")
+    first_delta = backup(engine)
+    store.set("key02", "changed again")
+    store.set("new", [1, 2])
+    second_delta = backup(engine)
+
+    assert [entry["kind"] for entry in read_manifest("backups")] == ["base", "delta", "delta"]
+    assert first_delta["keys"] == 2
+
+    initial = {f"key{i:02d}": i for i in range(20)}
+    assert restore_chain("backups", until_seq=base["seq"]) == initial
+
+    after_first = dict(initial, key00="changed")
+    del after_first["key01"]
+    assert restore_chain("backups", until_seq=first_delta["seq"]) == after_first
+    assert restore_chain("backups", until_seq=second_delta["seq"]) == store.to_dict()
+    assert restore_chain("backups") == store.to_dict()
+
+
+def test_backup_sees_memory_as_of_the_request(store):
+    engine = MIORABackupEngine(store, "backups")
+    # The values are still in the record file when the view is taken
+    store.snapshot(force=True)
+    engine.request()
+    store.set("key05", "after the request")
+    engine.close()
+    assert restore_chain("backups")["key05"] == 5
+
+
+def test_new_engine_starts_a_new_chain(store):
+    backup(MIORABackupEngine(store, "backups"))
+    store.set("key00", "changed")
+    # Changes made before a restart are not tracked, so the next backup is a base
+    entry = backup(MIORABackupEngine(store, "backups"))
+    assert entry["kind"] == "base"
+    assert restore_chain("backups")["key00"] == "changed"
+
+
+def test_restore_before_the_first_base_fails(store):
+    engine = MIORABackupEngine(store, "backups")
+    backup(engine)
+    with pytest.raises(ValueError):
+        restore_chain("backups", until_seq=0)
+
+
+def test_restore_into_a_failed_delta_gap_is_refused(store):
+    engine = MIORABackupEngine(store, "backups")
+    backup(engine)
+
+    real_write = engine._write_backup
+    calls = []
+    both_queued = threading.Event()
+
+    def fail_first(job):
+        calls.append(job["seq"])
+        if len(calls) == 1:
+            # Fail only once the next delta is queued behind this one
+            both_queued.wait(10)
+            raise OSError("disk full")
+        return real_write(job)
+
+    engine._write_backup = fail_first
+    store.set("key00", "lost delta")
+    engine.request()
+    store.set("key03", "next delta")
+    engine.request()
+    both_queued.set()
+    engine.close()
+    del engine._write_backup
+
+    entries = read_manifest("backups")
+    assert entries[-1]["gap"] == calls[0]
+    with pytest.raises(ValueError):
+        restore_chain("backups", until_seq=entries[-1]["seq"])
+
+    # The failed changes are backed up again by the next delta
+    store.set("key04", "healed")
+    backup(engine)
+    restored = restore_chain("backups")
+    assert restored["key00"] == "lost delta"
+    assert restored == store.to_dict()
@@ -0,0 +1,136 @@
+"""
+Tes antrian segmen: offset konsumen, rollover segmen dan pemulihan setelah restart
+"""
+
+import json
+import os
+
+from miora_command_queue import MIORACommandQueue, MIORAConsumerCheckpoint
+
+
+def make_queue(**kwargs) -> MIORACommandQueue:
+    kwargs.setdefault("sync_mode", "none")
+    return MIORACommandQueue("queue", **kwargs)
+
+
+def commands(entries):
+    return [record["command"] for record, _ in entries]
+
+
+def test_commit_advances_offset_and_survives_restart():
+    queue = make_queue()
+    queue.append_many([{"command": f"PRINT: {i}"} for i in range(5)])
+
+    batch = queue.read_batch(3)
+    assert commands(batch) == ["PRINT: 0", "PRINT: 1", "PRINT: 2"]
+    # Reading alone does not consume anything
+    assert commands(queue.read_batch(3)) == commands(batch)
+
+    queue.commit(batch[-1][1], [record for record, _ in batch])
+    assert queue.read_offset() == batch[-1][1]
+    queue.close()
+
+    reopened = make_queue()
+    assert commands(reopened.read_batch()) == ["PRINT: 3", "PRINT: 4"]
+    stats = reopened.stats()
+    assert stats["depth"] == 2
+    assert stats["consumed_total"] == 3
+    reopened.close()
+
+
+def test_commit_never_moves_backwards():
+    queue = make_queue()
+    queue.append_many([{"command": f"PRINT: {i}"} for i in range(3)])
+    batch = queue.read_batch()
+    queue.commit(batch[2][1])
+    queue.commit(batch[0][1])
+    assert queue.read_offset() == batch[2][1]
+    assert queue.read_batch() == []
+    queue.close()
+
+
+def test_rollover_deletes_consumed_segments():
+    queue = make_queue(segment_bytes=200)
+    for i in range(10):
+        queue.append({"command": f"PRINT: {i:03d}"})
+    segments = queue._list_segments()
+    assert len(segments) > 1
+
+    batch = queue.read_batch(100)
+    assert commands(batch) == [f"PRINT: {i:03d}" for i in range(10)]
+    queue.commit(batch[-1][1])
+    # Only the segment holding the committed position is left
+    assert queue._list_segments() == [batch[-1][1][0]]
+
+    queue.append({"command": "PRINT: after"})
+    assert commands(queue.read_batch()) == ["PRINT: after"]
+    queue.close()
+
+
+def test_torn_record_is_not_delivered_until_complete():
+    queue = make_queue()
+    queue.append({"command": "PRINT: complete"})
+    segment = queue._segment_path(queue._list_segments()[-1])
+    with open(segment, "ab") as f:
+        f.write(b'{"command":"PRINT: torn"')
+
+    batch = queue.read_batch()
+    assert commands(batch) == ["PRINT: complete"]
+    queue.commit(batch[-1][1])
+
+    with open(segment, "ab") as f:
+        f.write(b'}\n')
+    assert commands(queue.read_batch()) == ["PRINT: torn"]
+    queue.close()
+
+
+def test_corrupt_line_is_delivered_as_corrupt_record():
+    queue = make_queue()
+    queue.append({"command": "PRINT: ok"})
+    with open(queue._segment_path(queue._list_segments()[-1]), "ab") as f:
+        f.write(b"not json\n")
+    records = [record for record, _ in queue.read_batch()]
+    assert records[0]["command"] == "PRINT: ok"
+    assert records[1]["corrupt"] is True
+    queue.close()
+
+
+def test_import_legacy_file_moves_commands_once():
+    with open("commands.json", "w", encoding="utf-8") as f:
+        json.dump([{"command": "PRINT: legacy", "source": "file"}, "PRINT: bare"], f)
+
+    queue = make_queue()
+    assert queue.import_legacy_file("commands.json") == 2
+    assert queue.import_legacy_file("commands.json") == 0
+    assert commands(queue.read_batch()) == ["PRINT: legacy", "PRINT: bare"]
+    with open("commands.json", encoding="utf-8") as f:
+        assert json.load(f) == []
+    queue.close()
+
+
+def test_checkpoint_commits_only_the_finished_prefix():
+    queue = make_queue()
+    queue.append_many([{"command": f"PRINT: {i}"} for i in range(4)])
+    batch = queue.read_batch()
+    committed = []
+    checkpoint = MIORAConsumerCheckpoint(batch, lambda position, records: committed.append(position),
+                                         batch_size=1, interval=3600)
+
+    checkpoint.done(1)
+    assert committed == []
+    checkpoint.done(0)
+    assert committed == [batch[1][1]]
+    checkpoint.done(3)
+    checkpoint.flush()
+    assert committed[-1] == batch[1][1]
+    checkpoint.done(2)
+    assert committed[-1] == batch[3][1]
+    queue.close()
+
+
+def test_queue_files_stay_inside_queue_dir(workdir):
+    queue = make_queue()
+    queue.append({"command": "PRINT: x"})
+    queue.commit(queue.read_batch()[-1][1])
+    queue.close()
+    assert sorted(os.listdir(workdir)) == ["queue"]
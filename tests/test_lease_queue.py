@@ -0,0 +1,133 @@
+"""
+Tes antrian lease SQLite: claim, ack, lease kedaluwarsa dan dead-letter
+"""
+
+import pytest
+
+import miora_lease_queue
+from miora_lease_queue import MIORALeaseQueue
+
+
+@pytest.fixture
+def lease_clock(clock, monkeypatch):
+    monkeypatch.setattr(miora_lease_queue, "time", clock)
+    return clock
+
+
+def make_queue(**kwargs) -> MIORALeaseQueue:
+    kwargs.setdefault("lease_seconds", 30)
+    kwargs.setdefault("max_attempts", 3)
+    return MIORALeaseQueue("queue.db", **kwargs)
+
+
+def commands(entries):
+    return [record["command"] for record, _ in entries]
+
+
+def test_consumers_never_claim_the_same_command(lease_clock):
+    first, second = make_queue(), make_queue()
+    first.append_many([{"command": f"PRINT: {i}"} for i in range(4)])
+
+    claimed_first = first.claim(2)
+    claimed_second = second.claim(10)
+    assert commands(claimed_first) == ["PRINT: 0", "PRINT: 1"]
+    assert commands(claimed_second) == ["PRINT: 2", "PRINT: 3"]
+    assert first.claim(10) == []
+    assert first.stats()["leased"] == 4
+    first.close()
+    second.close()
+
+
+def test_ack_deletes_only_own_leases(lease_clock):
+    first, second = make_queue(), make_queue()
+    first.append_many([{"command": "PRINT: a"}, {"command": "PRINT: b"}])
+    claimed = first.claim(1)
+    other = second.claim(1)
+
+    # A consumer cannot acknowledge a command leased to someone else
+    assert first.ack([other[0][1]]) == 0
+    assert first.ack([claimed[0][1]]) == 1
+    stats = first.stats()
+    assert stats["depth"] == 1
+    assert stats["consumed_total"] == 1
+    first.close()
+    second.close()
+
+
+def test_commit_acknowledges_everything_up_to_position(lease_clock):
+    queue = make_queue()
+    queue.append_many([{"command": f"PRINT: {i}"} for i in range(3)])
+    batch = queue.claim()
+    queue.commit(batch[1][1])
+    assert commands(queue.read_from((0, 0), 10)) == ["PRINT: 2"]
+    queue.close()
+
+
+def test_expired_lease_is_delivered_again(lease_clock):
+    crashed, survivor = make_queue(), make_queue()
+    crashed.append({"command": "PRINT: retry me"})
+    assert commands(crashed.claim()) == ["PRINT: retry me"]
+
+    assert survivor.claim() == []
+    lease_clock.sleep(31)
+    redelivered = survivor.claim()
+    assert commands(redelivered) == ["PRINT: retry me"]
+
+    # The crashed consumer lost its lease and cannot acknowledge any more
+    assert crashed.ack([redelivered[0][1]]) == 0
+    assert survivor.ack([redelivered[0][1]]) == 1
+    crashed.close()
+    survivor.close()
+
+
+def test_renew_keeps_the_lease(lease_clock):
+    owner, other = make_queue(), make_queue()
+    owner.append({"command": "PRINT: long"})
+    owner.claim()
+    lease_clock.sleep(20)
+    assert owner.renew() == 1
+    lease_clock.sleep(20)
+    assert other.claim() == []
+    owner.close()
+    other.close()
+
+
+def test_release_returns_leases_without_using_an_attempt(lease_clock):
+    first, second = make_queue(max_attempts=1), make_queue(max_attempts=1)
+    first.append({"command": "PRINT: handed over"})
+    first.claim()
+    first.release()
+    assert commands(second.claim()) == ["PRINT: handed over"]
+    first.close()
+    second.close()
+
+
+def test_command_is_dead_lettered_after_max_attempts(lease_clock):
+    queue = make_queue(max_attempts=2)
+    queue.append({"command": "PRINT: poison"})
+    for _ in range(2):
+        assert commands(queue.claim()) == ["PRINT: poison"]
+        lease_clock.sleep(31)
+
+    assert queue.claim() == []
+    dead = queue.dead_letters()
+    assert [record["command"] for record in dead] == ["PRINT: poison"]
+    assert dead[0]["attempts"] == 2
+    stats = queue.stats()
+    assert stats["dead"] == 1
+    assert stats["depth"] == 0
+    assert stats["by_type"] == {}
+    queue.close()
+
+
+def test_clear_keeps_dead_letters(lease_clock):
+    queue = make_queue(max_attempts=1)
+    queue.append({"command": "PRINT: poison"})
+    queue.claim()
+    lease_clock.sleep(31)
+    queue.claim()
+    queue.append({"command": "PRINT: pending"})
+    queue.clear()
+    assert queue.stats()["depth"] == 0
+    assert len(queue.dead_letters()) == 1
+    queue.close()
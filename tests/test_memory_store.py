@@ -0,0 +1,150 @@
+"""
+Tes memory store: replay WAL di atas snapshot, untuk format json dan records
+"""
+
+import os
+
+import pytest
+
+from miora_memory_records import STORED
+from miora_memory_store import MIORAMemoryStore
+
+
+@pytest.fixture(params=["json", "records"])
+def memory_format(request):
+    return request.param
+
+
+@pytest.fixture
+def open_store():
+    """Opens stores on memory.dat and closes them even when the test fails"""
+    stores = []
+
+    def open_store(memory_format, **kwargs) -> MIORAMemoryStore:
+        # Snapshots only happen when a test asks for one
+        store = MIORAMemoryStore("memory.dat", snapshot_interval=3600, snapshot_ops=10 ** 9,
+                                 memory_format=memory_format, **kwargs)
+        stores.append(store)
+        return store
+
+    yield open_store
+    for store in reversed(stores):
+        store.close()
+
+
+def test_wal_is_replayed_on_top_of_the_snapshot(open_store, memory_format):
+    store = open_store(memory_format)
+    store.set("kept", 1)
+    store.set("changed", "old")
+    store.set("removed", True)
+    store.snapshot(force=True)
+    assert os.path.getsize("memory.dat.wal") == 0
+
+    store.set("changed", "new")
+    store.delete("removed")
+    store.set("added", {"nested": [1, 2]})
+
+    # A second store on the same files sees what a restart after a crash would
+    recovered = open_store(memory_format)
+    assert recovered.to_dict() == {"kept": 1, "changed": "new", "added": {"nested": [1, 2]}}
+    recovered.close()
+    store.close()
+
+
+def test_torn_last_wal_line_is_ignored(open_store, memory_format):
+    store = open_store(memory_format)
+    store.set("a", 1)
+    store.snapshot(force=True)
+    store.set("b", 2)
+    with open("memory.dat.wal", "a", encoding="utf-8") as f:
+        f.write('{"op":"set","key":"c","va')
+
+    recovered = open_store(memory_format)
+    assert recovered.to_dict() == {"a": 1, "b": 2}
+    recovered.close()
+    store.close()
+
+
+def test_log_of_a_failed_snapshot_is_kept_in_order(open_store, memory_format):
+    store = open_store(memory_format)
+    store.set("key", 1)
+    store.snapshot(force=True)
+    store.set("key", 2)
+    # Simulate a snapshot that rotated the log but never wrote the file
+    with store._lock:
+        store._rotate_wal()
+    store.set("key", 3)
+
+    recovered = open_store(memory_format)
+    assert recovered.get("key") == 3
+    recovered.close()
+    store.close()
+
+
+def test_records_values_stay_in_the_file_until_read(open_store):
+    store = open_store("records")
+    store.set("cold", {"big": "value"})
+    store.snapshot(force=True)
+    store.close()
+
+    reopened = open_store("records")
+    assert reopened._data["cold"] is STORED
+    assert reopened.get("cold") == {"big": "value"}
+    reopened.set("hot", 1)
+    reopened.snapshot(force=True)
+    assert reopened.to_dict() == {"cold": {"big": "value"}, "hot": 1}
+    reopened.close()
+
+
+def test_switching_format_converts_the_file(open_store):
+    store = open_store("json")
+    store.set("a", 1)
+    store.close()
+
+    converted = open_store("records")
+    converted.snapshot()
+    converted.close()
+    with open("memory.dat", "rb") as f:
+        assert f.read(8) == b"MIORAMEM"
+    back = open_store("json")
+    assert back.to_dict() == {"a": 1}
+    back.close()
+
+
+def test_sync_modes_fsync_the_log(open_store, memory_format, monkeypatch):
+    synced = []
+    real_fsync = os.fsync
+    monkeypatch.setattr(os, "fsync", lambda fd: (synced.append(fd), real_fsync(fd)))
+
+    batch = open_store(memory_format, sync_mode="batch")
+    for i in range(5):
+        batch.set(f"k{i}", i)
+    assert synced == []
+    batch.sync()
+    batch.sync()
+    assert len(synced) == 1
+    batch.close()
+
+    synced.clear()
+    always = open_store(memory_format, sync_mode="always")
+    always.set("a", 1)
+    always.set("b", 2)
+    assert len(synced) == 2
+    always.close()
+
+
+def test_scans_cover_prefixes_and_time_ranges(open_store, memory_format):
+    store = open_store(memory_format)
+    for key in ("user_a", "user_b", "user_c", "other"):
+        store.set(key, key.upper())
+    store.set("data_100", "first")
+    store.set("data_200", "second")
+
+    items, cursor = store.scan_prefix("user_", limit=2)
+    assert items == [("user_a", "USER_A"), ("user_b", "USER_B")]
+    items, cursor = store.scan_prefix("user_", after=cursor, limit=2)
+    assert items == [("user_c", "USER_C")] and cursor is None
+
+    entries, _ = store.scan_time(start=150)
+    assert entries == [(200, "data_200", "second")]
+    store.close()
@@ -0,0 +1,99 @@
+"""
+Tes scheduler: pelepasan perintah jatuh tempo, penjadwalan ulang dan pembatalan
+"""
+
+import pytest
+
+from miora_scheduler import MIORAScheduler
+
+NOW = 1_000_000.0
+
+
+def scheduled(schedule_id, **fields):
+    return {"id": schedule_id, "command": f"PRINT: {schedule_id}", "type": "PRINT",
+            "params": {"message": schedule_id}, "source": "test", **fields}
+
+
+def release(scheduler, now):
+    with scheduler.release_due(now) as due:
+        return due
+
+
+def test_one_shot_is_released_once_when_due():
+    scheduler = MIORAScheduler("schedule.json")
+    scheduler.add_many([scheduled("later", not_before=NOW + 10)])
+
+    assert release(scheduler, NOW) == []
+    assert scheduler.seconds_until_next(NOW) == 10
+
+    due = release(scheduler, NOW + 10)
+    assert [record["id"] for record in due] == ["later"]
+    assert "not_before" not in due[0] and "due_at" not in due[0]
+    assert due[0]["enqueued_at"] == NOW + 10
+    assert release(scheduler, NOW + 20) == []
+    assert scheduler.seconds_until_next() is None
+
+
+def test_recurring_command_is_rescheduled_with_run_ids():
+    scheduler = MIORAScheduler("schedule.json")
+    scheduler.add_many([scheduled("tick", not_before=NOW, every=60)])
+
+    first = release(scheduler, NOW)
+    assert [record["id"] for record in first] == ["tick-1"]
+    assert first[0]["schedule_id"] == "tick"
+    assert scheduler.seconds_until_next(NOW) == 60
+
+    second = release(scheduler, NOW + 60)
+    assert [record["id"] for record in second] == ["tick-2"]
+
+
+def test_missed_runs_are_skipped_not_replayed():
+    scheduler = MIORAScheduler("schedule.json")
+    scheduler.add_many([scheduled("tick", not_before=NOW, every=60)])
+    release(scheduler, NOW)
+
+    # Down for five intervals: one run now, the next on the original grid
+    due = release(scheduler, NOW + 330)
+    assert [record["id"] for record in due] == ["tick-2"]
+    assert scheduler.seconds_until_next(NOW + 330) == 30
+
+
+def test_failed_enqueue_keeps_entries_due():
+    scheduler = MIORAScheduler("schedule.json")
+    scheduler.add_many([scheduled("once", not_before=NOW), scheduled("tick", not_before=NOW, every=60)])
+
+    with pytest.raises(OSError):
+        with scheduler.release_due(NOW) as due:
+            assert len(due) == 2
+            raise OSError("queue is full")
+
+    due = release(scheduler, NOW)
+    assert sorted(record["id"] for record in due) == ["once", "tick-1"]
+
+
+def test_cancel_removes_the_schedule():
+    scheduler = MIORAScheduler("schedule.json")
+    scheduler.add_many([scheduled("tick", not_before=NOW, every=60)])
+    assert scheduler.cancel("tick") is True
+    assert scheduler.cancel("tick") is False
+    assert release(scheduler, NOW + 600) == []
+
+
+def test_schedule_is_shared_through_the_file():
+    first = MIORAScheduler("schedule.json")
+    second = MIORAScheduler("schedule.json")
+    first.add_many([scheduled("shared", not_before=NOW + 5), scheduled("other", not_before=NOW + 5)])
+
+    # Any handler sees and can cancel every schedule
+    assert second.cancel("other") is True
+    assert [record["id"] for record in release(second, NOW + 5)] == ["shared"]
+    # ...and an entry is released by exactly one of them
+    assert release(first, NOW + 5) == []
+    assert MIORAScheduler.read_entries("schedule.json") == []
+
+
+def test_wants_delayed_and_recurring_records():
+    assert MIORAScheduler.wants({"not_before": NOW + 1}, NOW)
+    assert MIORAScheduler.wants({"every": 30}, NOW)
+    assert not MIORAScheduler.wants({"not_before": NOW - 1}, NOW)
+    assert not MIORAScheduler.wants({}, NOW)